@@ -5,12 +5,256 @@ This module provides a client for interacting with OpenAI models,
 specifically for analyzing various aspects of a codebase.
 """
 
+import concurrent.futures
+import functools
+import hashlib
+import itertools
 import json
 import logging
 import os
-from typing import Dict, Optional
+import re
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
-from openai import OpenAI
+from openai import BadRequestError, OpenAI, RateLimitError
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import tomllib
+except ImportError:
+    import tomli as tomllib
+
+from audit_near.categories.utils import format_file_index, format_file_sections
+from audit_near.llm_cache import LLMCache
+from audit_near.prompt_compress import compress
+from audit_near.rate_limiter import RateLimiter, estimate_tokens
+
+
+# Standing instructions shared by every category. They open each system prompt
+# verbatim so all categories score against the same rubric and output format.
+# At roughly 180 tokens the prefix is below the 1024-token minimum for
+# OpenAI's automatic prompt caching, so it is not cached on its own. Requests
+# leave temperature unset so repeated requests stay identical.
+_COMMON_PREFIX = (
+    "You are one of several expert reviewers auditing a software project. "
+    "Each reviewer rates the project along exactly one axis, described after the AXIS marker below, "
+    "and ignores strengths or weaknesses that belong to other axes.\n\n"
+    "Scoring rubric (integer from 0 to 10):\n"
+    "- 0-2: missing or fundamentally broken\n"
+    "- 3-4: present but with serious gaps\n"
+    "- 5-6: adequate, with clear room for improvement\n"
+    "- 7-8: solid, with only minor issues\n"
+    "- 9-10: exemplary\n\n"
+    "Base your judgement only on the material provided. Cite specific files, functions or passages "
+    "when explaining your rating, and give concrete suggestions for improvement. If the material is "
+    "insufficient to judge the axis, say so in the feedback and score conservatively.\n\n"
+    "Format your response as a JSON object with 'score' (integer) and 'feedback' (string) fields.\n\n"
+    "---AXIS---\n"
+)
+
+# Axis-specific instructions for each analysis category, keyed by category ID
+_AXIS_PROMPTS = {
+    "code_quality": (
+        "You are a code quality analysis expert. "
+        "Analyze the provided code samples and rate them on a scale from 0 to 10. "
+        "Consider factors like readability, maintainability, modularity, adherence to best practices, "
+        "error handling, and code organization. "
+        "Provide detailed feedback with specific examples and suggestions for improvement."
+    ),
+    "functionality": (
+        "You are an application functionality expert specializing in blockchain applications. "
+        "Analyze the provided code files to evaluate functionality and completeness of the application. "
+        "Consider factors like feature completeness, proper implementation of core features, "
+        "error handling, edge cases, and overall robustness. "
+        "Rate the functionality on a scale from 0 to 10."
+    ),
+    "security": (
+        "You are a security auditor specializing in blockchain applications. "
+        "Analyze the provided code files to evaluate security practices and identify potential vulnerabilities. "
+        "Consider factors like input validation, authentication, authorization, data sanitization, "
+        "contract security, economic attack vectors, and adherence to security best practices. "
+        "Rate the security on a scale from 0 to 10."
+    ),
+    "innovation": (
+        "You are an innovation expert specializing in blockchain applications. "
+        "Analyze the provided code and project summary to evaluate innovation and creativity. "
+        "Consider factors like novel use cases, creative solutions, technical innovation, "
+        "market potential, and uniqueness compared to existing solutions. "
+        "Rate the innovation on a scale from 0 to 10."
+    ),
+    "documentation": (
+        "You are a documentation expert specializing in software projects. "
+        "Analyze the provided documentation files and inline documentation statistics to evaluate quality. "
+        "Consider factors like comprehensiveness, clarity, structure, examples, "
+        "installation instructions, API documentation, and overall usability. "
+        "Rate the documentation on a scale from 0 to 10."
+    ),
+    "ux_design": (
+        "You are a UX design expert specializing in blockchain applications. "
+        "Analyze the provided frontend files and UI descriptions to evaluate user experience quality. "
+        "Consider factors like usability, accessibility, intuitive design, visual appeal, "
+        "responsiveness, error handling, and user guidance. "
+        "Rate the UX design on a scale from 0 to 10."
+    ),
+    "blockchain_integration": (
+        "You are a blockchain integration expert specializing in NEAR Protocol. "
+        "Analyze the provided files and blockchain patterns to evaluate integration quality. "
+        "Consider factors like proper use of NEAR APIs, contract interactions, wallet integration, "
+        "error handling, gas efficiency, and adherence to NEAR best practices. "
+        "Rate the blockchain integration on a scale from 0 to 10."
+    ),
+}
+
+# Full system prompts, built once at import time
+_SYSTEM_PROMPTS = {category: _COMMON_PREFIX + axis for category, axis in _AXIS_PROMPTS.items()}
+
+# Tool offered to the model when prompts carry a file index instead of file contents
+_GET_FILE_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "get_file",
+        "description": "Return the full content of a repository file listed in the prompt.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "path": {"type": "string", "description": "File path exactly as listed in the prompt"},
+            },
+            "required": ["path"],
+        },
+    },
+}
+
+# Introduces a file index so the model knows how to read the listed files
+_FILE_INDEX_HEADER = (
+    "Only short previews of the files are shown below. "
+    "Call the get_file tool with a path to read the full content of the files you need.\n\n"
+)
+
+# Tool-call rounds allowed before the model must answer without more files
+_MAX_TOOL_ROUNDS = 5
+
+# Number of parsed responses each client keeps in memory, so identical prompts
+# within one audit are answered once even when the persistent cache is disabled
+_RECENT_RESPONSES = 64
+
+
+def _default_config_path() -> str:
+    """
+    Get the path of the bundled default configuration file.
+    
+    Returns:
+        Path to configs/near_hackathon.toml
+    """
+    return os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "configs",
+        "near_hackathon.toml"
+    )
+
+
+@functools.lru_cache(maxsize=8)
+def _load_config(path: str) -> Dict:
+    """
+    Load and cache a TOML configuration file.
+    
+    Args:
+        path: Path to the configuration file
+        
+    Returns:
+        Parsed configuration dictionary
+    """
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+# Substrings suggesting that a prompt contains source code, matched in one pass
+_CODE_INDICATOR_RE = re.compile(r"```|def |class |function|import |from |<script|<template|contract |fn ")
+
+
+def _json_loads(data):
+    """
+    Deserialize JSON, using orjson when it is installed.
+    
+    Args:
+        data: JSON document as str or bytes
+        
+    Returns:
+        Deserialized object
+        
+    Raises:
+        json.JSONDecodeError: If the document is not valid JSON
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    """
+    Serialize an object to compact UTF-8 JSON, using orjson when it is installed.
+    
+    Both code paths produce identical output, so cache keys do not depend on
+    whether orjson is available.
+    
+    Args:
+        obj: Object to serialize
+        sort_keys: Whether to sort dictionary keys (default: False)
+        
+    Returns:
+        Serialized JSON as bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+    return json.dumps(obj, sort_keys=sort_keys, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def _extract_json_object(text: str) -> Optional[str]:
+    """
+    Extract the first complete JSON object from free-form text.
+    
+    The text is scanned once, tracking brace depth and skipping over string
+    literals, so braces inside JSON strings do not end the object early. A
+    leading ```json fence is skipped before scanning.
+    
+    Args:
+        text: Text that may contain a JSON object
+        
+    Returns:
+        The JSON object source, or None if no balanced object was found
+    """
+    fence = text.find("```json")
+    start = text.find("{", fence + 7 if fence != -1 else 0)
+    if start == -1:
+        return None
+    
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    
+    return None
 
 
 class AiClient:
@@ -35,15 +279,8 @@ class AiClient:
         
         # Load config if not provided
         if config is None:
-            import tomli
-            config_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                "configs",
-                "near_hackathon.toml"
-            )
             try:
-                with open(config_path, "rb") as f:
-                    config = tomli.load(f)
+                config = _load_config(_default_config_path())
             except Exception as e:
                 self.logger.warning(f"Could not load config file: {e}. Using default model names.")
                 config = {"ai": {"primary_model": "gpt-4.1-2025-04-14", "nano_model": "gpt-4.1-nano-2025-04-14"}}
@@ -53,13 +290,528 @@ class AiClient:
         self.nano_model = config.get("ai", {}).get("nano_model", "gpt-4.1-nano-2025-04-14")
         
         self.logger.info(f"Using models: primary={self.primary_model}, nano={self.nano_model}")
+        
+        # Local prompt compression for large prompts
+        self.compress_prompts = config.get("ai", {}).get("compress_prompts", False)
+        self.compress_threshold = config.get("ai", {}).get("compress_threshold", 4000)
+        
+        # Stream completions and assemble them as chunks arrive
+        self.stream = config.get("ai", {}).get("stream", False)
+        
+        # Write every prompt to a debug file when explicitly requested
+        self.debug_dump = config.get("ai", {}).get("debug_dump", False)
+        self._dump_counter = itertools.count(1)
+        
+        # Send a file index with short previews and let the model fetch the
+        # files it needs through a tool call, instead of inlining every file
+        self.file_tools = config.get("ai", {}).get("file_tools", False)
+        self.file_preview_chars = config.get("ai", {}).get("file_preview_chars", 200)
+        self._file_source = []
+        self._file_rows = {}
+        
+        # Token budget for inlined file contents per prompt (None: unlimited)
+        self.max_file_tokens = config.get("ai", {}).get("max_file_tokens")
+        
+        # Maximum number of category requests in flight at once
+        self.max_concurrency = config.get("ai", {}).get("max_concurrency", 8)
+        
+        # Send all category analyses of an audit in one chat completion request
+        self.bundle_requests = config.get("ai", {}).get("bundle_requests", False)
+        
+        # Batch API settings: trade latency for cost on non-interactive audits
+        self.use_batch = config.get("ai", {}).get("use_batch", False)
+        self.batch_poll_seconds = config.get("ai", {}).get("batch_poll_seconds", 30)
+        
+        # Set up the response cache (disabled unless configured)
+        cache_config = config.get("ai", {}).get("cache", {})
+        self.cache = LLMCache(
+            path=cache_config.get("path", os.path.join("instance", "llm_cache.db")),
+            ttl_seconds=cache_config.get("ttl_seconds"),
+            enabled=cache_config.get("enabled", False)
+        )
+        self._recent_responses: Dict[str, Union[str, bytes]] = {}
+        self._recent_lock = threading.Lock()
+        
+        # Client-side rate limiting and retries on rate-limit errors
+        rate_config = config.get("ai", {}).get("rate_limit", {})
+        self.rate_limiter = RateLimiter(
+            requests_per_minute=rate_config.get("requests_per_minute"),
+            tokens_per_minute=rate_config.get("tokens_per_minute")
+        )
+        self.max_attempts = rate_config.get("max_attempts", 5)
+        
+        # Prebuild a request builder for each category's system prompt
+        self._request_builders = {
+            category: self._make_request_builder(system_prompt, category)
+            for category, system_prompt in _SYSTEM_PROMPTS.items()
+        }
+    
+    def close(self) -> None:
+        """Close the synchronous client's HTTP connections."""
+        self.client.close()
+    
+    def __enter__(self) -> "AiClient":
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+    
+    @staticmethod
+    def _cache_key(kwargs: Dict[str, Any]) -> str:
+        """
+        Compute the cache key for a chat completion request.
+        
+        Args:
+            kwargs: Keyword arguments for the chat completions API
+            
+        Returns:
+            Hex digest identifying the request
+        """
+        key_data = {
+            "model": kwargs["model"],
+            "messages": kwargs["messages"],
+            "rf": kwargs.get("response_format"),
+        }
+        return hashlib.sha256(_json_dumps(key_data, sort_keys=True)).hexdigest()
+    
+    def _get_cached(self, key: str) -> Optional[Dict]:
+        """
+        Look up a cached response.
+        
+        Args:
+            key: Cache key
+            
+        Returns:
+            Cached response, or None on a cache miss
+        """
+        with self._recent_lock:
+            cached = self._recent_responses.get(key)
+        if cached is None:
+            cached = self.cache.get(key)
+            if cached is None:
+                return None
+        
+        self.logger.info(f"Using cached response {key[:12]}")
+        return _json_loads(cached)
+    
+    def _set_cached(self, key: str, result: Dict) -> None:
+        """
+        Store a parsed response in the in-memory and persistent caches.
+        
+        Args:
+            key: Cache key
+            result: Parsed response
+        """
+        payload = _json_dumps(result)
+        
+        # analyze_batch stores responses from several worker threads
+        with self._recent_lock:
+            self._recent_responses[key] = payload
+            if len(self._recent_responses) > _RECENT_RESPONSES:
+                # Drop the oldest entry; dicts keep insertion order
+                del self._recent_responses[next(iter(self._recent_responses))]
+        
+        self.cache.set(key, payload)
+    
+    def _build_request(
+        self,
+        prompt: str,
+        system_prompt: str = None,
+        use_nano: bool = False,
+        response_format: Dict = None,
+        max_tokens: int = 2000,
+        label: str = "request"
+    ) -> Dict[str, Any]:
+        """
+        Build the keyword arguments for a chat completion request.
+        
+        Args:
+            prompt: User prompt
+            system_prompt: System prompt (default: None)
+            use_nano: Whether to use the nano model (default: False)
+            response_format: Response format specification (default: None)
+            max_tokens: Maximum number of completion tokens (default: 2000)
+            label: Name of the request in debug dump file names (default: request)
+            
+        Returns:
+            Dictionary of keyword arguments for the chat completions API
+        """
+        model = self.nano_model if use_nano else self.primary_model
+        prompt = self._prepare_prompt(prompt, model, system_prompt, label)
+        
+        messages = []
+        
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+            
+        messages.append({"role": "user", "content": prompt})
+        
+        kwargs = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+        }
+        
+        if response_format:
+            kwargs["response_format"] = response_format
+        
+        return kwargs
+    
+    def _prepare_prompt(self, prompt: str, model: str, system_prompt: str = None, label: str = "request") -> str:
+        """
+        Compress a user prompt if needed and emit prompt diagnostics.
+        
+        Args:
+            prompt: User prompt
+            model: Model name
+            system_prompt: System prompt (default: None)
+            label: Name of the request in debug dump file names (default: request)
+            
+        Returns:
+            Prompt to send
+        """
+        if self.compress_prompts and len(prompt) > self.compress_threshold:
+            original_size = len(prompt)
+            prompt = compress(prompt)
+            self.logger.debug("Compressed prompt from %d to %d characters", original_size, len(prompt))
+        
+        # Prompt diagnostics are only computed when they would be logged
+        if self.logger.isEnabledFor(logging.INFO):
+            self._log_prompt_diagnostics(prompt, model)
+        
+        if self.debug_dump:
+            self._dump_problem_prompt(prompt, model, system_prompt, label)
+        
+        return prompt
+    
+    def _make_request_builder(self, system_prompt: str, category: str) -> Callable[[str], Dict[str, Any]]:
+        """
+        Create a request builder specialized for one system prompt.
+        
+        The model, token limit, response format and system message are fixed
+        when the builder is created, so building a request only appends the
+        user message.
+        
+        Args:
+            system_prompt: System prompt
+            category: Category ID, used to name debug dumps
+            
+        Returns:
+            Function mapping a user prompt to chat completion keyword arguments
+        """
+        model = self.primary_model
+        base_kwargs = {
+            "model": model,
+            "max_tokens": 2000,
+            "response_format": {"type": "json_object"},
+        }
+        base_messages = [{"role": "system", "content": system_prompt}]
+        
+        def build(prompt: str) -> Dict[str, Any]:
+            prompt = self._prepare_prompt(prompt, model, system_prompt, category)
+            kwargs = {**base_kwargs, "messages": base_messages + [{"role": "user", "content": prompt}]}
+            if self._serves_files():
+                kwargs["tools"] = [_GET_FILE_TOOL]
+            return kwargs
+        
+        return build
+    
+    def register_files(self, files: List[Tuple[str, str]]) -> None:
+        """
+        Make repository files available to the get_file tool.
+        
+        Contents are only read when the model asks for a file, so lazily
+        loaded files stay unread until they are needed.
+        
+        Args:
+            files: FileBundle or list of (file_path, file_content) tuples
+        """
+        paths = files.paths if hasattr(files, "paths") else [file[0] for file in files]
+        self._file_source = files
+        self._file_rows = {path: row for row, path in enumerate(paths)}
+    
+    def _serves_files(self) -> bool:
+        """
+        Check whether prompts should reference files instead of inlining them.
+        
+        Batch requests cannot answer tool calls, so they always inline files.
+        
+        Returns:
+            True if file tools are enabled and files have been registered
+        """
+        return self.file_tools and not self.use_batch and bool(self._file_rows)
+    
+    def format_files(self, files: List[Tuple[str, str]]) -> str:
+        """
+        Format files for inclusion in a category prompt.
+        
+        With file tools enabled, registered files are listed as an index of
+        paths, sizes and previews that the model can expand through get_file.
+        Otherwise the full contents are inlined.
+        
+        Args:
+            files: List of (file_path, file_content) tuples
+            
+        Returns:
+            Formatted files
+        """
+        files = list(files)
+        if self._serves_files() and all(path in self._file_rows for path, _ in files):
+            return _FILE_INDEX_HEADER + format_file_index(files, self.file_preview_chars)
+        return format_file_sections(self._within_file_budget(files))
+    
+    def _within_file_budget(self, files: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """
+        Drop trailing files whose contents would exceed the file token budget.
+        
+        Files are taken in order, so the categories' most relevant files are
+        kept; the first file is always kept.
+        
+        Args:
+            files: List of (file_path, file_content) tuples
+            
+        Returns:
+            Leading files that fit in max_file_tokens
+        """
+        if not self.max_file_tokens:
+            return files
+        
+        running_tokens = 0
+        for i, (path, content) in enumerate(files):
+            running_tokens += estimate_tokens(content, self.primary_model) + estimate_tokens(path, self.primary_model)
+            if i and running_tokens > self.max_file_tokens:
+                dropped = [path for path, _ in files[i:]]
+                self.logger.info(
+                    f"File token budget of {self.max_file_tokens} tokens exhausted, "
+                    f"dropping {len(dropped)} files: {', '.join(dropped)}"
+                )
+                return files[:i]
+        
+        return files
+    
+    def _answer_tool_calls(self, tool_calls: List[Any]) -> List[Dict[str, str]]:
+        """
+        Answer get_file tool calls with the requested file contents.
+        
+        Args:
+            tool_calls: Tool calls from an assistant message
+            
+        Returns:
+            Tool messages, one per call
+        """
+        replies = []
+        for call in tool_calls:
+            try:
+                path = _json_loads(call.function.arguments).get("path", "")
+            except (ValueError, AttributeError):
+                path = ""
+            
+            row = self._file_rows.get(path)
+            if call.function.name != "get_file" or row is None:
+                content = f"File not available: {path}"
+            else:
+                self.logger.info(f"Model requested file {path}")
+                content = self._file_source[row][1]
+            
+            replies.append({"role": "tool", "tool_call_id": call.id, "content": content})
+        
+        return replies
+    
+    @staticmethod
+    def _tool_round(kwargs: Dict[str, Any], messages: List[Dict[str, Any]], rounds: int) -> Dict[str, Any]:
+        """
+        Build the request for one round of a tool-call conversation.
+        
+        Args:
+            kwargs: Keyword arguments for the chat completions API
+            messages: Conversation so far
+            rounds: Number of tool-call rounds already answered
+            
+        Returns:
+            Keyword arguments for the next request
+        """
+        request = {**kwargs, "messages": messages}
+        if rounds >= _MAX_TOOL_ROUNDS:
+            request["tool_choice"] = "none"
+        return request
+    
+    def _create(self, kwargs: Dict[str, Any]) -> str:
+        """
+        Send a chat completion request, answering tool calls until the model replies.
+        
+        Args:
+            kwargs: Keyword arguments for the chat completions API
+            
+        Returns:
+            Content of the final response message
+        """
+        messages = kwargs["messages"]
+        rounds = 0
+        while True:
+            response = self.client.chat.completions.create(**self._tool_round(kwargs, messages, rounds))
+            message = response.choices[0].message
+            if "tools" not in kwargs or not message.tool_calls or rounds >= _MAX_TOOL_ROUNDS:
+                return message.content
+            
+            messages = messages + [message.model_dump(exclude_none=True)] + self._answer_tool_calls(message.tool_calls)
+            rounds += 1
+    
+    def _log_prompt_diagnostics(self, prompt: str, model: str) -> None:
+        """
+        Log the size and a preview of a prompt, warning if it looks problematic.
+        
+        Args:
+            prompt: User prompt
+            model: Model name
+        """
+        prompt_size = len(prompt)
+        prompt_preview = prompt[:100] + ("..." if prompt_size > 100 else "")
+        
+        self.logger.info("Calling OpenAI API with model %s", model)
+        self.logger.info("Prompt size: %d characters", prompt_size)
+        self.logger.info("Prompt preview: %s", prompt_preview)
+        
+        # Check if we have code in the prompt
+        if _CODE_INDICATOR_RE.search(prompt) is not None:
+            self.logger.info("Prompt contains code snippets")
+        else:
+            self.logger.warning("WARNING: Prompt does not appear to contain code snippets!")
+            self.logger.warning("This may lead to 'no code provided' responses from OpenAI")
+        
+        # Log if prompt is very short
+        if prompt_size < 1000:
+            self.logger.warning("WARNING: Prompt is very short (%d chars), may not contain enough context", prompt_size)
+    
+    def _dump_problem_prompt(
+        self, prompt: str, model: str, system_prompt: str = None, label: str = "request"
+    ) -> None:
+        """
+        Save the full prompt to a file for debugging.
+        
+        Each dump gets its own file, numbered per client, so concurrent
+        requests never write to the same file.
+        
+        Args:
+            prompt: User prompt
+            model: Model name
+            system_prompt: System prompt (default: None)
+            label: Name of the request, e.g. its category (default: request)
+        """
+        name = re.sub(r"[^A-Za-z0-9]+", "_", f"{model}_{label}")
+        debug_file = f"debug_prompt_{name}_{next(self._dump_counter)}.txt"
+        try:
+            with open(debug_file, "w") as f:
+                f.write("SYSTEM PROMPT:\n")
+                f.write(system_prompt or "None")
+                f.write("\n\nUSER PROMPT:\n")
+                f.write(prompt)
+            self.logger.info("Saved prompt to %s for debugging", debug_file)
+        except Exception as e:
+            self.logger.warning("Could not save debug prompt: %s", e)
+    
+    def _parse_json(self, content: str) -> Optional[Dict]:
+        """
+        Parse the JSON in the content of a chat completion response.
+        
+        Args:
+            content: Response message content
+            
+        Returns:
+            Dictionary with the parsed response, or None if the content holds
+            no parseable JSON object
+        """
+        # Log response info
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info("Received response: %d characters", len(content))
+            self.logger.info("Response preview: %s", content[:100] + ("..." if len(content) > 100 else ""))
+        
+        try:
+            # Try to parse as JSON
+            result = _json_loads(content)
+            self.logger.info("Response parsed as valid JSON")
+            return result
+        except json.JSONDecodeError:
+            self.logger.warning("Response is not valid JSON, trying alternative parsing methods")
+            # If not valid JSON, look for JSON object in the response
+            try:
+                json_text = _extract_json_object(content)
+                if json_text:
+                    result = _json_loads(json_text)
+                    self.logger.info("Extracted and parsed JSON from content")
+                    return result
+            except Exception as e:
+                self.logger.warning(f"Error during alternate JSON parsing: {e}")
+            return None
+    
+    def _parse_response(self, content: Optional[str]) -> Dict:
+        """
+        Parse the content of a chat completion response.
+        
+        Args:
+            content: Response message content, None for refusals and tool calls
+            
+        Returns:
+            Dictionary with the parsed response, or the text with a score of 0
+            if it holds no JSON
+        """
+        content = content or ""
+        result = self._parse_json(content)
+        if result is None:
+            # If we still can't parse it, return as text
+            self.logger.warning("Could not parse response as JSON, returning as text")
+            return {"feedback": content, "score": 0}
+        return result
+    
+    def _parse_and_cache(self, key: str, content: Optional[str]) -> Dict:
+        """
+        Parse the content of a chat completion response, caching it if it is JSON.
+        
+        A reply without JSON gets a score of 0, so it is not cached and the
+        next run asks again instead of reusing the failure.
+        
+        Args:
+            key: Cache key of the request
+            content: Response message content, None for refusals and tool calls
+            
+        Returns:
+            Dictionary with the parsed response
+        """
+        content = content or ""
+        result = self._parse_json(content)
+        if result is None:
+            self.logger.warning("Could not parse response as JSON, returning as text without caching it")
+            return {"feedback": content, "score": 0}
+        
+        self._set_cached(key, result)
+        return result
+    
+    def _log_api_error(self, e: Exception, prompt: str) -> None:
+        """
+        Log detailed information about a failed API call.
+        
+        Args:
+            e: Exception raised by the API call
+            prompt: User prompt that was sent
+        """
+        self.logger.error(f"Error calling OpenAI API: {e}")
+        
+        # More detailed error reporting
+        if isinstance(e, BadRequestError) and e.code == "context_length_exceeded":
+            self.logger.error("ERROR: Exceeded maximum context length!")
+            self.logger.error(f"Prompt size: {len(prompt)} characters")
+            self.logger.error(f"This error occurs when the prompt is too large for the model's context window.")
+            self.logger.error(f"Try reducing the number of files or using a smaller subset of the code.")
+        elif isinstance(e, RateLimitError):
+            self.logger.error("ERROR: Hit OpenAI rate limits!")
+            self.logger.error("Consider using a higher-tier API key or adding delays between requests.")
     
     def _call_openai(
         self, 
         prompt: str, 
         system_prompt: str = None, 
         use_nano: bool = False,
-        response_format: Dict = None
+        response_format: Dict = None,
+        max_tokens: int = 2000
     ) -> Dict:
         """
         Call OpenAI API with the given prompt.
@@ -69,6 +821,7 @@ class AiClient:
             system_prompt: System prompt (default: None)
             use_nano: Whether to use the nano model (default: False)
             response_format: Response format specification (default: None)
+            max_tokens: Maximum number of completion tokens (default: 2000)
             
         Returns:
             Dictionary with the parsed response
@@ -76,115 +829,340 @@ class AiClient:
         Raises:
             Exception: If the API call fails
         """
-        try:
-            model = self.nano_model if use_nano else self.primary_model
-            
-            messages = []
-            
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-                
-            messages.append({"role": "user", "content": prompt})
-            
-            kwargs = {
-                "model": model,
-                "messages": messages,
-                "max_tokens": 2000,
-            }
-            
-            if response_format:
-                kwargs["response_format"] = response_format
-            
-            # Debug logging for prompt size and content
-            prompt_size = len(prompt)
-            preview_length = min(100, len(prompt))
-            prompt_preview = prompt[:preview_length] + ("..." if len(prompt) > preview_length else "")
-            
-            self.logger.info(f"Calling OpenAI API with model {model}")
-            self.logger.info(f"Prompt size: {prompt_size} characters")
-            self.logger.info(f"Prompt preview: {prompt_preview}")
-            
-            # Check if we have code in the prompt
-            code_indicators = ["```", "def ", "class ", "function", "import ", "from ", "<script", "<template", "contract ", "fn "]
-            has_code = any(indicator in prompt for indicator in code_indicators)
-            if has_code:
-                self.logger.info("Prompt contains code snippets")
-            else:
-                self.logger.warning("WARNING: Prompt does not appear to contain code snippets!")
-                self.logger.warning("This may lead to 'no code provided' responses from OpenAI")
+        kwargs = self._build_request(prompt, system_prompt, use_nano, response_format, max_tokens)
+        return self._complete(kwargs)
+    
+    def _estimate_request_tokens(self, kwargs: Dict[str, Any]) -> int:
+        """
+        Estimate the tokens a request counts against the tokens-per-minute limit.
+        
+        Args:
+            kwargs: Keyword arguments for the chat completions API
+            
+        Returns:
+            Estimated prompt tokens plus the completion token budget
+        """
+        if not self.rate_limiter.tokens_per_minute:
+            return 0
+        
+        text = "".join(message["content"] for message in kwargs["messages"])
+        return estimate_tokens(text, kwargs["model"]) + kwargs.get("max_tokens", 0)
+    
+    def _complete(self, kwargs: Dict[str, Any]) -> Dict:
+        """
+        Send a prepared chat completion request, using the response cache.
+        
+        Args:
+            kwargs: Keyword arguments for the chat completions API
             
-            # Log if prompt is very short
-            if prompt_size < 1000:
-                self.logger.warning(f"WARNING: Prompt is very short ({prompt_size} chars), may not contain enough context")
+        Returns:
+            Dictionary with the parsed response
             
-            # Save the full prompt to a file for debugging if it's unusually problematic
-            if not has_code or prompt_size < 500:
-                debug_file = f"debug_prompt_{model.replace('.', '_').replace('-', '_')}.txt"
-                try:
-                    with open(debug_file, "w") as f:
-                        f.write("SYSTEM PROMPT:\n")
-                        f.write(system_prompt or "None")
-                        f.write("\n\nUSER PROMPT:\n")
-                        f.write(prompt)
-                    self.logger.info(f"Saved problematic prompt to {debug_file} for debugging")
-                except Exception as e:
-                    self.logger.warning(f"Could not save debug prompt: {e}")
+        Raises:
+            Exception: If the API call fails
+        """
+        key = self._cache_key(kwargs)
+        cached = self._get_cached(key)
+        if cached is not None:
+            return cached
+        
+        tokens = self._estimate_request_tokens(kwargs)
+        for attempt in range(self.max_attempts):
+            self.rate_limiter.acquire(tokens)
+            try:
+                if self.stream and "tools" not in kwargs:
+                    chunks = [
+                        chunk.choices[0].delta.content or ""
+                        for chunk in self.client.chat.completions.create(**kwargs, stream=True)
+                        if chunk.choices
+                    ]
+                    content = "".join(chunks)
+                else:
+                    content = self._create(kwargs)
+                break
+            except RateLimitError as e:
+                if attempt + 1 >= self.max_attempts:
+                    self._log_api_error(e, kwargs["messages"][-1]["content"])
+                    raise
+                delay = 2 ** attempt
+                self.logger.warning(f"Rate limited, retrying in {delay}s (attempt {attempt + 1}/{self.max_attempts})")
+                time.sleep(delay)
+            except Exception as e:
+                self._log_api_error(e, kwargs["messages"][-1]["content"])
+                raise
+        
+        return self._parse_and_cache(key, content)
+    
+    @staticmethod
+    def _resolve_category(category: str) -> str:
+        """
+        Resolve a category ID to a known system prompt key.
+        
+        Plugin categories without a dedicated prompt fall back to the prompt
+        matching their first ID component, then to code quality, mirroring
+        the method lookup used by the plugin loader.
+        
+        Args:
+            category: Category ID
+            
+        Returns:
+            Key into the system prompt table
+        """
+        for key in (category, category.split("_")[0]):
+            if key in _SYSTEM_PROMPTS:
+                return key
+        return "code_quality"
+    
+    def analyze_batch(
+        self,
+        requests: List[Tuple[str, str]],
+        on_result: Optional[Callable[[int, Any], None]] = None
+    ) -> List[Any]:
+        """
+        Analyze several categories in parallel from synchronous code.
+        
+        Requests run on a thread pool with the synchronous client, so callers
+        that are not inside an event loop (the CLI and the web worker thread)
+        pay only for the slowest request instead of the sum of all requests.
+        When use_batch is set, the requests are submitted through the Batch
+        API with run_batch() instead. When bundle_requests is set and every
+        request has its own category, they share one request through
+        analyze_bundle().
+        
+        Args:
+            requests: List of (category, prompt) tuples
+            on_result: Optional function called from the calling thread with
+                the index and result of each request as soon as it finishes,
+                so a slow request does not hold back reporting of the others
             
-            response = self.client.chat.completions.create(**kwargs)
+        Returns:
+            List of analysis results in request order. A failed request
+            yields the raised exception in place of its result.
+        """
+        if not requests:
+            return []
+        
+        categories = [category for category, _ in requests]
+        if self.bundle_requests and not self.use_batch and len(set(categories)) == len(categories):
+            bundled = self.analyze_bundle(dict(requests))
+            results = [bundled[category] for category in categories]
             
-            content = response.choices[0].message.content
+            if on_result is not None:
+                for i, result in enumerate(results):
+                    on_result(i, result)
+            return results
+        
+        if self.use_batch:
+            # Key the jobs by position, since several requests may share a category
+            jobs = [
+                (str(i), _SYSTEM_PROMPTS[self._resolve_category(category)], prompt)
+                for i, (category, prompt) in enumerate(requests)
+            ]
+            try:
+                batch_results = self.run_batch(jobs)
+                results = [batch_results[str(i)] for i in range(len(requests))]
+            except Exception as e:
+                self.logger.error(f"Batch analysis failed: {e}")
+                results = [e] * len(requests)
             
-            # Log response info
-            response_size = len(content)
-            response_preview = content[:100] + ("..." if len(content) > 100 else "")
-            self.logger.info(f"Received response: {response_size} characters")
-            self.logger.info(f"Response preview: {response_preview}")
+            if on_result is not None:
+                for i, result in enumerate(results):
+                    on_result(i, result)
+            return results
+        
+        def run(request: Tuple[str, str]) -> Any:
+            category, prompt = request
+            try:
+                return self.analyze(category, prompt)
+            except Exception as e:
+                return e
+        
+        results = [None] * len(requests)
+        max_workers = max(1, min(self.max_concurrency, len(requests)))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(run, request): i for i, request in enumerate(requests)}
+            for future in concurrent.futures.as_completed(futures):
+                i = futures[future]
+                results[i] = future.result()
+                if on_result is not None:
+                    on_result(i, results[i])
+        
+        return results
+    
+    def analyze_bundle(self, prompt_by_category: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Analyze several categories with a single chat completion request.
+        
+        All evaluations share one request, so the instructions and the
+        round-trip are paid for once. Categories missing from the bundled
+        response, or whose entry is malformed, are re-analyzed individually.
+        
+        Args:
+            prompt_by_category: Dictionary mapping category IDs to prompt strings
             
+        Returns:
+            Dictionary mapping category IDs to analysis results. A failed
+            individual retry yields the raised exception in place of its result.
+        """
+        categories = list(prompt_by_category)
+        
+        system_prompt = "\n\n".join(
+            [
+                f"You will perform {len(categories)} independent evaluations of the same project. "
+                "For each evaluation, act as the expert described in its section and judge only "
+                "the material provided for that evaluation."
+            ]
+            + [
+                f"## {category}\n{_AXIS_PROMPTS[self._resolve_category(category)]}"
+                for category in categories
+            ]
+        )
+        
+        schema = ", ".join(f'"{category}": {{"score": ..., "feedback": ...}}' for category in categories)
+        prompt = "\n\n".join(
+            [f"## {category}\n{prompt_by_category[category]}" for category in categories]
+            + [f"Return a single JSON object keyed by evaluation ID: {{{schema}}}"]
+        )
+        
+        try:
+            bundle = self._call_openai(
+                prompt=prompt,
+                system_prompt=system_prompt,
+                response_format={"type": "json_object"},
+                max_tokens=2000 * len(categories)
+            )
+        except Exception as e:
+            self.logger.warning(f"Bundled analysis failed, analyzing categories individually: {e}")
+            bundle = {}
+        
+        results = {}
+        for category in categories:
+            result = bundle.get(category)
+            if isinstance(result, dict) and "score" in result and "feedback" in result:
+                results[category] = result
+                continue
+            
+            self.logger.warning(f"Bundled response has no valid result for {category}, retrying individually")
             try:
-                # Try to parse as JSON
-                result = json.loads(content)
-                self.logger.info("Response parsed as valid JSON")
-                return result
-            except json.JSONDecodeError:
-                self.logger.warning("Response is not valid JSON, trying alternative parsing methods")
-                # If not valid JSON, look for JSON object in the response
+                results[category] = self.analyze(category, prompt_by_category[category])
+            except Exception as e:
+                results[category] = e
+        
+        return results
+    
+    def run_batch(self, jobs: List[Tuple[str, str, str]]) -> Dict[str, Any]:
+        """
+        Analyze several categories through the OpenAI Batch API.
+        
+        Batch requests are billed at a discount and draw on a separate rate
+        limit pool, at the cost of completing asynchronously. When batching is
+        disabled the jobs are sent to the live endpoint one by one instead.
+        
+        Args:
+            jobs: List of (category, system_prompt, user_prompt) tuples
+            
+        Returns:
+            Dictionary mapping category IDs to analysis results. A failed
+            request yields an exception in place of its result.
+        """
+        results = {}
+        response_format = {"type": "json_object"}
+        
+        if not self.use_batch:
+            for category, system_prompt, prompt in jobs:
                 try:
-                    import re
-                    json_match = re.search(r'```json\n(.*?)```', content, re.DOTALL)
-                    if json_match:
-                        result = json.loads(json_match.group(1))
-                        self.logger.info("Extracted and parsed JSON from markdown code block")
-                        return result
-                    
-                    # Try finding JSON without markdown code blocks
-                    json_match = re.search(r'({[\s\S]*})', content)
-                    if json_match:
-                        result = json.loads(json_match.group(1))
-                        self.logger.info("Extracted and parsed JSON from content")
-                        return result
-                        
-                    # If we still can't parse it, return as text
-                    self.logger.warning("Could not parse response as JSON, returning as text")
-                    return {"feedback": content, "score": 0}
+                    results[category] = self._call_openai(
+                        prompt=prompt,
+                        system_prompt=system_prompt,
+                        response_format=response_format
+                    )
                 except Exception as e:
-                    # If all parsing attempts fail, just return the raw text
-                    self.logger.warning(f"Error during alternate JSON parsing: {e}")
-                    return {"feedback": content, "score": 0}
-                
-        except Exception as e:
-            self.logger.error(f"Error calling OpenAI API: {e}")
+                    results[category] = e
+            return results
+        
+        # Build one request line per job, skipping cached responses
+        lines = []
+        keys = {}
+        for category, system_prompt, prompt in jobs:
+            kwargs = self._build_request(prompt, system_prompt, response_format=response_format, label=category)
+            keys[category] = self._cache_key(kwargs)
+            cached = self._get_cached(keys[category])
+            if cached is not None:
+                results[category] = cached
+                continue
+            
+            lines.append(_json_dumps({
+                "custom_id": category,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": kwargs,
+            }))
+        
+        if not lines:
+            return results
+        
+        # Upload the batch input file
+        with tempfile.NamedTemporaryFile("wb", suffix=".jsonl", delete=False) as f:
+            f.write(b"\n".join(lines))
+            input_path = f.name
+        try:
+            with open(input_path, "rb") as f:
+                input_file = self.client.files.create(file=f, purpose="batch")
+        finally:
+            os.remove(input_path)
+        
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        self.logger.info(f"Submitted batch {batch.id} with {len(lines)} requests")
+        
+        # Poll until the batch reaches a terminal state
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            time.sleep(self.batch_poll_seconds)
+            batch = self.client.batches.retrieve(batch.id)
+            self.logger.info(f"Batch {batch.id} status: {batch.status}")
+        
+        if batch.status != "completed":
+            raise RuntimeError(f"Batch {batch.id} ended with status {batch.status}")
+        
+        # Re-associate responses with their categories
+        output = self.client.files.content(batch.output_file_id).text if batch.output_file_id else ""
+        for line in output.splitlines():
+            if not line.strip():
+                continue
             
-            # More detailed error reporting
-            if "maximum context length" in str(e).lower():
-                self.logger.error("ERROR: Exceeded maximum context length!")
-                self.logger.error(f"Prompt size: {len(prompt)} characters")
-                self.logger.error(f"This error occurs when the prompt is too large for the model's context window.")
-                self.logger.error(f"Try reducing the number of files or using a smaller subset of the code.")
-            elif "rate limit" in str(e).lower():
-                self.logger.error("ERROR: Hit OpenAI rate limits!")
-                self.logger.error("Consider using a higher-tier API key or adding delays between requests.")
+            record = _json_loads(line)
+            category = record["custom_id"]
+            response = record.get("response") or {}
+            if record.get("error") or response.get("status_code") != 200:
+                error = record.get("error") or response.get("body", {}).get("error")
+                results[category] = RuntimeError(f"Batch request for {category} failed: {error}")
+                continue
             
-            raise
+            results[category] = self._parse_and_cache(
+                keys[category], response["body"]["choices"][0]["message"]["content"]
+            )
+        
+        for category, _, _ in jobs:
+            if category not in results:
+                results[category] = RuntimeError(f"No batch result returned for {category}")
+        
+        return results
+    
+    def analyze(self, category: str, prompt: str) -> Dict:
+        """
+        Analyze a category using AI.
+        
+        Args:
+            category: Category ID, used to select the system prompt
+            prompt: Prompt string
+            
+        Returns:
+            Dictionary with analysis results
+        """
+        return self._complete(self._request_builders[self._resolve_category(category)](prompt))
     
     def analyze_code_quality(self, prompt: str) -> Dict:
         """
@@ -196,20 +1174,7 @@ class AiClient:
         Returns:
             Dictionary with analysis results
         """
-        system_prompt = (
-            "You are a code quality analysis expert. "
-            "Analyze the provided code samples and rate them on a scale from 0 to 10. "
-            "Consider factors like readability, maintainability, modularity, adherence to best practices, "
-            "error handling, and code organization. "
-            "Provide detailed feedback with specific examples and suggestions for improvement. "
-            "Format your response as a JSON object with 'score' (integer) and 'feedback' (string) fields."
-        )
-        
-        return self._call_openai(
-            prompt=prompt,
-            system_prompt=system_prompt,
-            response_format={"type": "json_object"}
-        )
+        return self.analyze("code_quality", prompt)
     
     def analyze_functionality(self, prompt: str) -> Dict:
         """
@@ -221,20 +1186,7 @@ class AiClient:
         Returns:
             Dictionary with analysis results
         """
-        system_prompt = (
-            "You are an application functionality expert specializing in blockchain applications. "
-            "Analyze the provided code files to evaluate functionality and completeness of the application. "
-            "Consider factors like feature completeness, proper implementation of core features, "
-            "error handling, edge cases, and overall robustness. "
-            "Rate the functionality on a scale from 0 to 10. "
-            "Format your response as a JSON object with 'score' (integer) and 'feedback' (string) fields."
-        )
-        
-        return self._call_openai(
-            prompt=prompt,
-            system_prompt=system_prompt,
-            response_format={"type": "json_object"}
-        )
+        return self.analyze("functionality", prompt)
     
     def analyze_security(self, prompt: str) -> Dict:
         """
@@ -246,20 +1198,7 @@ class AiClient:
         Returns:
             Dictionary with analysis results
         """
-        system_prompt = (
-            "You are a security auditor specializing in blockchain applications. "
-            "Analyze the provided code files to evaluate security practices and identify potential vulnerabilities. "
-            "Consider factors like input validation, authentication, authorization, data sanitization, "
-            "contract security, economic attack vectors, and adherence to security best practices. "
-            "Rate the security on a scale from 0 to 10. "
-            "Format your response as a JSON object with 'score' (integer) and 'feedback' (string) fields."
-        )
-        
-        return self._call_openai(
-            prompt=prompt,
-            system_prompt=system_prompt,
-            response_format={"type": "json_object"}
-        )
+        return self.analyze("security", prompt)
     
     def analyze_innovation(self, prompt: str) -> Dict:
         """
@@ -271,20 +1210,7 @@ class AiClient:
         Returns:
             Dictionary with analysis results
         """
-        system_prompt = (
-            "You are an innovation expert specializing in blockchain applications. "
-            "Analyze the provided code and project summary to evaluate innovation and creativity. "
-            "Consider factors like novel use cases, creative solutions, technical innovation, "
-            "market potential, and uniqueness compared to existing solutions. "
-            "Rate the innovation on a scale from 0 to 10. "
-            "Format your response as a JSON object with 'score' (integer) and 'feedback' (string) fields."
-        )
-        
-        return self._call_openai(
-            prompt=prompt,
-            system_prompt=system_prompt,
-            response_format={"type": "json_object"}
-        )
+        return self.analyze("innovation", prompt)
     
     def analyze_documentation(self, prompt: str) -> Dict:
         """
@@ -296,20 +1222,7 @@ class AiClient:
         Returns:
             Dictionary with analysis results
         """
-        system_prompt = (
-            "You are a documentation expert specializing in software projects. "
-            "Analyze the provided documentation files and inline documentation statistics to evaluate quality. "
-            "Consider factors like comprehensiveness, clarity, structure, examples, "
-            "installation instructions, API documentation, and overall usability. "
-            "Rate the documentation on a scale from 0 to 10. "
-            "Format your response as a JSON object with 'score' (integer) and 'feedback' (string) fields."
-        )
-        
-        return self._call_openai(
-            prompt=prompt,
-            system_prompt=system_prompt,
-            response_format={"type": "json_object"}
-        )
+        return self.analyze("documentation", prompt)
     
     def analyze_ux_design(self, prompt: str) -> Dict:
         """
@@ -321,20 +1234,7 @@ class AiClient:
         Returns:
             Dictionary with analysis results
         """
-        system_prompt = (
-            "You are a UX design expert specializing in blockchain applications. "
-            "Analyze the provided frontend files and UI descriptions to evaluate user experience quality. "
-            "Consider factors like usability, accessibility, intuitive design, visual appeal, "
-            "responsiveness, error handling, and user guidance. "
-            "Rate the UX design on a scale from 0 to 10. "
-            "Format your response as a JSON object with 'score' (integer) and 'feedback' (string) fields."
-        )
-        
-        return self._call_openai(
-            prompt=prompt,
-            system_prompt=system_prompt,
-            response_format={"type": "json_object"}
-        )
+        return self.analyze("ux_design", prompt)
     
     def analyze_blockchain_integration(self, prompt: str) -> Dict:
         """
@@ -346,17 +1246,4 @@ class AiClient:
         Returns:
             Dictionary with analysis results
         """
-        system_prompt = (
-            "You are a blockchain integration expert specializing in NEAR Protocol. "
-            "Analyze the provided files and blockchain patterns to evaluate integration quality. "
-            "Consider factors like proper use of NEAR APIs, contract interactions, wallet integration, "
-            "error handling, gas efficiency, and adherence to NEAR best practices. "
-            "Rate the blockchain integration on a scale from 0 to 10. "
-            "Format your response as a JSON object with 'score' (integer) and 'feedback' (string) fields."
-        )
-        
-        return self._call_openai(
-            prompt=prompt,
-            system_prompt=system_prompt,
-            response_format={"type": "json_object"}
-        )
+        return self.analyze("blockchain_integration", prompt)
@@ -5,13 +5,13 @@ This module provides a base class for category processors that utilizes
 the repository analyzer for improved file selection and context generation.
 """
 
-import json
 import logging
-import os
-from typing import Dict, List, Tuple, Any, Optional
+from typing import Dict, List, Tuple, Any
 
 from audit_near.ai_client import AiClient
-from audit_near.categories.utils import load_prompt_template
+from audit_near.categories.utils import (
+    compile_prompt_template, extract_results, format_repo_summary, load_prompt_template
+)
 from audit_near.providers.repo_analyzer import RepoAnalyzer
 
 
@@ -21,8 +21,15 @@ class BaseCategory:
     
     This class provides common functionality for category processors,
     including repository analysis and prompt building.
+    
+    Processing is split into prepare_prompt() and finalize() so that the AI
+    calls of several categories can be issued together; process() runs both
+    halves around a single AI call.
     """
     
+    # AI client category used to select the system prompt for batched calls
+    ai_category = "code_quality"
+    
     def __init__(
         self, 
         ai_client: AiClient, 
@@ -71,6 +78,16 @@ class BaseCategory:
         
         return self._repo_analyzer
     
+    @repo_analyzer.setter
+    def repo_analyzer(self, analyzer: RepoAnalyzer) -> None:
+        """
+        Use an existing repository analyzer, e.g. one shared by all categories.
+        
+        Args:
+            analyzer: RepoAnalyzer instance for this category's repository
+        """
+        self._repo_analyzer = analyzer
+    
     def get_repo_summary(self) -> Dict[str, Any]:
         """
         Get the repository analysis summary.
@@ -90,6 +107,25 @@ class BaseCategory:
         Returns:
             Tuple of (score, feedback)
         """
+        # Build the prompt
+        prompt = self.prepare_prompt(files)
+        
+        # Get analysis from AI
+        analysis = self._get_ai_analysis(prompt)
+        
+        # Extract score and feedback
+        return self.finalize(analysis)
+    
+    def prepare_prompt(self, files: List[Tuple[str, str]]) -> str:
+        """
+        Build the AI prompt for this category.
+        
+        Args:
+            files: List of (file_path, file_content) tuples
+            
+        Returns:
+            Prompt string
+        """
         self.logger.info(f"Processing {self.category_name} category")
         
         # Analyze repository
@@ -99,15 +135,19 @@ class BaseCategory:
         selected_files = self._select_files(files, repo_analysis)
         
         # Build the prompt
-        prompt = self._build_prompt(selected_files, repo_analysis)
-        
-        # Get analysis from AI
-        analysis = self._get_ai_analysis(prompt)
-        
-        # Extract score and feedback
-        score, feedback = self._extract_results(analysis)
+        return self._build_prompt(selected_files, repo_analysis)
+    
+    def finalize(self, analysis: Dict[str, Any]) -> Tuple[int, str]:
+        """
+        Turn the AI analysis into the category result.
         
-        return score, feedback
+        Args:
+            analysis: Analysis results from the AI
+            
+        Returns:
+            Tuple of (score, feedback)
+        """
+        return self._extract_results(analysis)
     
     def _select_files(
         self, 
@@ -144,22 +184,18 @@ class BaseCategory:
         Returns:
             Prompt string
         """
-        # Format files content
-        files_content = []
-        for path, content in selected_files:
-            files_content.append(f"File: {path}\n\n```\n{content}\n```\n")
+        template = compile_prompt_template(self.prompt_template)
+        values = {}
         
-        files_content_str = "\n".join(files_content)
+        # Only build the sections the template actually uses
+        if "FILES_CONTENT" in template.placeholders:
+            values["FILES_CONTENT"] = self.ai_client.format_files(selected_files)
         
-        # Format repository summary
-        repo_summary = json.dumps(repo_analysis.get('summary', {}), indent=2)
+        if "REPO_SUMMARY" in template.placeholders:
+            values["REPO_SUMMARY"] = format_repo_summary(repo_analysis.get('summary', {}))
         
         # Replace placeholders in template
-        prompt = self.prompt_template
-        prompt = prompt.replace("{FILES_CONTENT}", files_content_str)
-        prompt = prompt.replace("{REPO_SUMMARY}", repo_summary)
-        
-        return prompt
+        return template.render(values)
     
     def _get_ai_analysis(self, prompt: str) -> Dict[str, Any]:
         """
@@ -185,14 +221,4 @@ class BaseCategory:
         Returns:
             Tuple of (score, feedback)
         """
-        try:
-            score = int(analysis.get("score", 0))
-            # Ensure score is within bounds
-            score = max(0, min(score, self.max_points))
-            
-            feedback = analysis.get("feedback", "No feedback provided.")
-            
-            return score, feedback
-        except (KeyError, ValueError) as e:
-            self.logger.error(f"Error extracting results from AI analysis: {e}")
-            return 0, f"Error processing {self.category_name} analysis."
\ No newline at end of file
+        return extract_results(analysis, self.max_points, self.category_name, self.logger)
\ No newline at end of file
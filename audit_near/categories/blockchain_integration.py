@@ -5,11 +5,15 @@ This module implements the processor for the Blockchain Integration category.
 """
 
 import logging
-import os
+from itertools import compress
 from typing import Dict, List, Tuple
 
 from audit_near.ai_client import AiClient
-from audit_near.categories.utils import load_prompt_template
+from audit_near.categories.file_bundle import FileBundle
+from audit_near.categories.utils import (
+    BLOCKCHAIN_FILE_PATH_RE, cached_near_patterns, compile_prompt_template,
+    extract_results, format_near_patterns, has_blockchain_content, load_prompt_template
+)
 
 
 class BlockchainIntegration:
@@ -17,6 +21,9 @@ class BlockchainIntegration:
     Processor for the Blockchain Integration category.
     """
     
+    # AI client category used to select the system prompt for batched calls
+    ai_category = "blockchain_integration"
+    
     def __init__(self, ai_client: AiClient, prompt_file: str, max_points: int, repo_path: str):
         """
         Initialize the Blockchain Integration processor.
@@ -46,6 +53,25 @@ class BlockchainIntegration:
         Returns:
             Tuple of (score, feedback)
         """
+        # Build the prompt
+        prompt = self.prepare_prompt(files)
+        
+        # Get analysis from AI
+        analysis = self.ai_client.analyze_blockchain_integration(prompt)
+        
+        # Extract score and feedback
+        return self.finalize(analysis)
+    
+    def prepare_prompt(self, files: List[Tuple[str, str]]) -> str:
+        """
+        Build the AI prompt for the Blockchain Integration category.
+        
+        Args:
+            files: List of (file_path, file_content) tuples
+            
+        Returns:
+            Prompt string
+        """
         self.logger.info("Processing Blockchain Integration category")
         
         # Extract blockchain-related files
@@ -55,208 +81,103 @@ class BlockchainIntegration:
         near_patterns = self._extract_near_patterns(files)
         
         # Build the prompt
-        prompt = self._build_prompt(blockchain_files, near_patterns)
-        
-        # Get analysis from AI
-        analysis = self.ai_client.analyze_blockchain_integration(prompt)
-        
-        # Extract score and feedback
-        score, feedback = self._extract_results(analysis)
+        return self._build_prompt(blockchain_files, near_patterns)
+    
+    def finalize(self, analysis: Dict) -> Tuple[int, str]:
+        """
+        Turn the AI analysis into the category result.
         
-        return score, feedback
+        Args:
+            analysis: Analysis results from the AI
+            
+        Returns:
+            Tuple of (score, feedback)
+        """
+        return self._extract_results(analysis)
     
     def _extract_blockchain_files(self, files: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
         """
         Extract blockchain-related files.
         
         Args:
-            files: List of (file_path, file_content) tuples
+            files: List of (file_path, file_content) tuples or a FileBundle
             
         Returns:
             List of (file_path, file_content) tuples for blockchain-related files
         """
-        # Look for blockchain-related files
-        blockchain_files = []
-        
-        # Common blockchain-related directories and file patterns
-        blockchain_dirs = ["contract", "contracts", "blockchain", "near", "chain"]
-        blockchain_patterns = [
-            "near", "contract", "wallet", "transaction", "blockchain", 
-            "token", "nft", "fungible", "account", "deploy", "gas"
+        bundle = FileBundle.of(files)
+        paths = bundle.paths
+        paths_lower = bundle.paths_lower
+        
+        # Mask of files small enough to include (skip large files)
+        mask = [size <= 50000 for size in bundle.sizes]
+        
+        # Keep files in a blockchain directory, with a blockchain pattern in
+        # the path, or with blockchain patterns in the content. Unread files
+        # are scanned as raw bytes, so files that do not match are never decoded.
+        selected = [
+            i for i in compress(range(len(bundle)), mask)
+            if BLOCKCHAIN_FILE_PATH_RE.search(paths[i])
+            or has_blockchain_content(bundle.scan_content(i))
         ]
         
-        for path, content in files:
-            # Skip large files
-            if len(content) > 50000:
-                continue
-                
-            # Check if path contains a blockchain directory
-            if any(blockchain_dir in path.split("/") for blockchain_dir in blockchain_dirs):
-                blockchain_files.append((path, content))
-                continue
-            
-            # Check for blockchain patterns in path
-            if any(pattern in path.lower() for pattern in blockchain_patterns):
-                blockchain_files.append((path, content))
-                continue
-            
-            # Check for blockchain patterns in content
-            content_lower = content.lower()
-            if any(
-                pattern in content_lower
-                for pattern in [
-                    "near.call", "near.view", "near-api-js", "near-sdk", 
-                    "@near-js", "contract.call", "contract.view", 
-                    "window.near", "connect.wallet", "wallet.signTransaction"
-                ]
-            ):
-                blockchain_files.append((path, content))
-        
         # If we have too many files, prioritize the most relevant ones
-        if len(blockchain_files) > 8:
+        if len(selected) > 8:
             # Prioritize contract files and files with NEAR in the name
+            is_priority = [
+                "contract" in paths_lower[i] or "near" in paths_lower[i]
+                for i in selected
+            ]
+            
             priority_files = [
-                (path, content) for path, content in blockchain_files
-                if "contract" in path.lower() or "near" in path.lower()
+                i for i, priority in zip(selected, is_priority) if priority
             ]
             
             other_files = [
-                (path, content) for path, content in blockchain_files
-                if (path, content) not in priority_files
+                i for i, priority in zip(selected, is_priority) if not priority
             ]
             
-            return priority_files[:5] + other_files[:3]  # Take up to 5 priority files and 3 other files
+            selected = priority_files[:5] + other_files[:3]  # Take up to 5 priority files and 3 other files
         
-        return blockchain_files
+        return list(bundle.select(selected))
     
-    def _extract_near_patterns(self, files: List[Tuple[str, str]]) -> Dict:
+    def _extract_near_patterns(self, files: List[Tuple[str, str]]) -> int:
         """
         Extract NEAR-specific integration patterns.
         
+        Unread files are scanned as raw bytes, so scanning does not decode
+        or cache their contents.
+        
         Args:
-            files: List of (file_path, file_content) tuples
+            files: List of (file_path, file_content) tuples or a FileBundle
             
         Returns:
-            Dictionary containing information about NEAR integration patterns
+            Bitmask of the NEAR integration patterns found (see NEAR_PATTERN_BITS)
         """
-        patterns = {
-            "near_api_js": False,
-            "near_sdk_rs": False,
-            "near_sdk_as": False,
-            "wallet_integration": False,
-            "contract_calls": False,
-            "view_calls": False,
-            "state_management": False,
-            "ft_integration": False,
-            "nft_integration": False,
-            "cross_contract_calls": False,
-        }
-        
-        # Check for patterns in all files
-        for path, content in files:
-            content_lower = content.lower()
-            
-            # Check for NEAR API JS
-            if "near-api-js" in content_lower or "@near-js" in content_lower:
-                patterns["near_api_js"] = True
-                
-            # Check for NEAR SDK Rust
-            if "near-sdk" in content_lower and any(ext in path for ext in [".rs", ".toml"]):
-                patterns["near_sdk_rs"] = True
-                
-            # Check for NEAR SDK AssemblyScript
-            if "near-sdk-as" in content_lower or "near-sdk-bindgen" in content_lower:
-                patterns["near_sdk_as"] = True
-                
-            # Check for wallet integration
-            if any(pattern in content_lower for pattern in [
-                "wallet.sign", "wallet.request", "connect.wallet", "wallet.account", 
-                "walletconnect", "walletrequest", "signtransaction", "requestsign"
-            ]):
-                patterns["wallet_integration"] = True
-                
-            # Check for contract calls
-            if any(pattern in content_lower for pattern in [
-                "near.call", "contract.call", "call(", ".callraw", "functioncall", 
-                "near.functioncall", "contractcall"
-            ]):
-                patterns["contract_calls"] = True
-                
-            # Check for view calls
-            if any(pattern in content_lower for pattern in [
-                "near.view", "contract.view", "view(", ".viewraw", "viewfunction", 
-                "near.viewfunction", "contractview"
-            ]):
-                patterns["view_calls"] = True
-                
-            # Check for state management
-            if any(pattern in content_lower for pattern in [
-                "storagemana", "persistentstor", "storage.get", "storage.set", 
-                "collections::", "treemap", "lookup", "storageusage"
-            ]):
-                patterns["state_management"] = True
-                
-            # Check for fungible token integration
-            if any(pattern in content_lower for pattern in [
-                "ft_transfer", "ft_balance", "fungible_token", "ft.transfer", "ft_mint", 
-                "nep141", "nep-141"
-            ]):
-                patterns["ft_integration"] = True
-                
-            # Check for NFT integration
-            if any(pattern in content_lower for pattern in [
-                "nft_transfer", "nft_mint", "non_fungible_token", "nft.transfer", 
-                "nep171", "nep-171"
-            ]):
-                patterns["nft_integration"] = True
-                
-            # Check for cross-contract calls
-            if any(pattern in content_lower for pattern in [
-                "promise", "ext_contract", "then(", "crosscontract", "cross_contract", 
-                "callback", "after_transaction", "transaction_complete"
-            ]):
-                patterns["cross_contract_calls"] = True
-        
-        return patterns
+        return cached_near_patterns(FileBundle.of(files).scan_files())
     
-    def _build_prompt(self, blockchain_files: List[Tuple[str, str]], near_patterns: Dict) -> str:
+    def _build_prompt(self, blockchain_files: List[Tuple[str, str]], near_patterns: int) -> str:
         """
         Build the prompt for the AI.
         
         Args:
             blockchain_files: List of (file_path, file_content) tuples for blockchain-related files
-            near_patterns: Dictionary containing information about NEAR integration patterns
+            near_patterns: Bitmask of the NEAR integration patterns found
             
         Returns:
             Prompt string
         """
         # Format blockchain files
-        blockchain_files_content = []
-        for path, content in blockchain_files:
-            blockchain_files_content.append(f"File: {path}\n\n```\n{content}\n```\n")
-        
-        blockchain_files_str = "\n".join(blockchain_files_content)
+        blockchain_files_str = self.ai_client.format_files(blockchain_files)
         
         # Format NEAR integration patterns
-        near_patterns_str = "\n".join([
-            f"- NEAR API JS: {'Yes' if near_patterns['near_api_js'] else 'No'}",
-            f"- NEAR SDK Rust: {'Yes' if near_patterns['near_sdk_rs'] else 'No'}",
-            f"- NEAR SDK AssemblyScript: {'Yes' if near_patterns['near_sdk_as'] else 'No'}",
-            f"- Wallet Integration: {'Yes' if near_patterns['wallet_integration'] else 'No'}",
-            f"- Contract Calls: {'Yes' if near_patterns['contract_calls'] else 'No'}",
-            f"- View Calls: {'Yes' if near_patterns['view_calls'] else 'No'}",
-            f"- State Management: {'Yes' if near_patterns['state_management'] else 'No'}",
-            f"- Fungible Token Integration: {'Yes' if near_patterns['ft_integration'] else 'No'}",
-            f"- NFT Integration: {'Yes' if near_patterns['nft_integration'] else 'No'}",
-            f"- Cross-Contract Calls: {'Yes' if near_patterns['cross_contract_calls'] else 'No'}",
-        ])
+        near_patterns_str = format_near_patterns(near_patterns)
         
         # Replace placeholders in prompt template
-        prompt = self.prompt_template
-        prompt = prompt.replace("{BLOCKCHAIN_FILES}", blockchain_files_str)
-        prompt = prompt.replace("{NEAR_PATTERNS}", near_patterns_str)
-        
-        return prompt
+        return compile_prompt_template(self.prompt_template).render({
+            "BLOCKCHAIN_FILES": blockchain_files_str,
+            "NEAR_PATTERNS": near_patterns_str,
+        })
     
     def _extract_results(self, analysis: Dict) -> Tuple[int, str]:
         """
@@ -268,14 +189,4 @@ class BlockchainIntegration:
         Returns:
             Tuple of (score, feedback)
         """
-        try:
-            score = int(analysis.get("score", 0))
-            # Ensure score is within bounds
-            score = max(0, min(score, self.max_points))
-            
-            feedback = analysis.get("feedback", "No feedback provided.")
-            
-            return score, feedback
-        except (KeyError, ValueError) as e:
-            self.logger.error(f"Error extracting results from AI analysis: {e}")
-            return 0, "Error processing Blockchain Integration analysis."
+        return extract_results(analysis, self.max_points, "Blockchain Integration", self.logger)
@@ -4,12 +4,64 @@ Code quality category processor.
 This module implements the processor for the code quality category.
 """
 
+import heapq
 import logging
-import os
+from itertools import compress
 from typing import Dict, List, Tuple
 
 from audit_near.ai_client import AiClient
-from audit_near.categories.utils import load_prompt_template
+from audit_near.categories.file_bundle import FileBundle
+from audit_near.categories.utils import compile_prompt_template, extract_results, load_prompt_template
+
+
+# Extensions of the files reviewed for code quality
+_CODE_EXTENSIONS = frozenset({
+    ".js", ".jsx", ".ts", ".tsx",  # JavaScript/TypeScript
+    ".py",  # Python
+    ".rs",  # Rust
+    ".sol",  # Solidity
+    ".wasm",  # WebAssembly
+    ".c", ".cpp", ".h", ".hpp",  # C/C++
+    ".java",  # Java
+    ".go",  # Go
+    ".cs",  # C#
+    ".php",  # PHP
+    ".rb",  # Ruby
+    ".swift",  # Swift
+    ".kt",  # Kotlin
+})
+
+
+def _ranked_slice(keys: List[Tuple[int, int]], start: int, stop: int) -> List[Tuple[int, int]]:
+    """
+    Return sorted(keys)[start:stop] without sorting all of the keys.
+    
+    Uses quickselect-style partitioning, which takes expected linear time.
+    
+    Args:
+        keys: Distinct sortable keys
+        start: First rank to return
+        stop: Rank to stop before
+        
+    Returns:
+        Sorted list of the keys with ranks in [start, stop)
+    """
+    if start >= stop or not keys:
+        return []
+    
+    pivot = keys[len(keys) // 2]
+    lower = [key for key in keys if key < pivot]
+    rank = len(lower)
+    
+    if stop <= rank:
+        return _ranked_slice(lower, start, stop)
+    
+    upper = [key for key in keys if key > pivot]
+    if start > rank:
+        return _ranked_slice(upper, start - rank - 1, stop - rank - 1)
+    
+    # The requested ranks span the pivot
+    return _ranked_slice(lower, start, rank) + [pivot] + _ranked_slice(upper, 0, stop - rank - 1)
 
 
 class CodeQuality:
@@ -17,6 +69,9 @@ class CodeQuality:
     Processor for the code quality category.
     """
     
+    # AI client category used to select the system prompt for batched calls
+    ai_category = "code_quality"
+    
     def __init__(self, ai_client: AiClient, prompt_file: str, max_points: int, repo_path: str):
         """
         Initialize the code quality processor.
@@ -46,6 +101,25 @@ class CodeQuality:
         Returns:
             Tuple of (score, feedback)
         """
+        # Build the prompt
+        prompt = self.prepare_prompt(files)
+        
+        # Get analysis from AI
+        analysis = self.ai_client.analyze_code_quality(prompt)
+        
+        # Extract score and feedback
+        return self.finalize(analysis)
+    
+    def prepare_prompt(self, files: List[Tuple[str, str]]) -> str:
+        """
+        Build the AI prompt for the code quality category.
+        
+        Args:
+            files: List of (file_path, file_content) tuples
+            
+        Returns:
+            Prompt string
+        """
         self.logger.info("Processing code quality category")
         
         # Filter files for code (exclude assets, configs, etc.)
@@ -55,82 +129,94 @@ class CodeQuality:
         sample = self._select_code_sample(code_files)
         
         # Build the prompt
-        prompt = self._build_prompt(sample)
-        
-        # Get analysis from AI
-        analysis = self.ai_client.analyze_code_quality(prompt)
-        
-        # Extract score and feedback
-        score, feedback = self._extract_results(analysis)
+        return self._build_prompt(sample)
+    
+    def finalize(self, analysis: Dict) -> Tuple[int, str]:
+        """
+        Turn the AI analysis into the category result.
         
-        return score, feedback
+        Args:
+            analysis: Analysis results from the AI
+            
+        Returns:
+            Tuple of (score, feedback)
+        """
+        return self._extract_results(analysis)
     
-    def _filter_code_files(self, files: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    def _filter_code_files(self, files: List[Tuple[str, str]]) -> FileBundle:
         """
         Filter files to include only code files.
         
+        Byte-identical copies of a file (generated or copied boilerplate) are
+        kept only once, so they do not take up several sample slots.
+        
         Args:
-            files: List of (file_path, file_content) tuples
+            files: List of (file_path, file_content) tuples or a FileBundle
             
         Returns:
-            List of (file_path, file_content) tuples for code files
-        """
-        code_extensions = {
-            ".js", ".jsx", ".ts", ".tsx",  # JavaScript/TypeScript
-            ".py",  # Python
-            ".rs",  # Rust
-            ".sol",  # Solidity
-            ".wasm",  # WebAssembly
-            ".c", ".cpp", ".h", ".hpp",  # C/C++
-            ".java",  # Java
-            ".go",  # Go
-            ".cs",  # C#
-            ".php",  # PHP
-            ".rb",  # Ruby
-            ".swift",  # Swift
-            ".kt",  # Kotlin
-        }
-        
-        return [
-            (path, content) for path, content in files
-            if os.path.splitext(path)[1].lower() in code_extensions and content.strip()
-        ]
+            FileBundle of the code files
+        """
+        bundle = FileBundle.of(files)
+        contents = bundle.contents
+        
+        # Mask of code extensions, evaluated over the whole extension column
+        mask = map(_CODE_EXTENSIONS.__contains__, bundle.extensions)
+        
+        # Contents seen so far. Sets compare strings by their cached hash and
+        # only fall back to a full comparison for equal hashes.
+        seen = set()
+        rows = []
+        
+        for i in compress(range(len(bundle)), mask):
+            # A non-empty, non-whitespace file is what content.strip() would keep
+            if not bundle.sizes[i]:
+                continue
+            
+            content = contents[i]
+            if content.isspace() or content in seen:
+                continue
+            
+            seen.add(content)
+            rows.append(i)
+        
+        return bundle.select(rows)
     
     def _select_code_sample(self, code_files: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
         """
         Select a representative sample of code files for analysis.
         
         Args:
-            code_files: List of (file_path, file_content) tuples for code files
+            code_files: List of (file_path, file_content) tuples or a FileBundle for code files
             
         Returns:
             List of (file_path, file_content) tuples for the sample
         """
-        # Sort files by size (smallest to largest)
-        sorted_files = sorted(code_files, key=lambda x: len(x[1]))
+        bundle = FileBundle.of(code_files)
+        
+        # Rank files by size, breaking ties by position like a stable sort
+        keys = list(zip(bundle.sizes, range(len(bundle))))
         
         # Get a representative sample:
         # - Some small files (may be utilities or helpers)
         # - Some medium files (may be components or modules)
         # - Some large files (may be complex logic)
         
-        total_files = len(sorted_files)
+        total_files = len(keys)
         
         if total_files <= 10:
             # If we have 10 or fewer files, use all of them
-            return sorted_files
+            return [bundle[i] for _, i in sorted(keys)]
         
-        # Calculate indices for small, medium, and large files
-        small_idx = total_files // 5
+        # Calculate the index of the medium files
         medium_idx = total_files // 2
-        large_idx = total_files * 4 // 5
         
-        # Select 3 small, 4 medium, and 3 large files
+        # Select 3 small, 4 medium, and 3 large files without sorting every file
         sample = (
-            sorted_files[:3] +  # Small files
-            sorted_files[medium_idx-2:medium_idx+2] +  # Medium files
-            sorted_files[-3:]  # Large files
+            heapq.nsmallest(3, keys) +  # Small files
+            _ranked_slice(keys, medium_idx - 2, medium_idx + 2) +  # Medium files
+            heapq.nlargest(3, keys)[::-1]  # Large files
         )
+        sample = [bundle[i] for _, i in sample]
         
         # Ensure we don't have more than 10 files to avoid token limits
         return sample[:10]
@@ -146,17 +232,10 @@ class CodeQuality:
             Prompt string
         """
         # Insert file contents into the prompt
-        file_sections = []
-        
-        for path, content in sample:
-            file_sections.append(f"File: {path}\n\n```\n{content}\n```\n")
-        
-        files_content = "\n".join(file_sections)
+        files_content = self.ai_client.format_files(sample)
         
         # Replace placeholder in prompt template
-        prompt = self.prompt_template.replace("{FILES_CONTENT}", files_content)
-        
-        return prompt
+        return compile_prompt_template(self.prompt_template).render({"FILES_CONTENT": files_content})
     
     def _extract_results(self, analysis: Dict) -> Tuple[int, str]:
         """
@@ -168,14 +247,4 @@ class CodeQuality:
         Returns:
             Tuple of (score, feedback)
         """
-        try:
-            score = int(analysis.get("score", 0))
-            # Ensure score is within bounds
-            score = max(0, min(score, self.max_points))
-            
-            feedback = analysis.get("feedback", "No feedback provided.")
-            
-            return score, feedback
-        except (KeyError, ValueError) as e:
-            self.logger.error(f"Error extracting results from AI analysis: {e}")
-            return 0, "Error processing code quality analysis."
+        return extract_results(analysis, self.max_points, "code quality", self.logger)
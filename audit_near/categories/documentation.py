@@ -5,11 +5,41 @@ This module implements the processor for the documentation category.
 """
 
 import logging
-import os
+import re
+from itertools import compress
 from typing import Dict, List, Tuple
 
 from audit_near.ai_client import AiClient
-from audit_near.categories.utils import load_prompt_template
+from audit_near.categories.file_bundle import FileBundle
+from audit_near.categories.utils import compile_prompt_template, extract_results, load_prompt_template
+
+
+# Matches once at the start of every comment line: a line whose stripped text
+# starts with a comment marker, or that contains a Rust doc comment marker
+_COMMENT_LINE_RE = re.compile(
+    r"^(?=[^\S\n]*(?://|#|--|/\*|\*|'''|\"\"\")|[^\n]*//[/!])",
+    re.MULTILINE,
+)
+
+# Documentation files typically have .md, .txt, .adoc or .rst extensions,
+# or have documentation-related names such as a docs directory
+_DOC_FILE_RE = re.compile(r"\.(?:md|txt|adoc|rst)$|doc|readme|guide|tutorial", re.IGNORECASE)
+
+# Extensions of code files whose comments count as inline documentation
+_CODE_FILE_EXTENSIONS = frozenset([
+    ".js", ".jsx", ".ts", ".tsx",  # JavaScript/TypeScript
+    ".py",  # Python
+    ".rs",  # Rust
+    ".sol",  # Solidity
+    ".c", ".cpp", ".h", ".hpp",  # C/C++
+    ".go",  # Go
+    ".java",  # Java
+    ".cs",  # C#
+])
+
+# Maximum number of code files read for inline documentation statistics;
+# larger code bases are estimated from an evenly spaced sample
+_MAX_STATS_FILES = 200
 
 
 class Documentation:
@@ -17,6 +47,9 @@ class Documentation:
     Processor for the documentation category.
     """
     
+    # AI client category used to select the system prompt for batched calls
+    ai_category = "documentation"
+    
     def __init__(self, ai_client: AiClient, prompt_file: str, max_points: int, repo_path: str):
         """
         Initialize the documentation processor.
@@ -46,126 +79,132 @@ class Documentation:
         Returns:
             Tuple of (score, feedback)
         """
+        # Build the prompt
+        prompt = self.prepare_prompt(files)
+        
+        # Get analysis from AI
+        analysis = self.ai_client.analyze_documentation(prompt)
+        
+        # Extract score and feedback
+        return self.finalize(analysis)
+    
+    def prepare_prompt(self, files: List[Tuple[str, str]]) -> str:
+        """
+        Build the AI prompt for the documentation category.
+        
+        Args:
+            files: List of (file_path, file_content) tuples
+            
+        Returns:
+            Prompt string
+        """
         self.logger.info("Processing documentation category")
         
+        # Both passes below filter the bundle's precomputed path, extension
+        # and size columns; only the selected files are read
+        bundle = FileBundle.of(files)
+        
         # Extract all documentation files
-        doc_files = self._extract_documentation_files(files)
+        doc_files = self._extract_documentation_files(bundle)
         
         # Extract inline documentation statistics
-        inline_doc_stats = self._extract_inline_documentation_stats(files)
+        inline_doc_stats = self._extract_inline_documentation_stats(bundle)
         
         # Build the prompt
-        prompt = self._build_prompt(doc_files, inline_doc_stats)
-        
-        # Get analysis from AI
-        analysis = self.ai_client.analyze_documentation(prompt)
-        
-        # Extract score and feedback
-        score, feedback = self._extract_results(analysis)
+        return self._build_prompt(doc_files, inline_doc_stats)
+    
+    def finalize(self, analysis: Dict) -> Tuple[int, str]:
+        """
+        Turn the AI analysis into the category result.
         
-        return score, feedback
+        Args:
+            analysis: Analysis results from the AI
+            
+        Returns:
+            Tuple of (score, feedback)
+        """
+        return self._extract_results(analysis)
     
     def _extract_documentation_files(self, files: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
         """
         Extract all documentation files.
         
         Args:
-            files: List of (file_path, file_content) tuples
+            files: List of (file_path, file_content) tuples or a FileBundle
             
         Returns:
             List of (file_path, file_content) tuples for documentation files
         """
-        # Documentation files typically have .md, .txt, or .adoc extensions
-        # or are located in a docs directory
-        doc_files = []
-        
-        for path, content in files:
-            # Skip very large files
-            if len(content) > 100000:
-                continue
-                
-            # Check for documentation files
-            if (
-                path.lower().endswith((".md", ".txt", ".adoc", ".rst")) or
-                "doc" in path.lower() or
-                "readme" in path.lower() or
-                "guide" in path.lower() or
-                "tutorial" in path.lower()
-            ):
-                doc_files.append((path, content))
-        
-        return doc_files
+        bundle = FileBundle.of(files)
+        
+        # Skip very large files, then check for documentation files
+        return list(bundle.select(
+            i for i, path in enumerate(bundle.paths)
+            if bundle.sizes[i] <= 100000 and _DOC_FILE_RE.search(path)
+        ))
     
     def _extract_inline_documentation_stats(self, files: List[Tuple[str, str]]) -> Dict:
         """
         Extract inline documentation statistics.
         
         Args:
-            files: List of (file_path, file_content) tuples
+            files: List of (file_path, file_content) tuples or a FileBundle
             
         Returns:
             Dictionary containing inline documentation statistics
         """
-        code_file_extensions = [
-            ".js", ".jsx", ".ts", ".tsx",  # JavaScript/TypeScript
-            ".py",  # Python
-            ".rs",  # Rust
-            ".sol",  # Solidity
-            ".c", ".cpp", ".h", ".hpp",  # C/C++
-            ".go",  # Go
-            ".java",  # Java
-            ".cs",  # C#
+        bundle = FileBundle.of(files)
+        
+        # Check for code files over the whole extension column, skipping
+        # empty or very large files
+        code_mask = map(_CODE_FILE_EXTENSIONS.__contains__, bundle.extensions)
+        code_rows = [
+            i for i in compress(range(len(bundle)), code_mask)
+            if 0 < bundle.sizes[i] <= 100000
         ]
+        total_code_files = len(code_rows)
+        
+        # Only read an evenly spaced sample of large code bases. Spacing over
+        # the sorted repository order keeps the sample spread across
+        # directories and languages, and the same on every run.
+        sample_rows = code_rows
+        if total_code_files > _MAX_STATS_FILES:
+            sample_rows = [
+                code_rows[k * total_code_files // _MAX_STATS_FILES]
+                for k in range(_MAX_STATS_FILES)
+            ]
         
-        total_code_files = 0
         files_with_comments = 0
         total_lines = 0
         comment_lines = 0
         
-        for path, content in files:
-            # Check if this is a code file
-            if not any(path.endswith(ext) for ext in code_file_extensions):
-                continue
-                
-            # Skip empty or very large files
-            if not content or len(content) > 100000:
-                continue
-                
-            total_code_files += 1
-            
-            # Count lines and comment lines
-            lines = content.splitlines()
-            total_lines += len(lines)
+        for i in sample_rows:
+            content = bundle.contents[i]
             
-            has_comments = False
+            # Count lines without splitting the file into a list of lines
+            total_lines += content.count("\n") + (not content.endswith("\n"))
             
-            for line in lines:
-                line = line.strip()
-                
-                # Check for comments in different languages
-                if (
-                    line.startswith("//") or
-                    line.startswith("#") or
-                    line.startswith("--") or
-                    line.startswith("/*") or
-                    line.startswith("*") or
-                    line.startswith("'''") or
-                    line.startswith('"""') or
-                    "///" in line or
-                    "//!" in line
-                ):
-                    comment_lines += 1
-                    has_comments = True
+            # Count comment lines in different languages in one regex pass
+            file_comment_lines = len(_COMMENT_LINE_RE.findall(content))
+            comment_lines += file_comment_lines
             
-            if has_comments:
+            if file_comment_lines:
                 files_with_comments += 1
         
         # Calculate statistics
         comment_ratio = comment_lines / total_lines if total_lines > 0 else 0
-        files_with_comments_ratio = files_with_comments / total_code_files if total_code_files > 0 else 0
+        files_with_comments_ratio = files_with_comments / len(sample_rows) if sample_rows else 0
+        
+        # Extrapolate sampled counts to all code files
+        if len(sample_rows) < total_code_files:
+            scale = total_code_files / len(sample_rows)
+            files_with_comments = round(files_with_comments * scale)
+            total_lines = round(total_lines * scale)
+            comment_lines = round(comment_lines * scale)
         
         return {
             "total_code_files": total_code_files,
+            "sampled_files": len(sample_rows),
             "files_with_comments": files_with_comments,
             "files_with_comments_ratio": files_with_comments_ratio,
             "total_lines": total_lines,
@@ -185,26 +224,25 @@ class Documentation:
             Prompt string
         """
         # Format documentation files
-        doc_files_content = []
-        for path, content in doc_files[:5]:  # Limit to first 5 files to avoid token limits
-            doc_files_content.append(f"File: {path}\n\n```\n{content}\n```\n")
-        
-        doc_files_str = "\n".join(doc_files_content)
+        doc_files_str = self.ai_client.format_files(doc_files[:5])  # Limit to first 5 files to avoid token limits
         
         # Format inline documentation statistics
-        inline_doc_stats_str = "\n".join([
+        stats_lines = [
             f"Total code files: {inline_doc_stats['total_code_files']}",
             f"Files with comments: {inline_doc_stats['files_with_comments']} ({inline_doc_stats['files_with_comments_ratio']:.2%})",
             f"Total lines of code: {inline_doc_stats['total_lines']}",
             f"Comment lines: {inline_doc_stats['comment_lines']} ({inline_doc_stats['comment_ratio']:.2%})",
-        ])
+        ]
+        sampled_files = inline_doc_stats.get("sampled_files", inline_doc_stats["total_code_files"])
+        if sampled_files < inline_doc_stats["total_code_files"]:
+            stats_lines.append(f"(Comment figures estimated from a {sampled_files}-file sample)")
+        inline_doc_stats_str = "\n".join(stats_lines)
         
         # Replace placeholders in prompt template
-        prompt = self.prompt_template
-        prompt = prompt.replace("{DOC_FILES}", doc_files_str)
-        prompt = prompt.replace("{INLINE_DOC_STATS}", inline_doc_stats_str)
-        
-        return prompt
+        return compile_prompt_template(self.prompt_template).render({
+            "DOC_FILES": doc_files_str,
+            "INLINE_DOC_STATS": inline_doc_stats_str,
+        })
     
     def _extract_results(self, analysis: Dict) -> Tuple[int, str]:
         """
@@ -216,14 +254,4 @@ class Documentation:
         Returns:
             Tuple of (score, feedback)
         """
-        try:
-            score = int(analysis.get("score", 0))
-            # Ensure score is within bounds
-            score = max(0, min(score, self.max_points))
-            
-            feedback = analysis.get("feedback", "No feedback provided.")
-            
-            return score, feedback
-        except (KeyError, ValueError) as e:
-            self.logger.error(f"Error extracting results from AI analysis: {e}")
-            return 0, "Error processing documentation analysis."
+        return extract_results(analysis, self.max_points, "documentation", self.logger)
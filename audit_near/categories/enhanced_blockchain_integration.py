@@ -6,11 +6,21 @@ that utilizes the repository analyzer for improved file selection and context.
 """
 
 import logging
-import os
+import re
 from typing import Dict, List, Tuple, Any
 
 from audit_near.ai_client import AiClient
 from audit_near.categories.base_category import BaseCategory
+from audit_near.categories.file_bundle import FileBundle
+from audit_near.categories.utils import (
+    BLOCKCHAIN_FILE_PATH_RE, cached_near_patterns, compile_prompt_template,
+    format_near_patterns, has_blockchain_content
+)
+
+
+# Paths of contract files and files with NEAR in the name, matched in any case
+# without lowercasing each path
+_PRIORITY_PATH_RE = re.compile("contract|near", re.IGNORECASE)
 
 
 class EnhancedBlockchainIntegration(BaseCategory):
@@ -18,6 +28,9 @@ class EnhancedBlockchainIntegration(BaseCategory):
     Enhanced processor for the blockchain integration category.
     """
     
+    # AI client category used to select the system prompt for batched calls
+    ai_category = "blockchain_integration"
+    
     def __init__(self, ai_client: AiClient, prompt_file: str, max_points: int, repo_path: str, branch: str = "main"):
         """
         Initialize the enhanced blockchain integration processor.
@@ -52,12 +65,7 @@ class EnhancedBlockchainIntegration(BaseCategory):
         """
         self.logger.info("Selecting files for blockchain integration analysis using enhanced selection")
         
-        # Blockchain-related directories and file patterns
-        blockchain_dirs = ["contract", "contracts", "blockchain", "near", "chain"]
-        blockchain_patterns = [
-            "near", "contract", "wallet", "transaction", "blockchain", 
-            "token", "nft", "fungible", "account", "deploy", "gas"
-        ]
+        bundle = FileBundle.of(files)
         
         # Get blockchain-related files from the categorizer if available
         blockchain_files = repo_analysis.get('categorized_files', {}).get('blockchain', [])
@@ -65,146 +73,56 @@ class EnhancedBlockchainIntegration(BaseCategory):
         # If no blockchain files were identified by the categorizer, use fallback approach
         if not blockchain_files:
             blockchain_files = []
-            for path, content in files:
+            for i, path in enumerate(bundle.paths):
                 # Skip large files
-                if len(content) > 50000:
+                if bundle.sizes[i] > 50000:
                     continue
                     
-                # Check if path contains a blockchain directory
-                if any(blockchain_dir in path.split("/") for blockchain_dir in blockchain_dirs):
+                # Check for a blockchain directory or blockchain patterns in path
+                if BLOCKCHAIN_FILE_PATH_RE.search(path):
                     blockchain_files.append(path)
                     continue
                 
-                # Check for blockchain patterns in path
-                if any(pattern in path.lower() for pattern in blockchain_patterns):
+                # Check for blockchain patterns in content, as raw bytes if unread
+                if has_blockchain_content(bundle.scan_content(i)):
                     blockchain_files.append(path)
-                    continue
-                
-                # Check for blockchain patterns in content
-                content_lower = content.lower()
-                if any(
-                    pattern in content_lower
-                    for pattern in [
-                        "near.call", "near.view", "near-api-js", "near-sdk", 
-                        "@near-js", "contract.call", "contract.view", 
-                        "window.near", "connect.wallet", "wallet.signTransaction"
-                    ]
-                ):
-                    blockchain_files.append(path)
-        
-        # Prioritize contract files and files with NEAR in the name
-        priority_files = [
-            path for path in blockchain_files
-            if "contract" in path.lower() or "near" in path.lower()
-        ]
         
-        other_files = [
-            path for path in blockchain_files
-            if path not in priority_files
-        ]
+        # Prioritize contract files and files with NEAR in the name, splitting
+        # in one pass instead of testing membership in the priority list
+        priority_files, other_files = [], []
+        for path in blockchain_files:
+            if _PRIORITY_PATH_RE.search(path):
+                priority_files.append(path)
+            else:
+                other_files.append(path)
         
         # Combine and limit
         selected_paths = priority_files[:5] + other_files[:3]
         
-        # Map back to (path, content) tuples
-        path_to_content = {path: content for path, content in files}
-        selected_files = [
-            (path, path_to_content.get(path, "")) 
-            for path in selected_paths 
-            if path in path_to_content
-        ]
+        # Map back to (path, content) tuples, reading only the selected files
+        row_by_path = {path: i for i, path in enumerate(bundle.paths)}
+        selected_files = bundle.select(
+            row_by_path[path]
+            for path in selected_paths
+            if path in row_by_path
+        )
         
-        return selected_files
+        return list(selected_files)
     
-    def _extract_near_patterns(self, files: List[Tuple[str, str]]) -> Dict:
+    def _extract_near_patterns(self, files: List[Tuple[str, str]]) -> int:
         """
         Extract NEAR-specific integration patterns.
         
+        Unread files are scanned as raw bytes, so scanning does not decode
+        or cache their contents.
+        
         Args:
-            files: List of (file_path, file_content) tuples
+            files: List of (file_path, file_content) tuples or a FileBundle
             
         Returns:
-            Dictionary containing information about NEAR integration patterns
+            Bitmask of the NEAR integration patterns found (see NEAR_PATTERN_BITS)
         """
-        patterns = {
-            "near_api_js": False,
-            "near_sdk_rs": False,
-            "near_sdk_as": False,
-            "wallet_integration": False,
-            "contract_calls": False,
-            "view_calls": False,
-            "state_management": False,
-            "ft_integration": False,
-            "nft_integration": False,
-            "cross_contract_calls": False,
-        }
-        
-        # Check for patterns in all files
-        for path, content in files:
-            content_lower = content.lower()
-            
-            # Check for NEAR API JS
-            if "near-api-js" in content_lower or "@near-js" in content_lower:
-                patterns["near_api_js"] = True
-                
-            # Check for NEAR SDK Rust
-            if "near-sdk" in content_lower and any(ext in path for ext in [".rs", ".toml"]):
-                patterns["near_sdk_rs"] = True
-                
-            # Check for NEAR SDK AssemblyScript
-            if "near-sdk-as" in content_lower or "near-sdk-bindgen" in content_lower:
-                patterns["near_sdk_as"] = True
-                
-            # Check for wallet integration
-            if any(pattern in content_lower for pattern in [
-                "wallet.sign", "wallet.request", "connect.wallet", "wallet.account", 
-                "walletconnect", "walletrequest", "signtransaction", "requestsign"
-            ]):
-                patterns["wallet_integration"] = True
-                
-            # Check for contract calls
-            if any(pattern in content_lower for pattern in [
-                "near.call", "contract.call", "call(", ".callraw", "functioncall", 
-                "near.functioncall", "contractcall"
-            ]):
-                patterns["contract_calls"] = True
-                
-            # Check for view calls
-            if any(pattern in content_lower for pattern in [
-                "near.view", "contract.view", "view(", ".viewraw", "viewfunction", 
-                "near.viewfunction", "contractview"
-            ]):
-                patterns["view_calls"] = True
-                
-            # Check for state management
-            if any(pattern in content_lower for pattern in [
-                "storagemana", "persistentstor", "storage.get", "storage.set", 
-                "collections::", "treemap", "lookup", "storageusage"
-            ]):
-                patterns["state_management"] = True
-                
-            # Check for fungible token integration
-            if any(pattern in content_lower for pattern in [
-                "ft_transfer", "ft_balance", "fungible_token", "ft.transfer", "ft_mint", 
-                "nep141", "nep-141"
-            ]):
-                patterns["ft_integration"] = True
-                
-            # Check for NFT integration
-            if any(pattern in content_lower for pattern in [
-                "nft_transfer", "nft_mint", "non_fungible_token", "nft.transfer", 
-                "nep171", "nep-171"
-            ]):
-                patterns["nft_integration"] = True
-                
-            # Check for cross-contract calls
-            if any(pattern in content_lower for pattern in [
-                "promise", "ext_contract", "then(", "crosscontract", "cross_contract", 
-                "callback", "after_transaction", "transaction_complete"
-            ]):
-                patterns["cross_contract_calls"] = True
-        
-        return patterns
+        return cached_near_patterns(FileBundle.of(files).scan_files())
     
     def _build_prompt(self, selected_files: List[Tuple[str, str]], repo_analysis: Dict[str, Any]) -> str:
         """
@@ -217,56 +135,37 @@ class EnhancedBlockchainIntegration(BaseCategory):
         Returns:
             Prompt string
         """
-        # Format blockchain files
-        blockchain_files_content = []
-        for path, content in selected_files:
-            blockchain_files_content.append(f"File: {path}\n\n```\n{content}\n```\n")
-        
-        blockchain_files_str = "\n".join(blockchain_files_content)
-        
-        # Extract NEAR integration patterns
-        near_patterns = self._extract_near_patterns(selected_files)
-        
-        # Format NEAR integration patterns
-        near_patterns_str = "\n".join([
-            f"- NEAR API JS: {'Yes' if near_patterns['near_api_js'] else 'No'}",
-            f"- NEAR SDK Rust: {'Yes' if near_patterns['near_sdk_rs'] else 'No'}",
-            f"- NEAR SDK AssemblyScript: {'Yes' if near_patterns['near_sdk_as'] else 'No'}",
-            f"- Wallet Integration: {'Yes' if near_patterns['wallet_integration'] else 'No'}",
-            f"- Contract Calls: {'Yes' if near_patterns['contract_calls'] else 'No'}",
-            f"- View Calls: {'Yes' if near_patterns['view_calls'] else 'No'}",
-            f"- State Management: {'Yes' if near_patterns['state_management'] else 'No'}",
-            f"- Fungible Token Integration: {'Yes' if near_patterns['ft_integration'] else 'No'}",
-            f"- NFT Integration: {'Yes' if near_patterns['nft_integration'] else 'No'}",
-            f"- Cross-Contract Calls: {'Yes' if near_patterns['cross_contract_calls'] else 'No'}",
-        ])
+        template = compile_prompt_template(self.prompt_template)
+        values = {}
         
-        # Format repository summary
-        repo_summary = repo_analysis.get('summary', {})
+        # Only build the sections the template actually uses
+        if "BLOCKCHAIN_FILES" in template.placeholders:
+            values["BLOCKCHAIN_FILES"] = self.ai_client.format_files(selected_files)
         
-        # Check for NEAR SDK usage in boilerplate analysis
-        near_sdk_usage = repo_analysis.get('boilerplate_analysis', {}).get('near_sdk', {})
-        if near_sdk_usage:
-            near_sdk_summary = []
-            for sdk_name, sdk_info in near_sdk_usage.items():
-                if sdk_info.get('detected', False):
-                    near_sdk_summary.append(f"- {sdk_name}: Detected")
-                    near_sdk_summary.append(f"  - Version: {sdk_info.get('version', 'Unknown')}")
-                    near_sdk_summary.append(f"  - Features: {', '.join(sdk_info.get('features', []))}")
+        if "NEAR_PATTERNS" in template.placeholders:
+            # Extract and format NEAR integration patterns
+            near_patterns_str = format_near_patterns(self._extract_near_patterns(selected_files))
             
-            if near_sdk_summary:
-                near_patterns_str += "\n\n## NEAR SDK Details\n\n" + "\n".join(near_sdk_summary)
+            # Check for NEAR SDK usage in boilerplate analysis
+            near_sdk_usage = repo_analysis.get('boilerplate_analysis', {}).get('near_sdk', {})
+            if near_sdk_usage:
+                near_sdk_summary = []
+                for sdk_name, sdk_info in near_sdk_usage.items():
+                    if sdk_info.get('detected', False):
+                        near_sdk_summary.append(f"- {sdk_name}: Detected")
+                        near_sdk_summary.append(f"  - Version: {sdk_info.get('version', 'Unknown')}")
+                        near_sdk_summary.append(f"  - Features: {', '.join(sdk_info.get('features', []))}")
+                
+                if near_sdk_summary:
+                    near_patterns_str += "\n\n## NEAR SDK Details\n\n" + "\n".join(near_sdk_summary)
+            
+            values["NEAR_PATTERNS"] = near_patterns_str
         
-        # Convert repository summary to JSON string
-        repo_summary_str = str(repo_summary)
+        if "REPO_SUMMARY" in template.placeholders:
+            values["REPO_SUMMARY"] = str(repo_analysis.get('summary', {}))
         
         # Replace placeholders in prompt template
-        prompt = self.prompt_template
-        prompt = prompt.replace("{BLOCKCHAIN_FILES}", blockchain_files_str)
-        prompt = prompt.replace("{NEAR_PATTERNS}", near_patterns_str)
-        prompt = prompt.replace("{REPO_SUMMARY}", repo_summary_str)
-        
-        return prompt
+        return template.render(values)
     
     def _get_ai_analysis(self, prompt: str) -> Dict[str, Any]:
         """
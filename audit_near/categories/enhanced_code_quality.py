@@ -5,12 +5,13 @@ This module implements an enhanced processor for the code quality category
 that utilizes the repository analyzer for improved file selection and context.
 """
 
+import heapq
 import logging
-import os
 from typing import Dict, List, Tuple, Any
 
 from audit_near.ai_client import AiClient
 from audit_near.categories.base_category import BaseCategory
+from audit_near.categories.file_bundle import FileBundle
 
 
 class EnhancedCodeQuality(BaseCategory):
@@ -18,6 +19,9 @@ class EnhancedCodeQuality(BaseCategory):
     Enhanced processor for the code quality category.
     """
     
+    # AI client category used to select the system prompt for batched calls
+    ai_category = "code_quality"
+    
     def __init__(self, ai_client: AiClient, prompt_file: str, max_points: int, repo_path: str, branch: str = "main"):
         """
         Initialize the enhanced code quality processor.
@@ -58,10 +62,12 @@ class EnhancedCodeQuality(BaseCategory):
         # Get files by category
         categorized_files = repo_analysis.get('categorized_files', {})
         
+        # Extensions and sizes are computed once per audit in the bundle
+        bundle = FileBundle.of(files)
+        
         # Get language-specific core files
         language_files = {}
-        for path, _ in files:
-            ext = os.path.splitext(path)[1].lower()
+        for path, ext in zip(bundle.paths, bundle.extensions):
             if ext not in language_files:
                 language_files[ext] = []
             language_files[ext].append(path)
@@ -72,44 +78,45 @@ class EnhancedCodeQuality(BaseCategory):
         # 3. Tests if available
         # 4. Documentation files
         
-        # Start with the most important files (up to 5)
-        selected_paths = set(important_files[:5])
+        # Start with the most important files (up to 5). An insertion-ordered
+        # dict instead of a set keeps the selection and its order the same on
+        # every run, independent of string hash randomization.
+        selected_paths = dict.fromkeys(important_files[:5])
         
-        # Add representative files from each language (up to 3 per language, max 2 languages)
-        top_languages = sorted(language_files.items(), key=lambda x: len(x[1]), reverse=True)[:2]
+        # Add representative files from each language (up to 3 per language, max 2 languages),
+        # picking the two largest languages without sorting all of them
+        top_languages = heapq.nlargest(2, language_files.items(), key=lambda x: len(x[1]))
         for ext, paths in top_languages:
             for path in paths[:3]:
-                selected_paths.add(path)
+                selected_paths[path] = None
                 if len(selected_paths) >= 10:
                     break
         
         # Add test files if available (up to 2)
         test_paths = categorized_files.get('tests', [])
         for path in test_paths[:2]:
-            selected_paths.add(path)
+            selected_paths[path] = None
             if len(selected_paths) >= 12:
                 break
         
         # Add documentation files if available (up to 2)
         doc_paths = categorized_files.get('documentation', [])
         for path in doc_paths[:2]:
-            selected_paths.add(path)
+            selected_paths[path] = None
             if len(selected_paths) >= 12:
                 break
         
-        # Filter out overly large files (> 50KB) to stay within token limits
-        selected_paths = {
-            path for path in selected_paths
-            if os.path.exists(os.path.join(self.repo_path, path)) and
-            os.path.getsize(os.path.join(self.repo_path, path)) < 50000
-        }
-        
-        # Map back to (path, content) tuples
-        path_to_content = {path: content for path, content in files}
-        selected_files = [(path, path_to_content.get(path, "")) for path in selected_paths]
+        # Filter out overly large files (> 50KB) to stay within token limits,
+        # using the precomputed sizes instead of a stat call per path
+        row_by_path = {path: i for i, path in enumerate(bundle.paths)}
+        selected_rows = [
+            row_by_path[path] for path in selected_paths
+            if path in row_by_path and bundle.sizes[row_by_path[path]] < 50000
+        ]
         
+        # Map back to (path, content) tuples, reading only the selected files.
         # Ensure we don't exceed token limits (max 12 files)
-        return selected_files[:12]
+        return list(bundle.select(selected_rows[:12]))
     
     def _get_ai_analysis(self, prompt: str) -> Dict[str, Any]:
         """
@@ -0,0 +1,211 @@
+"""
+Columnar file representation for category processors.
+
+This module provides FileBundle, which stores repository files as parallel
+lists together with metadata that several categories need (lowercased paths,
+extensions and sizes), so that metadata is computed once per audit instead of
+once per file in every category.
+"""
+
+import mmap
+from array import array
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Sequence, Tuple, Union
+
+from audit_near.categories.utils import file_extension
+from audit_near.providers.repo_provider import FileRef
+
+
+class LazyContents(Sequence):
+    """
+    Content column backed by FileRefs, reading each file only when accessed.
+    """
+    
+    def __init__(self, refs: List[FileRef]):
+        """
+        Initialize the content column.
+        
+        Args:
+            refs: File references, one per row
+        """
+        self._refs = refs
+    
+    def __len__(self) -> int:
+        return len(self._refs)
+    
+    def __iter__(self) -> Iterator[str]:
+        return (ref.content for ref in self._refs)
+    
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(index, slice):
+            return [ref.content for ref in self._refs[index]]
+        return self._refs[index].content
+    
+    def scan_content(self, index: int) -> Union[str, bytes, mmap.mmap]:
+        """
+        Get one row's content for pattern scanning, without decoding it.
+        
+        Args:
+            index: Row index
+        
+        Returns:
+            Decoded content if already read, otherwise the raw bytes or, for
+            large files, a read-only memory map
+        """
+        return self._refs[index].scan_content
+    
+    def select(self, indices: List[int]) -> "LazyContents":
+        """
+        Build a content column for the given rows without reading them.
+        
+        Args:
+            indices: Row indices, in the desired order
+        
+        Returns:
+            LazyContents for the selected rows
+        """
+        return LazyContents([self._refs[i] for i in indices])
+
+
+@dataclass
+class FileBundle:
+    """
+    Repository files stored as parallel columns.
+    
+    A bundle behaves like a read-only sequence of (file_path, file_content)
+    tuples, so it can be passed anywhere a file list is expected.
+    
+    A bundle built from FileRefs keeps its contents lazy: files are read only
+    when their content is first accessed, and their sizes are on-disk byte
+    counts.
+    """
+    
+    paths: List[str] = field(default_factory=list)
+    contents: Sequence[str] = field(default_factory=list)
+    paths_lower: List[str] = field(default_factory=list)
+    extensions: List[str] = field(default_factory=list)
+    sizes: array = field(default_factory=lambda: array("q"))
+    
+    @classmethod
+    def from_files(cls, files: Iterable[Tuple[str, str]]) -> "FileBundle":
+        """
+        Build a bundle from (file_path, file_content) tuples.
+        
+        Args:
+            files: Iterable of (file_path, file_content) tuples
+        
+        Returns:
+            FileBundle with all metadata columns filled in
+        """
+        files = list(files)
+        if files and all(isinstance(file, FileRef) for file in files):
+            return cls._from_refs(files)
+        
+        bundle = cls()
+        for path, content in files:
+            bundle.paths.append(path)
+            bundle.contents.append(content)
+            bundle.paths_lower.append(path.lower())
+            bundle.extensions.append(file_extension(path))
+            bundle.sizes.append(len(content))
+        
+        return bundle
+    
+    @classmethod
+    def _from_refs(cls, refs: List[FileRef]) -> "FileBundle":
+        """
+        Build a bundle with lazy contents from file references.
+        
+        Args:
+            refs: File references
+        
+        Returns:
+            FileBundle whose contents are read on access
+        """
+        paths = [ref.path for ref in refs]
+        return cls(
+            paths=paths,
+            contents=LazyContents(refs),
+            paths_lower=[path.lower() for path in paths],
+            extensions=list(map(file_extension, paths)),
+            sizes=array("q", [ref.size for ref in refs]),
+        )
+    
+    @classmethod
+    def of(cls, files: Iterable[Tuple[str, str]]) -> "FileBundle":
+        """
+        Return files as a bundle, building one only if needed.
+        
+        Args:
+            files: FileBundle or iterable of (file_path, file_content) tuples
+        
+        Returns:
+            FileBundle for the files
+        """
+        if isinstance(files, cls):
+            return files
+        return cls.from_files(files)
+    
+    def select(self, indices: Iterable[int]) -> "FileBundle":
+        """
+        Build a bundle containing the files at the given indices.
+        
+        Args:
+            indices: Row indices, in the desired order
+        
+        Returns:
+            FileBundle sharing the already computed metadata
+        """
+        indices = list(indices)
+        if isinstance(self.contents, LazyContents):
+            contents = self.contents.select(indices)
+        else:
+            contents = [self.contents[i] for i in indices]
+        
+        return FileBundle(
+            paths=[self.paths[i] for i in indices],
+            contents=contents,
+            paths_lower=[self.paths_lower[i] for i in indices],
+            extensions=[self.extensions[i] for i in indices],
+            sizes=array("q", [self.sizes[i] for i in indices]),
+        )
+    
+    def scan_content(self, index: int) -> Union[str, bytes, mmap.mmap]:
+        """
+        Get a file's content for pattern scanning.
+        
+        Lazily loaded files that have not been read yet are returned as raw
+        bytes, or memory-mapped if large, so scanning them does not decode or
+        cache their content.
+        
+        Args:
+            index: Row index
+        
+        Returns:
+            File content as str, or as bytes or a memory map for an unread
+            lazy file
+        """
+        if isinstance(self.contents, LazyContents):
+            return self.contents.scan_content(index)
+        return self.contents[index]
+    
+    def scan_files(self) -> List[Tuple[str, Union[str, bytes, mmap.mmap]]]:
+        """
+        Get every file's content for pattern scanning.
+        
+        Returns:
+            List of (file_path, file_content) tuples with contents as returned
+            by scan_content, so unread lazy files are neither decoded nor cached
+        """
+        return [(path, self.scan_content(i)) for i, path in enumerate(self.paths)]
+    
+    def __len__(self) -> int:
+        return len(self.paths)
+    
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return zip(self.paths, self.contents)
+    
+    def __getitem__(self, index: Union[int, slice]) -> Union[Tuple[str, str], List[Tuple[str, str]]]:
+        if isinstance(index, slice):
+            return list(zip(self.paths[index], self.contents[index]))
+        return self.paths[index], self.contents[index]
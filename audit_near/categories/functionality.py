@@ -4,12 +4,60 @@ Functionality category processor.
 This module implements the processor for the functionality category.
 """
 
+import json
 import logging
-import os
-from typing import Dict, List, Tuple
+import re
+from typing import Dict, List, Optional, Tuple
 
 from audit_near.ai_client import AiClient
-from audit_near.categories.utils import load_prompt_template
+from audit_near.categories.file_bundle import FileBundle
+from audit_near.categories.utils import (
+    compile_prompt_template, extract_results, format_file_sections, load_prompt_template
+)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Frameworks identified from package.json dependencies, in reporting order
+_FRAMEWORK_DEPENDENCIES = (
+    ("react", frozenset({"react"})),
+    ("next.js", frozenset({"next"})),
+    ("near-api-js", frozenset({"near-api-js", "@near-js/api"})),
+)
+
+# Manifest files that identify the project type
+_MANIFEST_FILES = ("package.json", "Cargo.toml", "requirements.txt")
+
+# Common entry point patterns, in reporting order
+_ENTRY_POINT_PATTERNS = (
+    "index.js", "main.js", "app.js", "server.js",
+    "index.ts", "main.ts", "app.ts", "server.ts",
+    "main.py", "app.py", "main.rs", "lib.rs",
+)
+
+# Matches the entry point pattern a path ends with
+_ENTRY_POINT_RE = re.compile(
+    "(?:" + "|".join(re.escape(pattern) for pattern in _ENTRY_POINT_PATTERNS) + r")\Z"
+)
+
+# Contract files and API routes: the keyword anywhere in the path, in any
+# case, followed by one of the file extensions
+_CONTRACT_FILE_RE = re.compile(r"(?i:contract).*\.(?:rs|ts|js)\Z", re.DOTALL)
+_API_ROUTE_RE = re.compile(r"(?i:api).*\.(?:js|ts|py)\Z", re.DOTALL)
+
+# Test files and directories: "test", "tests", "spec" or "specs" in any case
+# as a whole path component or as a name part separated by ".", "_" or "-",
+# e.g. tests/, __tests__/, test_app.py, app.test.js or app_spec.rb, or as a
+# CamelCase suffix, e.g. FooTest.java, FooTests.cs or UserSpec.js
+_TEST_PATH_RE = re.compile(
+    r"(?:(?:^|[/._-])(?i:tests?|specs?)|(?<=[a-z0-9])(?:Tests?|Specs?))(?:[/._-]|$)"
+)
+
+# README files in any directory, with or without a text extension
+_README_PATH_RE = re.compile(r"(?:^|/)readme(?:\.md|\.rst|\.txt)?$", re.IGNORECASE)
 
 
 class Functionality:
@@ -48,14 +96,18 @@ class Functionality:
         """
         self.logger.info("Processing functionality category")
         
+        # Index the files once for both passes below
+        bundle = FileBundle.of(files)
+        index = self._index_files(bundle)
+        
         # Identify project structure
-        project_info = self._identify_project_structure(files)
+        project_info = self._identify_project_structure(bundle, index)
         
         # Identify main entry points and APIs
-        entry_points = self._identify_entry_points(files)
+        entry_points = self._identify_entry_points(bundle, index)
         
         # Build the prompt
-        prompt = self._build_prompt(files, project_info, entry_points)
+        prompt = self._build_prompt(bundle, project_info, entry_points)
         
         # Get analysis from AI
         analysis = self.ai_client.analyze_functionality(prompt)
@@ -65,55 +117,120 @@ class Functionality:
         
         return score, feedback
     
-    def _identify_project_structure(self, files: List[Tuple[str, str]]) -> Dict:
+    def _index_files(self, files: List[Tuple[str, str]]) -> Dict:
+        """
+        Index the files by manifest name, entry point and keyword in one pass.
+        
+        Only paths are examined; no file content is read.
+        
+        Args:
+            files: List of (file_path, file_content) tuples or a FileBundle
+            
+        Returns:
+            Dictionary with the row of the first file matching each manifest
+            name, the entry point, contract and API route paths, and whether
+            test and README files are present
+        """
+        bundle = FileBundle.of(files)
+        
+        manifests = {}
+        entry_points = {pattern: [] for pattern in _ENTRY_POINT_PATTERNS}
+        contract_files = []
+        api_routes = []
+        has_tests = False
+        has_readme = False
+        
+        for i, path in enumerate(bundle.paths):
+            if path.endswith(_MANIFEST_FILES):
+                for name in _MANIFEST_FILES:
+                    if path.endswith(name):
+                        manifests.setdefault(name, i)
+            
+            # No two entry point patterns end the same path, so the match
+            # is the pattern itself
+            match = _ENTRY_POINT_RE.search(path)
+            if match:
+                entry_points[match.group()].append(path)
+            
+            if _CONTRACT_FILE_RE.search(path):
+                contract_files.append(path)
+            
+            if _API_ROUTE_RE.search(path):
+                api_routes.append(path)
+            
+            if not has_tests:
+                has_tests = _TEST_PATH_RE.search(path) is not None
+            
+            if not has_readme:
+                has_readme = _README_PATH_RE.search(path) is not None
+        
+        return {
+            "manifests": manifests,
+            "entry_points": [path for paths in entry_points.values() for path in paths],
+            "contract_files": contract_files,
+            "api_routes": api_routes,
+            "has_tests": has_tests,
+            "has_readme": has_readme,
+        }
+    
+    def _identify_project_structure(self, files: List[Tuple[str, str]], index: Optional[Dict] = None) -> Dict:
         """
         Identify the project structure.
         
         Args:
-            files: List of (file_path, file_content) tuples
+            files: List of (file_path, file_content) tuples or a FileBundle
+            index: File index from _index_files, built if not given
             
         Returns:
             Dictionary containing project structure information
         """
+        bundle = FileBundle.of(files)
+        if index is None:
+            index = self._index_files(bundle)
+        
+        manifests = {name: bundle.contents[i] for name, i in index["manifests"].items()}
+        
         # Initialize project info
         project_info = {
             "type": "unknown",
             "language": "unknown",
             "frameworks": [],
-            "has_tests": False,
-            "has_readme": False,
-            "file_count": len(files),
+            "has_tests": index["has_tests"],
+            "has_readme": index["has_readme"],
+            "file_count": len(bundle),
         }
         
         # Check for package.json (Node.js project)
-        package_json = next((content for path, content in files if path.endswith("package.json")), None)
+        package_json = manifests.get("package.json")
         if package_json:
             project_info["type"] = "node"
             project_info["language"] = "javascript/typescript"
             
-            # Try to extract dependencies
-            try:
-                import json
-                pkg_data = json.loads(package_json)
-                
-                # Extract dependencies
-                all_deps = {}
-                for dep_type in ["dependencies", "devDependencies"]:
-                    if dep_type in pkg_data:
-                        all_deps.update(pkg_data[dep_type])
-                
-                # Identify common frameworks
-                if "react" in all_deps:
-                    project_info["frameworks"].append("react")
-                if "next" in all_deps:
-                    project_info["frameworks"].append("next.js")
-                if "near-api-js" in all_deps or "@near-js/api" in all_deps:
-                    project_info["frameworks"].append("near-api-js")
-            except Exception as e:
-                self.logger.warning(f"Error parsing package.json: {e}")
+            # Only manifests holding a JSON object can list dependencies, so
+            # anything else is skipped without running the parser
+            if not package_json.lstrip().startswith("{"):
+                self.logger.warning("Error parsing package.json: not a JSON object")
+            else:
+                # Try to extract dependencies
+                try:
+                    pkg_data = orjson.loads(package_json) if orjson is not None else json.loads(package_json)
+                    
+                    # Extract dependencies
+                    all_deps = {}
+                    for dep_type in ["dependencies", "devDependencies"]:
+                        if dep_type in pkg_data:
+                            all_deps.update(pkg_data[dep_type])
+                    
+                    # Identify common frameworks
+                    project_info["frameworks"].extend(
+                        framework for framework, names in _FRAMEWORK_DEPENDENCIES
+                        if not names.isdisjoint(all_deps)
+                    )
+                except Exception as e:
+                    self.logger.warning(f"Error parsing package.json: {e}")
         
         # Check for Cargo.toml (Rust project)
-        cargo_toml = next((content for path, content in files if path.endswith("Cargo.toml")), None)
+        cargo_toml = manifests.get("Cargo.toml")
         if cargo_toml:
             project_info["type"] = "rust"
             project_info["language"] = "rust"
@@ -123,62 +240,31 @@ class Functionality:
                 project_info["frameworks"].append("near-sdk-rs")
         
         # Check for Python projects
-        requirements_txt = next((content for path, content in files if path.endswith("requirements.txt")), None)
+        requirements_txt = manifests.get("requirements.txt")
         if requirements_txt:
             project_info["type"] = "python"
             project_info["language"] = "python"
         
-        # Check for tests
-        project_info["has_tests"] = any(
-            "test" in path.lower() or "spec" in path.lower() for path, _ in files
-        )
-        
-        # Check for README
-        project_info["has_readme"] = any(
-            path.lower() == "readme.md" for path, _ in files
-        )
-        
         return project_info
     
-    def _identify_entry_points(self, files: List[Tuple[str, str]]) -> List[str]:
+    def _identify_entry_points(self, files: List[Tuple[str, str]], index: Optional[Dict] = None) -> List[str]:
         """
         Identify main entry points and APIs.
         
         Args:
-            files: List of (file_path, file_content) tuples
+            files: List of (file_path, file_content) tuples or a FileBundle
+            index: File index from _index_files, built if not given
             
         Returns:
             List of entry point file paths
         """
-        entry_points = []
-        
-        # Common entry point patterns
-        entry_point_patterns = [
-            "index.js", "main.js", "app.js", "server.js",
-            "index.ts", "main.ts", "app.ts", "server.ts",
-            "main.py", "app.py", "main.rs", "lib.rs",
-        ]
-        
-        # Check for common entry points
-        for pattern in entry_point_patterns:
-            matches = [path for path, _ in files if path.endswith(pattern)]
-            entry_points.extend(matches)
-        
-        # Look for contract files
-        contract_files = [
-            path for path, _ in files
-            if "contract" in path.lower() and path.endswith((".rs", ".ts", ".js"))
-        ]
-        entry_points.extend(contract_files)
-        
-        # Look for API routes
-        api_routes = [
-            path for path, _ in files
-            if "api" in path.lower() and path.endswith((".js", ".ts", ".py"))
-        ]
-        entry_points.extend(api_routes)
-        
-        return list(set(entry_points))  # Remove duplicates
+        if index is None:
+            index = self._index_files(files)
+        
+        # Common entry points, then contract files, then API routes
+        entry_points = index["entry_points"] + index["contract_files"] + index["api_routes"]
+        
+        return list(dict.fromkeys(entry_points))  # Remove duplicates
     
     def _build_prompt(
         self, 
@@ -190,7 +276,7 @@ class Functionality:
         Build the prompt for the AI.
         
         Args:
-            files: List of (file_path, file_content) tuples
+            files: List of (file_path, file_content) tuples or a FileBundle
             project_info: Dictionary containing project structure information
             entry_points: List of entry point file paths
             
@@ -208,19 +294,27 @@ class Functionality:
         ])
         
         # Include entry points
-        entry_points_content = []
-        for entry_path in entry_points[:5]:  # Limit to first 5 entry points to avoid token limits
-            entry_content = next((content for path, content in files if path == entry_path), "")
-            entry_points_content.append(f"File: {entry_path}\n\n```\n{entry_content}\n```\n")
+        entry_points = entry_points[:5]  # Limit to first 5 entry points to avoid token limits
         
-        entry_points_str = "\n".join(entry_points_content)
+        # Find the first row of each entry point path in one pass over the
+        # paths, so only the entry point files themselves are read
+        bundle = FileBundle.of(files)
+        wanted = set(entry_points)
+        entry_rows = {}
+        for i, path in enumerate(bundle.paths):
+            if path in wanted:
+                entry_rows.setdefault(path, i)
         
-        # Replace placeholders in prompt template
-        prompt = self.prompt_template
-        prompt = prompt.replace("{PROJECT_INFO}", project_info_str)
-        prompt = prompt.replace("{ENTRY_POINTS}", entry_points_str)
+        entry_points_str = format_file_sections(
+            (entry_path, bundle.contents[entry_rows[entry_path]] if entry_path in entry_rows else "")
+            for entry_path in entry_points
+        )
         
-        return prompt
+        # Replace placeholders in prompt template
+        return compile_prompt_template(self.prompt_template).render({
+            "PROJECT_INFO": project_info_str,
+            "ENTRY_POINTS": entry_points_str,
+        })
     
     def _extract_results(self, analysis: Dict) -> Tuple[int, str]:
         """
@@ -232,14 +326,4 @@ class Functionality:
         Returns:
             Tuple of (score, feedback)
         """
-        try:
-            score = int(analysis.get("score", 0))
-            # Ensure score is within bounds
-            score = max(0, min(score, self.max_points))
-            
-            feedback = analysis.get("feedback", "No feedback provided.")
-            
-            return score, feedback
-        except (KeyError, ValueError) as e:
-            self.logger.error(f"Error extracting results from AI analysis: {e}")
-            return 0, "Error processing functionality analysis."
+        return extract_results(analysis, self.max_points, "functionality", self.logger)
@@ -4,12 +4,66 @@ Innovation category processor.
 This module implements the processor for the innovation category.
 """
 
+import json
 import logging
-import os
+import re
 from typing import Dict, List, Tuple
 
 from audit_near.ai_client import AiClient
-from audit_near.categories.utils import load_prompt_template
+from audit_near.categories.file_bundle import FileBundle
+from audit_near.categories.utils import (
+    compile_prompt_template, extract_results, format_file_sections, load_prompt_template
+)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# NEAR-specific patterns that mark potentially innovative code
+_INNOVATIVE_PATTERN_RE = re.compile("|".join(map(re.escape, [
+    "near.call", "near.view", "near.connectWallet", 
+    "Contract", "NearBindgen", "near_bindgen", 
+    "AccountId", "Promise", "cross_contract_call"
+])))
+
+
+# Suffixes of the code files searched for innovative patterns
+_CODE_SUFFIXES = (".js", ".ts", ".jsx", ".tsx", ".rs", ".py", ".sol")
+
+# Suffixes of documentation files used for the project summary
+_DOC_SUFFIXES = (".md", ".txt")
+
+
+def _line_window(text: str, pos: int, before: int, after: int) -> str:
+    """
+    Slice the lines around a position out of a text without splitting it.
+    
+    Args:
+        text: Text to slice
+        pos: Offset inside the centre line
+        before: Number of lines to include before the centre line
+        after: Number of lines to include from the centre line onwards
+        
+    Returns:
+        The selected lines, without a trailing newline
+    """
+    start = text.rfind("\n", 0, pos) + 1
+    for _ in range(before):
+        if start == 0:
+            break
+        start = text.rfind("\n", 0, start - 1) + 1
+    
+    end = text.rfind("\n", 0, pos)
+    for _ in range(after):
+        end = text.find("\n", end + 1)
+        if end == -1:
+            # The last line ends the text, with or without a newline
+            end = len(text) - text.endswith("\n")
+            break
+    
+    return text[start:end]
 
 
 class Innovation:
@@ -75,34 +129,36 @@ class Innovation:
         Returns:
             Project summary as a string
         """
+        # Index the first row of each lowercased path, so the known file names
+        # below are dictionary lookups and only the files used are read
+        bundle = FileBundle.of(files)
+        row_by_name = {}
+        for i, path_lower in enumerate(bundle.paths_lower):
+            row_by_name.setdefault(path_lower, i)
+        
         # Look for README files
-        readme = next(
-            (content for path, content in files if path.lower() == "readme.md"), 
-            None
-        )
+        readme_row = row_by_name.get("readme.md")
+        readme = bundle.contents[readme_row] if readme_row is not None else None
         
         if readme:
             return readme
         
         # Look for other documentation files
-        docs = [
-            content for path, content in files
-            if path.lower().endswith((".md", ".txt")) and "doc" in path.lower()
+        doc_rows = [
+            i for i, path_lower in enumerate(bundle.paths_lower)
+            if path_lower.endswith(_DOC_SUFFIXES) and "doc" in path_lower
         ]
         
-        if docs:
-            return "\n\n".join(docs[:3])  # Combine up to 3 doc files
+        if doc_rows:
+            return "\n\n".join(bundle.contents[i] for i in doc_rows[:3])  # Combine up to 3 doc files
         
         # As a fallback, look for package.json, Cargo.toml, or similar
-        package_json = next(
-            (content for path, content in files if path.lower() == "package.json"),
-            None
-        )
+        package_json_row = row_by_name.get("package.json")
+        package_json = bundle.contents[package_json_row] if package_json_row is not None else None
         
         if package_json:
             try:
-                import json
-                pkg_data = json.loads(package_json)
+                pkg_data = orjson.loads(package_json) if orjson is not None else json.loads(package_json)
                 
                 summary_parts = []
                 if "name" in pkg_data:
@@ -116,7 +172,7 @@ class Innovation:
         
         # If nothing else, return a brief summary based on directory structure
         dirs = set()
-        for path, _ in files:
+        for path in bundle.paths:
             parts = path.split("/")
             if len(parts) > 1:
                 dirs.add(parts[0])
@@ -133,39 +189,35 @@ class Innovation:
         Returns:
             List of (file_path, snippet) tuples for innovative code patterns
         """
-        # Look for NEAR-specific patterns
-        near_patterns = [
-            "near.call", "near.view", "near.connectWallet", 
-            "Contract", "NearBindgen", "near_bindgen", 
-            "AccountId", "Promise", "cross_contract_call"
-        ]
-        
         innovative_snippets = []
         
-        for path, content in files:
+        # Sizes come from the bundle, so skipped files are never read
+        bundle = FileBundle.of(files)
+        
+        for i, path in enumerate(bundle.paths):
             # Skip non-code files
-            if not any(path.endswith(ext) for ext in [".js", ".ts", ".jsx", ".tsx", ".rs", ".py", ".sol"]):
+            if not path.endswith(_CODE_SUFFIXES):
                 continue
-                
+            
             # Skip very large files
-            if len(content) > 50000:
+            if bundle.sizes[i] > 50000:
                 continue
-                
-            # Look for NEAR-specific patterns
-            lines = content.splitlines()
             
-            for i, line in enumerate(lines):
-                if any(pattern in line for pattern in near_patterns):
-                    # Extract a snippet around this line
-                    start = max(0, i - 5)
-                    end = min(len(lines), i + 5)
-                    
-                    snippet = "\n".join(lines[start:end])
-                    innovative_snippets.append((path, snippet))
-                    break  # Only one snippet per file
-        
-        # Take up to 5 snippets
-        return innovative_snippets[:5]
+            content = bundle.contents[i]
+            
+            # Look for NEAR-specific patterns (only one snippet per file)
+            match = _INNOVATIVE_PATTERN_RE.search(content)
+            
+            if match:
+                # Extract a snippet around this line by slicing at newline offsets
+                snippet = _line_window(content, match.start(), 5, 5)
+                innovative_snippets.append((path, snippet))
+                
+                # Take up to 5 snippets; later files need not be read
+                if len(innovative_snippets) == 5:
+                    break
+        
+        return innovative_snippets
     
     def _build_prompt(self, project_summary: str, innovative_patterns: List[Tuple[str, str]]) -> str:
         """
@@ -179,18 +231,13 @@ class Innovation:
             Prompt string
         """
         # Format innovative patterns
-        patterns_content = []
-        for path, snippet in innovative_patterns:
-            patterns_content.append(f"File: {path}\n\n```\n{snippet}\n```\n")
-        
-        patterns_str = "\n".join(patterns_content)
+        patterns_str = format_file_sections(innovative_patterns)
         
         # Replace placeholders in prompt template
-        prompt = self.prompt_template
-        prompt = prompt.replace("{PROJECT_SUMMARY}", project_summary)
-        prompt = prompt.replace("{INNOVATIVE_PATTERNS}", patterns_str)
-        
-        return prompt
+        return compile_prompt_template(self.prompt_template).render({
+            "PROJECT_SUMMARY": project_summary,
+            "INNOVATIVE_PATTERNS": patterns_str,
+        })
     
     def _extract_results(self, analysis: Dict) -> Tuple[int, str]:
         """
@@ -202,14 +249,4 @@ class Innovation:
         Returns:
             Tuple of (score, feedback)
         """
-        try:
-            score = int(analysis.get("score", 0))
-            # Ensure score is within bounds
-            score = max(0, min(score, self.max_points))
-            
-            feedback = analysis.get("feedback", "No feedback provided.")
-            
-            return score, feedback
-        except (KeyError, ValueError) as e:
-            self.logger.error(f"Error extracting results from AI analysis: {e}")
-            return 0, "Error processing innovation analysis."
+        return extract_results(analysis, self.max_points, "innovation", self.logger)
@@ -0,0 +1,129 @@
+"""
+Category orchestration.
+
+This module runs a set of category processors against a repository, issuing
+their AI requests together instead of one category at a time.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from audit_near.ai_client import AiClient
+from audit_near.categories.base_category import BaseCategory
+from audit_near.categories.file_bundle import FileBundle
+from audit_near.providers.repo_analyzer import RepoAnalyzer
+
+
+def process_categories(
+    handlers: Dict[str, Any],
+    files: List[Tuple[str, str]],
+    ai_client: AiClient,
+    repo_analyzer: Optional[RepoAnalyzer] = None,
+    on_result: Optional[Callable[[str, Union[Tuple[int, str], Exception]], None]] = None
+) -> Dict[str, Union[Tuple[int, str], Exception]]:
+    """
+    Process several categories, batching their AI calls.
+    
+    Handlers that provide prepare_prompt() and finalize() have their prompts
+    built first and their AI requests dispatched concurrently through
+    AiClient.analyze_batch(), and each is finalized as soon as its analysis
+    arrives. Other handlers fall back to process(), which runs on worker
+    threads alongside the batch, since each process() call mostly waits on
+    its own AI request.
+    
+    The files are converted to a FileBundle once, so per-file metadata is
+    shared by all categories. When a repository analyzer is given, it is
+    shared by every BaseCategory handler so the repository is only analyzed
+    once. The files are also registered with the AI client, which can then
+    serve them on request when prompts carry a file index.
+    
+    Args:
+        handlers: Dictionary mapping category names to category processors
+        files: List of (file_path, file_content) tuples
+        ai_client: AI client instance
+        repo_analyzer: Optional RepoAnalyzer shared by all handlers
+        on_result: Optional function called with each category name and
+            result as soon as that category finishes, in completion order
+        
+    Returns:
+        Dictionary mapping category names to (score, feedback) tuples, in
+        handler order. A failed category maps to the raised exception.
+    """
+    logger = logging.getLogger(__name__)
+    results = {}
+    prompts = {}
+    
+    def finish(category_name: str, result: Union[Tuple[int, str], Exception]) -> None:
+        results[category_name] = result
+        if on_result is not None:
+            on_result(category_name, result)
+    
+    def finish_analysis(category_name: str, analysis: Any) -> None:
+        if isinstance(analysis, Exception):
+            logger.error(f"Error analyzing category {category_name}: {analysis}")
+            finish(category_name, analysis)
+            return
+        
+        try:
+            result = handlers[category_name].finalize(analysis)
+        except Exception as e:
+            logger.error(f"Error finalizing category {category_name}: {e}")
+            result = e
+        finish(category_name, result)
+    
+    # Compute per-file metadata once for all categories
+    files = FileBundle.of(files)
+    
+    # Let the AI client serve files that prompts only reference
+    ai_client.register_files(files)
+    
+    if repo_analyzer is not None:
+        for handler in handlers.values():
+            if isinstance(handler, BaseCategory):
+                handler.repo_analyzer = repo_analyzer
+    
+    legacy_handlers = {
+        category_name: handler for category_name, handler in handlers.items()
+        if not (hasattr(handler, "prepare_prompt") and hasattr(handler, "finalize"))
+    }
+    
+    with ThreadPoolExecutor(max_workers=max(1, len(legacy_handlers))) as executor:
+        # Start the handlers without a prepare/finalize split right away
+        futures = {
+            category_name: executor.submit(handler.process, files)
+            for category_name, handler in legacy_handlers.items()
+        }
+        
+        # Build all remaining prompts before any batched AI call is made
+        for category_name, handler in handlers.items():
+            if category_name in legacy_handlers:
+                continue
+            try:
+                prompts[category_name] = handler.prepare_prompt(files)
+            except Exception as e:
+                logger.error(f"Error preparing category {category_name}: {e}")
+                finish(category_name, e)
+        
+        # Dispatch the AI requests together, finalizing each category as soon
+        # as its analysis arrives
+        logger.info(f"Sending {len(prompts)} category analyses to the AI client")
+        batched = list(prompts)
+        analyses = ai_client.analyze_batch(
+            [(handlers[category_name].ai_category, prompts[category_name]) for category_name in batched],
+            on_result=lambda i, analysis: finish_analysis(batched[i], analysis)
+        )
+        
+        # Finalize any analysis the client returned without reporting it
+        for category_name, analysis in zip(batched, analyses):
+            if category_name not in results:
+                finish_analysis(category_name, analysis)
+        
+        for category_name, future in futures.items():
+            try:
+                finish(category_name, future.result())
+            except Exception as e:
+                logger.error(f"Error processing category {category_name}: {e}")
+                finish(category_name, e)
+    
+    return {category_name: results[category_name] for category_name in handlers}
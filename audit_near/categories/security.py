@@ -5,11 +5,44 @@ This module implements the processor for the security category.
 """
 
 import logging
-import os
+import re
 from typing import Dict, List, Tuple
 
 from audit_near.ai_client import AiClient
-from audit_near.categories.utils import load_prompt_template
+from audit_near.categories.file_bundle import FileBundle
+from audit_near.categories.utils import compile_prompt_template, extract_results, load_prompt_template
+
+
+# File patterns that are likely to contain security-sensitive code, matched
+# anywhere in the path regardless of case
+_SENSITIVE_PATH_RE = re.compile("|".join(map(re.escape, [
+    # Smart contracts
+    ".sol", "contract", 
+    # Authentication
+    "auth", "login", "password", "token", "jwt", "session", 
+    # Financial
+    "payment", "wallet", "transaction", "transfer", 
+    # Storage
+    "database", "storage", "db", 
+    # API
+    "api", "endpoint", "route", 
+    # Configuration
+    "config", "env", ".env", 
+    # NEAR specific
+    "near", "account", "signer", "permission", "access"
+])), re.IGNORECASE)
+
+# Sensitive terms in file contents, matched case-insensitively so contents
+# never need a lowercased copy; the bytes variant scans unread files
+_SENSITIVE_CONTENT_RE = re.compile("|".join(map(re.escape, [
+    "password", "secret", "token", "api_key", "apikey", 
+    "private_key", "privatekey", "wallet", "account", 
+    "near.call", "near.view", "contract.call"
+])), re.IGNORECASE)
+_SENSITIVE_CONTENT_BYTES_RE = re.compile(_SENSITIVE_CONTENT_RE.pattern.encode(), re.IGNORECASE)
+
+# Paths of contract files, which are analyzed first
+_CONTRACT_PATH_RE = re.compile(r"contract|\.sol|\.rs", re.IGNORECASE)
 
 
 class Security:
@@ -72,63 +105,38 @@ class Security:
         Returns:
             List of (file_path, file_content) tuples for security-sensitive files
         """
-        # File patterns that are likely to contain security-sensitive code
-        sensitive_patterns = [
-            # Smart contracts
-            ".sol", "contract", 
-            # Authentication
-            "auth", "login", "password", "token", "jwt", "session", 
-            # Financial
-            "payment", "wallet", "transaction", "transfer", 
-            # Storage
-            "database", "storage", "db", 
-            # API
-            "api", "endpoint", "route", 
-            # Configuration
-            "config", "env", ".env", 
-            # NEAR specific
-            "near", "account", "signer", "permission", "access"
-        ]
+        # Limit the number of files to analyze (to avoid token limits):
+        # up to 3 contract files, which are prioritized, and up to 5 others
+        contract_rows = []
+        other_rows = []
         
-        # Filter files based on patterns
-        sensitive_files = []
+        # Sizes come from the bundle, so very large files are never read
+        bundle = FileBundle.of(files)
         
-        for path, content in files:
+        for i, path in enumerate(bundle.paths):
             # Skip binary or very large files
-            if not content or len(content) > 100000:
+            if not bundle.sizes[i] or bundle.sizes[i] > 100000:
                 continue
-                
-            # Check if path contains any sensitive pattern
-            if any(pattern in path.lower() for pattern in sensitive_patterns):
-                sensitive_files.append((path, content))
-                continue
-                
-            # Check for sensitive patterns in file content
-            content_lower = content.lower()
-            if any(
-                pattern in content_lower
-                for pattern in [
-                    "password", "secret", "token", "api_key", "apikey", 
-                    "private_key", "privatekey", "wallet", "account", 
-                    "near.call", "near.view", "contract.call"
-                ]
-            ):
-                sensitive_files.append((path, content))
-        
-        # Limit the number of files to analyze (to avoid token limits)
-        # Prioritize contract files
-        contract_files = [
-            (path, content) for path, content in sensitive_files
-            if any(term in path.lower() for term in ["contract", ".sol", ".rs"])
-        ]
-        
-        other_files = [
-            (path, content) for path, content in sensitive_files
-            if not any(term in path.lower() for term in ["contract", ".sol", ".rs"])
-        ]
+            
+            # Check if path contains any sensitive pattern, then for
+            # sensitive patterns in file content, as raw bytes if unread
+            if not _SENSITIVE_PATH_RE.search(path):
+                content = bundle.scan_content(i)
+                regex = _SENSITIVE_CONTENT_RE if isinstance(content, str) else _SENSITIVE_CONTENT_BYTES_RE
+                if not regex.search(content):
+                    continue
+            
+            if _CONTRACT_PATH_RE.search(path):
+                contract_rows.append(i)
+            else:
+                other_rows.append(i)
+            
+            # Later files cannot change the selection once both lists are full
+            if len(contract_rows) >= 3 and len(other_rows) >= 5:
+                break
         
-        # Select up to 3 contract files and up to 5 other files
-        return contract_files[:3] + other_files[:5]
+        # Map back to (path, content) tuples, reading only the selected files
+        return list(bundle.select(contract_rows[:3] + other_rows[:5]))
     
     def _build_prompt(self, sensitive_files: List[Tuple[str, str]]) -> str:
         """
@@ -141,17 +149,10 @@ class Security:
             Prompt string
         """
         # Insert file contents into the prompt
-        file_sections = []
-        
-        for path, content in sensitive_files:
-            file_sections.append(f"File: {path}\n\n```\n{content}\n```\n")
-        
-        files_content = "\n".join(file_sections)
+        files_content = self.ai_client.format_files(sensitive_files)
         
         # Replace placeholder in prompt template
-        prompt = self.prompt_template.replace("{SENSITIVE_FILES}", files_content)
-        
-        return prompt
+        return compile_prompt_template(self.prompt_template).render({"SENSITIVE_FILES": files_content})
     
     def _extract_results(self, analysis: Dict) -> Tuple[int, str]:
         """
@@ -163,14 +164,4 @@ class Security:
         Returns:
             Tuple of (score, feedback)
         """
-        try:
-            score = int(analysis.get("score", 0))
-            # Ensure score is within bounds
-            score = max(0, min(score, self.max_points))
-            
-            feedback = analysis.get("feedback", "No feedback provided.")
-            
-            return score, feedback
-        except (KeyError, ValueError) as e:
-            self.logger.error(f"Error extracting results from AI analysis: {e}")
-            return 0, "Error processing security analysis."
+        return extract_results(analysis, self.max_points, "security", self.logger)
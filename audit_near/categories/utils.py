@@ -4,15 +4,478 @@ Utility functions for category processing.
 This module provides utility functions used by multiple category processors.
 """
 
+import concurrent.futures
+import functools
+import hashlib
+import io
+import json
 import logging
+import mmap
+import multiprocessing
 import os
-from typing import Dict, List, Tuple
+import re
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Lowercase substrings that indicate each NEAR integration pattern. "near-sdk"
+# is handled separately because it overlaps the AssemblyScript SDK names and
+# only counts as the Rust SDK in .rs/.toml files.
+NEAR_PATTERN_GROUPS = {
+    "near_api_js": ["near-api-js", "@near-js"],
+    "wallet_integration": [
+        "wallet.sign", "wallet.request", "connect.wallet", "wallet.account",
+        "walletconnect", "walletrequest", "signtransaction", "requestsign"
+    ],
+    "contract_calls": [
+        "near.call", "contract.call", "call(", ".callraw", "functioncall",
+        "near.functioncall", "contractcall"
+    ],
+    "view_calls": [
+        "near.view", "contract.view", "view(", ".viewraw", "viewfunction",
+        "near.viewfunction", "contractview"
+    ],
+    "state_management": [
+        "storagemana", "persistentstor", "storage.get", "storage.set",
+        "collections::", "treemap", "lookup", "storageusage"
+    ],
+    "ft_integration": [
+        "ft_transfer", "ft_balance", "fungible_token", "ft.transfer", "ft_mint",
+        "nep141", "nep-141"
+    ],
+    "nft_integration": [
+        "nft_transfer", "nft_mint", "non_fungible_token", "nft.transfer",
+        "nep171", "nep-171"
+    ],
+    "cross_contract_calls": [
+        "promise", "ext_contract", "then(", "crosscontract", "cross_contract",
+        "callback", "after_transaction", "transaction_complete"
+    ],
+}
+
+# NEAR integration patterns as bits of an integer mask
+(
+    NEAR_API_JS, NEAR_SDK_RS, NEAR_SDK_AS, WALLET_INTEGRATION, CONTRACT_CALLS,
+    VIEW_CALLS, STATE_MANAGEMENT, FT_INTEGRATION, NFT_INTEGRATION, CROSS_CONTRACT_CALLS,
+) = (1 << i for i in range(10))
+ALL_NEAR_PATTERNS = (1 << 10) - 1
+
+NEAR_PATTERN_BITS = {
+    "near_api_js": NEAR_API_JS,
+    "near_sdk_rs": NEAR_SDK_RS,
+    "near_sdk_as": NEAR_SDK_AS,
+    "wallet_integration": WALLET_INTEGRATION,
+    "contract_calls": CONTRACT_CALLS,
+    "view_calls": VIEW_CALLS,
+    "state_management": STATE_MANAGEMENT,
+    "ft_integration": FT_INTEGRATION,
+    "nft_integration": NFT_INTEGRATION,
+    "cross_contract_calls": CROSS_CONTRACT_CALLS,
+}
+
+# Prompt labels, in the order they are listed
+_NEAR_PATTERN_LABELS = (
+    (NEAR_API_JS, "NEAR API JS"),
+    (NEAR_SDK_RS, "NEAR SDK Rust"),
+    (NEAR_SDK_AS, "NEAR SDK AssemblyScript"),
+    (WALLET_INTEGRATION, "Wallet Integration"),
+    (CONTRACT_CALLS, "Contract Calls"),
+    (VIEW_CALLS, "View Calls"),
+    (STATE_MANAGEMENT, "State Management"),
+    (FT_INTEGRATION, "Fungible Token Integration"),
+    (NFT_INTEGRATION, "NFT Integration"),
+    (CROSS_CONTRACT_CALLS, "Cross-Contract Calls"),
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _near_pattern_regex(missing: int, binary: bool = False) -> "re.Pattern":
+    """
+    Compile one regex for the NEAR patterns that have not been found yet.
+    
+    The alternation is case-insensitive and wrapped in a lookahead so that
+    overlapping matches (e.g. "ft_transfer" inside "nft_transfer") are all
+    reported. The named group that matched identifies the flag. Dropping
+    patterns once they are found keeps the scan inside the regex engine
+    instead of returning to Python for every repeated match.
+    
+    Args:
+        missing: Bitmask of the NEAR_PATTERN_BITS still to look for
+        binary: Whether to compile a pattern for bytes content (default: False)
+        
+    Returns:
+        Compiled pattern
+    """
+    alternatives = []
+    if missing & (NEAR_SDK_RS | NEAR_SDK_AS):
+        # Once the Rust SDK is found, only the AssemblyScript names matter
+        optional = "?" if missing & NEAR_SDK_RS else ""
+        alternatives.append(f"(?P<near_sdk>near-sdk(?P<near_sdk_as>-as|-bindgen){optional})")
+    for flag, group in NEAR_PATTERN_GROUPS.items():
+        if missing & NEAR_PATTERN_BITS[flag]:
+            alternatives.append(f"(?P<{flag}>{'|'.join(re.escape(p) for p in group)})")
+    
+    pattern = "(?=" + "|".join(alternatives) + ")"
+    return re.compile(pattern.encode() if binary else pattern, re.IGNORECASE)
+
+
+# Content markers of NEAR/blockchain code, matched case-insensitively so file
+# contents never need a lowercased copy
+BLOCKCHAIN_CONTENT_RE = re.compile(
+    "|".join(re.escape(p) for p in [
+        "near.call", "near.view", "near-api-js", "near-sdk",
+        "@near-js", "contract.call", "contract.view",
+        "window.near", "connect.wallet", "wallet.signTransaction"
+    ]),
+    re.IGNORECASE,
+)
+BLOCKCHAIN_CONTENT_BYTES_RE = re.compile(BLOCKCHAIN_CONTENT_RE.pattern.encode(), re.IGNORECASE)
+
+# Directory names and path substrings of blockchain-related files
+BLOCKCHAIN_DIRS = frozenset(["contract", "contracts", "blockchain", "near", "chain"])
+BLOCKCHAIN_PATH_RE = re.compile("|".join([
+    "near", "contract", "wallet", "transaction", "blockchain",
+    "token", "nft", "fungible", "account", "deploy", "gas"
+]))
+
+# A blockchain directory as a whole path component, or a blockchain pattern
+# anywhere in the path regardless of case, in one search over the original path
+BLOCKCHAIN_FILE_PATH_RE = re.compile(
+    "(?:^|/)(?:" + "|".join(sorted(BLOCKCHAIN_DIRS)) + ")(?:/|$)"
+    "|(?i:" + BLOCKCHAIN_PATH_RE.pattern + ")"
+)
+
+# Path hints for files likely to contain NEAR integration code
+_NEAR_PATH_HINT_RE = re.compile("contract|near|chain|wallet", re.IGNORECASE)
+
+
+# Pattern scanning holds the GIL, so large repositories are scanned in worker
+# processes. Below this many content bytes the process start-up costs more
+# than it saves.
+PARALLEL_SCAN_MIN_BYTES = 8 * 1024 * 1024
+_PARALLEL_SCAN_CHUNK_BYTES = 1024 * 1024
+
+# Scan workers are spawned rather than forked: audits run on orchestrator and
+# web server threads, and forking a multithreaded process can copy a lock
+# held by another thread (logging, HTTP clients) and deadlock the worker
+_SCAN_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+# NEAR pattern masks of recently scanned file sets, keyed by a digest of the
+# paths and contents, so auditing an unchanged repository again does not
+# rescan it
+_NEAR_PATTERN_CACHE_SIZE = 64
+_near_pattern_masks: Dict[bytes, int] = {}
+_near_pattern_masks_lock = threading.Lock()
+
+
+def has_blockchain_content(content: Union[str, bytes, mmap.mmap]) -> bool:
+    """
+    Check whether file content contains a NEAR/blockchain marker.
+    
+    Args:
+        content: File content, decoded, as raw bytes or as a memory map
+        
+    Returns:
+        True if any marker occurs in the content
+    """
+    regex = BLOCKCHAIN_CONTENT_RE if isinstance(content, str) else BLOCKCHAIN_CONTENT_BYTES_RE
+    return regex.search(content) is not None
+
+
+def _scan_near_patterns(files: List[Tuple[str, Union[str, bytes, mmap.mmap]]]) -> int:
+    """
+    Scan files for NEAR integration patterns.
+    
+    Args:
+        files: List of (file_path, file_content) tuples; contents may be
+            decoded text, raw bytes or a memory map
+        
+    Returns:
+        Bitmask of the NEAR_PATTERN_BITS found
+    """
+    found = 0
+    
+    for path, content in files:
+        is_rust = ".rs" in path or ".toml" in path
+        binary = not isinstance(content, str)
+        
+        regex = _near_pattern_regex(ALL_NEAR_PATTERNS & ~found, binary)
+        match = regex.search(content)
+        while match:
+            previous = found
+            flag = match.lastgroup
+            if flag == "near_sdk":
+                if is_rust:
+                    found |= NEAR_SDK_RS
+                if match.group("near_sdk_as"):
+                    found |= NEAR_SDK_AS
+            else:
+                found |= NEAR_PATTERN_BITS[flag]
+            
+            if found == ALL_NEAR_PATTERNS:
+                return found
+            
+            # Stop looking for patterns that have just been found
+            if found != previous:
+                regex = _near_pattern_regex(ALL_NEAR_PATTERNS & ~found, binary)
+            match = regex.search(content, match.start() + 1)
+    
+    return found
+
+
+def _scan_near_patterns_parallel(files: List[Tuple[str, str]], max_workers: Optional[int]) -> int:
+    """
+    Scan files for NEAR integration patterns in a process pool.
+    
+    Files are sent to the workers in chunks of roughly equal size, and pending
+    chunks are cancelled once every flag has been found.
+    
+    Args:
+        files: List of (file_path, file_content) tuples
+        max_workers: Maximum number of worker processes (default: CPU count)
+        
+    Returns:
+        Bitmask of the NEAR_PATTERN_BITS found
+    """
+    chunks = [[]]
+    chunk_bytes = 0
+    for path, content in files:
+        if chunk_bytes >= _PARALLEL_SCAN_CHUNK_BYTES:
+            chunks.append([])
+            chunk_bytes = 0
+        # Memory maps cannot be pickled, so workers receive their bytes
+        if not isinstance(content, (str, bytes)):
+            content = bytes(content)
+        chunks[-1].append((path, content))
+        chunk_bytes += len(content)
+    
+    found = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, mp_context=_SCAN_MP_CONTEXT) as executor:
+        futures = [executor.submit(_scan_near_patterns, chunk) for chunk in chunks]
+        for future in concurrent.futures.as_completed(futures):
+            found |= future.result()
+            if found == ALL_NEAR_PATTERNS:
+                for pending in futures:
+                    pending.cancel()
+                break
+    
+    return found
+
+
+def extract_near_patterns(files: List[Tuple[str, str]], max_workers: Optional[int] = None) -> int:
+    """
+    Detect which NEAR integration patterns occur in a set of files.
+    
+    Each file is scanned once with a single compiled regex, and scanning stops
+    as soon as every pattern has been found. Files whose paths look
+    blockchain-related are scanned first. Repositories with more than
+    PARALLEL_SCAN_MIN_BYTES of content are scanned in a process pool.
+    
+    Args:
+        files: List of (file_path, file_content) tuples; contents may be
+            decoded text, raw UTF-8 bytes or a memory map
+        max_workers: Maximum number of worker processes; 1 disables the
+            process pool (default: CPU count)
+        
+    Returns:
+        Bitmask of the NEAR_PATTERN_BITS found
+    """
+    # Scan files under blockchain-looking paths first; they set the most flags,
+    # so the early exit is usually reached sooner
+    likely_files, other_files = [], []
+    for file in files:
+        (likely_files if _NEAR_PATH_HINT_RE.search(file[0]) else other_files).append(file)
+    ordered_files = likely_files + other_files
+    
+    found = None
+    if max_workers != 1 and sum(len(content) for _, content in ordered_files) >= PARALLEL_SCAN_MIN_BYTES:
+        try:
+            found = _scan_near_patterns_parallel(ordered_files, max_workers)
+        except (OSError, BrokenProcessPool) as e:
+            logging.warning(f"Parallel pattern scan failed, scanning serially: {e}")
+    
+    if found is None:
+        found = _scan_near_patterns(ordered_files)
+    
+    return found
+
+
+def _file_set_digest(files: List[Tuple[str, Union[str, bytes]]]) -> bytes:
+    """
+    Compute a digest identifying the paths and contents of a set of files.
+    
+    Text is hashed as its UTF-8 encoding, so a file gives the same digest
+    whether its content is decoded text or raw bytes.
+    
+    Args:
+        files: List of (file_path, file_content) tuples
+        
+    Returns:
+        16-byte BLAKE2b digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for path, content in files:
+        for part in (path, content):
+            if isinstance(part, str):
+                part = part.encode("utf-8", "surrogatepass")
+            # Length prefixes keep the boundaries between parts unambiguous
+            digest.update(len(part).to_bytes(8, "little"))
+            digest.update(part)
+    return digest.digest()
+
+
+def cached_near_patterns(files: List[Tuple[str, Union[str, bytes]]]) -> int:
+    """
+    Detect NEAR integration patterns, reusing the result for unchanged files.
+    
+    Hashing the contents is much cheaper than scanning them, so a repository
+    that was already scanned is answered from memory. Contents are hashed and
+    scanned as given; pass raw bytes (see FileBundle.scan_files) to avoid
+    decoding files.
+    
+    Args:
+        files: List of (file_path, file_content) tuples; contents may be
+            decoded text or raw bytes
+        
+    Returns:
+        Bitmask of the NEAR_PATTERN_BITS found
+    """
+    files = list(files)
+    key = _file_set_digest(files)
+    found = _near_pattern_masks.get(key)
+    if found is None:
+        found = extract_near_patterns(files)
+        with _near_pattern_masks_lock:
+            _near_pattern_masks[key] = found
+            if len(_near_pattern_masks) > _NEAR_PATTERN_CACHE_SIZE:
+                # Drop the oldest entry; dicts keep insertion order
+                del _near_pattern_masks[next(iter(_near_pattern_masks))]
+    
+    return found
+
+
+def format_near_patterns(patterns: int) -> str:
+    """
+    Format a NEAR pattern bitmask as a Yes/No list for a prompt.
+    
+    Args:
+        patterns: Bitmask of NEAR_PATTERN_BITS
+        
+    Returns:
+        One "- <pattern>: Yes/No" line per pattern
+    """
+    return "\n".join(
+        f"- {label}: {'Yes' if patterns & bit else 'No'}"
+        for bit, label in _NEAR_PATTERN_LABELS
+    )
+
+
+# First integer in a score given as text, e.g. "7", "7/10" or "Score: 7"
+_SCORE_RE = re.compile(r"-?\d+")
+
+
+def extract_results(
+    analysis: Dict,
+    max_points: int,
+    category_name: str,
+    logger: logging.Logger
+) -> Tuple[int, str]:
+    """
+    Extract the score and feedback from an AI analysis.
+    
+    Args:
+        analysis: Analysis results from the AI
+        max_points: Maximum number of points for the category
+        category_name: Category name used in the error feedback
+        logger: Logger for reporting an invalid score
+    
+    Returns:
+        Tuple of (score, feedback), with the score clamped to [0, max_points]
+    """
+    raw_score = analysis.get("score", 0)
+    if isinstance(raw_score, str):
+        # Text scores are read from their first integer; text without one
+        # still fails below
+        match = _SCORE_RE.search(raw_score)
+        if match:
+            raw_score = match.group()
+    try:
+        score = int(raw_score)
+    except (TypeError, ValueError) as e:
+        logger.error(f"Error extracting results from AI analysis: {e}")
+        return 0, f"Error processing {category_name} analysis."
+    
+    score = 0 if score < 0 else (max_points if score > max_points else score)
+    return score, analysis.get("feedback", "No feedback provided.")
+
+
+# Last summary serialized by format_repo_summary, as (summary, json_text)
+_summary_json_cache: Tuple[Any, str] = (None, "")
+
+
+def format_repo_summary(summary: Dict[str, Any]) -> str:
+    """
+    Serialize a repository summary as indented JSON for a prompt.
+    
+    Categories sharing one repository analysis pass the same summary object,
+    so the last result is reused when called again with that object. The
+    summary must not be modified after it has been formatted. orjson is used
+    when it is installed.
+    
+    Args:
+        summary: Repository analysis summary
+        
+    Returns:
+        Summary as JSON indented by two spaces
+    """
+    global _summary_json_cache
+    cached_summary, cached_json = _summary_json_cache
+    if cached_summary is summary:
+        return cached_json
+    
+    if orjson is not None:
+        try:
+            text = orjson.dumps(summary, option=orjson.OPT_INDENT_2).decode()
+        except TypeError:
+            # orjson rejects some values json accepts, such as non-str keys
+            text = json.dumps(summary, indent=2)
+    else:
+        text = json.dumps(summary, indent=2)
+    
+    _summary_json_cache = (summary, text)
+    return text
+
+
+@functools.lru_cache(maxsize=32)
+def _read_prompt_template(prompt_file: str, mtime_ns: int, size: int) -> str:
+    """
+    Read a prompt template, cached per file version.
+    
+    Args:
+        prompt_file: Path to the prompt template file
+        mtime_ns: Modification time of the file, part of the cache key
+        size: Size of the file, part of the cache key
+        
+    Returns:
+        Prompt template as a string
+    """
+    with open(prompt_file, "r", encoding="utf-8") as f:
+        return f.read()
 
 
 def load_prompt_template(prompt_file: str) -> str:
     """
     Load a prompt template from a file.
     
+    Templates are cached by path, modification time and size, so processors
+    created for every audit share one read while edited templates are reloaded.
+    
     Args:
         prompt_file: Path to the prompt template file
         
@@ -23,8 +486,8 @@ def load_prompt_template(prompt_file: str) -> str:
         FileNotFoundError: If the prompt file does not exist
     """
     try:
-        with open(prompt_file, "r", encoding="utf-8") as f:
-            return f.read()
+        stat = os.stat(prompt_file)
+        return _read_prompt_template(prompt_file, stat.st_mtime_ns, stat.st_size)
     except FileNotFoundError:
         logging.error(f"Prompt file not found: {prompt_file}")
         raise
@@ -33,6 +496,152 @@ def load_prompt_template(prompt_file: str) -> str:
         raise
 
 
+# {PLACEHOLDER} markers in prompt templates. Templates also contain literal
+# JSON braces, so only upper-case names count as placeholders.
+_PLACEHOLDER_RE = re.compile(r"\{([A-Z][A-Z0-9_]*)\}")
+
+
+class _PromptValues(dict):
+    """
+    Placeholder values that leave unknown placeholders in the rendered text.
+    """
+    
+    def __missing__(self, name: str) -> str:
+        return f"{{{name}}}"
+
+
+class PromptTemplate:
+    """
+    Prompt template compiled to a str.format_map format string.
+    
+    Braces outside {PLACEHOLDER} markers are escaped once when the template
+    is parsed, so rendering is a single pass of str.format_map instead of one
+    scan and copy of the whole template per placeholder.
+    """
+    
+    def __init__(self, template: str):
+        """
+        Parse a prompt template.
+        
+        Args:
+            template: Template text with {PLACEHOLDER} markers
+        """
+        self.template = template
+        pieces = _PLACEHOLDER_RE.split(template)
+        self._names = pieces[1::2]
+        self._placeholders = frozenset(self._names)
+        
+        # Escape literal braces and keep the placeholders as format fields
+        pieces[0::2] = [piece.replace("{", "{{").replace("}", "}}") for piece in pieces[0::2]]
+        pieces[1::2] = [f"{{{name}}}" for name in self._names]
+        self._format = "".join(pieces)
+    
+    @property
+    def placeholders(self) -> FrozenSet[str]:
+        """Names of the placeholders used by the template."""
+        return self._placeholders
+    
+    def render(self, values: Dict[str, str]) -> str:
+        """
+        Substitute placeholder values into the template.
+        
+        Args:
+            values: Dictionary mapping placeholder names to their text
+            
+        Returns:
+            Rendered prompt. Placeholders without a value are left as is.
+        """
+        return self._format.format_map(
+            _PromptValues((name, value) for name, value in values.items() if value is not None)
+        )
+
+
+@functools.lru_cache(maxsize=64)
+def compile_prompt_template(template: str) -> PromptTemplate:
+    """
+    Get the parsed form of a prompt template, parsing it only once.
+    
+    Args:
+        template: Template text with {PLACEHOLDER} markers
+        
+    Returns:
+        PromptTemplate for the text
+    """
+    return PromptTemplate(template)
+
+
+def format_file_sections(files: List[Tuple[str, str]]) -> str:
+    """
+    Format files as fenced code sections for inclusion in a prompt.
+    
+    Sections are written straight into a single buffer so large file bodies
+    are copied once, rather than into per-file strings and then a join.
+    
+    Args:
+        files: List of (file_path, file_content) tuples
+        
+    Returns:
+        Sections of the form "File: <path>" followed by the fenced content,
+        separated by blank lines
+    """
+    buf = io.StringIO()
+    write = buf.write
+    
+    for i, (path, content) in enumerate(files):
+        if i:
+            write("\n")
+        write("File: ")
+        write(path)
+        write("\n\n```\n")
+        write(content)
+        write("\n```\n")
+    
+    return buf.getvalue()
+
+
+def format_file_index(files: List[Tuple[str, str]], preview_chars: int = 200) -> str:
+    """
+    Format files as a compact index of paths, sizes and short previews.
+    
+    Args:
+        files: List of (file_path, file_content) tuples
+        preview_chars: Number of leading characters shown per file (default: 200)
+    
+    Returns:
+        One line per file of the form "File: <path> (<size> bytes) preview: <text>",
+        with whitespace in the preview collapsed to single spaces
+    """
+    lines = []
+    
+    for path, content in files:
+        preview = " ".join(content[:preview_chars].split())
+        lines.append(f"File: {path} ({len(content.encode('utf-8'))} bytes) preview: {preview}")
+    
+    return "\n".join(lines)
+
+
+def file_extension(path: str) -> str:
+    """
+    Get the lowercased extension of a path, like os.path.splitext(path)[1].lower().
+    
+    Only the last dot after the last separator is looked at, which avoids the
+    general-purpose splitext machinery in per-file hot paths.
+    
+    Args:
+        path: File path
+        
+    Returns:
+        Extension including the dot, or an empty string
+    """
+    dot = path.rfind(".")
+    start = max(path.rfind("/"), path.rfind(os.sep)) + 1
+    
+    # Leading dots belong to the name, as in ".gitignore"
+    if dot <= start or (path[start] == "." and not path[start:dot].strip(".")):
+        return ""
+    return path[dot:].lower()
+
+
 def group_files_by_extension(files: List[Tuple[str, str]]) -> Dict[str, List[Tuple[str, str]]]:
     """
     Group files by extension.
@@ -46,7 +655,7 @@ def group_files_by_extension(files: List[Tuple[str, str]]) -> Dict[str, List[Tup
     extensions = {}
     
     for file_path, content in files:
-        ext = os.path.splitext(file_path)[1].lower()
+        ext = file_extension(file_path)
         if ext not in extensions:
             extensions[ext] = []
         extensions[ext].append((file_path, content))
@@ -58,6 +667,9 @@ def count_lines_of_code(files: List[Tuple[str, str]]) -> int:
     """
     Count the total number of lines of code.
     
+    Lines end at "\n" (including "\r\n"), and a final line without a newline
+    counts too.
+    
     Args:
         files: List of (file_path, file_content) tuples
         
@@ -66,7 +678,8 @@ def count_lines_of_code(files: List[Tuple[str, str]]) -> int:
     """
     total_lines = 0
     
+    # Count newlines instead of building a list of lines per file
     for _, content in files:
-        total_lines += len(content.splitlines())
+        total_lines += content.count("\n") + (1 if content and not content.endswith("\n") else 0)
     
     return total_lines
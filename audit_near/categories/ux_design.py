@@ -5,11 +5,30 @@ This module implements the processor for the UX Design category.
 """
 
 import logging
-import os
+import re
 from typing import Dict, List, Tuple
 
 from audit_near.ai_client import AiClient
-from audit_near.categories.utils import load_prompt_template
+from audit_near.categories.file_bundle import FileBundle
+from audit_near.categories.utils import compile_prompt_template, extract_results, load_prompt_template
+
+
+# Suffixes of frontend files, checked with a single str.endswith call
+_FRONTEND_SUFFIXES = (".html", ".css", ".scss", ".jsx", ".tsx", ".js", ".ts", ".vue", ".svelte")
+
+# Suffixes of documentation files searched for UI descriptions
+_DOC_SUFFIXES = (".md", ".txt")
+
+# Markdown heading lines, captured so that re.split() alternates between
+# headings and the section bodies that follow them
+_HEADING_RE = re.compile(r"^([^\S\n]*#[^\n]*)$", re.MULTILINE)
+
+# Terms in headings that start a UI-related section, as whole words so that
+# e.g. "build" or "guide" do not count as "ui"
+_UI_HEADING_RE = re.compile(
+    r"\b(?:ui|ux|user interfaces?|user experiences?|design\w*|frontend|screens?\w*)\b",
+    re.IGNORECASE,
+)
 
 
 class UXDesign:
@@ -75,49 +94,33 @@ class UXDesign:
         Returns:
             List of (file_path, file_content) tuples for frontend files
         """
-        # Frontend files typically include HTML, CSS, JS/TS in UI directories
-        frontend_files = []
-        frontend_dirs = ["src", "ui", "frontend", "client", "public", "components", "pages"]
-        frontend_exts = [".html", ".css", ".scss", ".jsx", ".tsx", ".js", ".ts", ".vue", ".svelte"]
-        
-        for path, content in files:
-            # Skip large files
-            if len(content) > 50000:
+        # Frontend files typically include HTML, CSS, JS/TS, in UI directories
+        # or elsewhere, so only the file extension decides.
+        # Select a representative sample of frontend files, prioritizing UI
+        # components, pages, and stylesheets. Each file goes into the first
+        # bucket it fits, so no file is sampled twice.
+        ui_components = []
+        pages = []
+        styles = []
+        other_frontend = []
+        
+        # Sizes and lowercased paths come from the bundle, so only the
+        # sampled files are read
+        bundle = FileBundle.of(files)
+        
+        for i, (path, path_lower) in enumerate(zip(bundle.paths, bundle.paths_lower)):
+            # Check for frontend file extensions, skipping large files
+            if not path.endswith(_FRONTEND_SUFFIXES) or bundle.sizes[i] > 50000:
                 continue
-                
-            # Check if path contains a frontend directory
-            if any(frontend_dir in path.split("/") for frontend_dir in frontend_dirs):
-                if any(path.endswith(ext) for ext in frontend_exts):
-                    frontend_files.append((path, content))
-                    continue
             
-            # Check for frontend file extensions regardless of directory
-            if any(path.endswith(ext) for ext in frontend_exts):
-                frontend_files.append((path, content))
-        
-        # Select a representative sample of frontend files
-        # Prioritize UI components, pages, and stylesheets
-        ui_components = [
-            (path, content) for path, content in frontend_files
-            if "component" in path.lower() or "/ui/" in path.lower()
-        ]
-        
-        pages = [
-            (path, content) for path, content in frontend_files
-            if "page" in path.lower() or "view" in path.lower() or "screen" in path.lower()
-        ]
-        
-        styles = [
-            (path, content) for path, content in frontend_files
-            if path.endswith((".css", ".scss"))
-        ]
-        
-        other_frontend = [
-            (path, content) for path, content in frontend_files
-            if (path, content) not in ui_components and 
-               (path, content) not in pages and 
-               (path, content) not in styles
-        ]
+            if "component" in path_lower or "/ui/" in path_lower:
+                ui_components.append(i)
+            elif "page" in path_lower or "view" in path_lower or "screen" in path_lower:
+                pages.append(i)
+            elif path.endswith((".css", ".scss")):
+                styles.append(i)
+            else:
+                other_frontend.append(i)
         
         # Create a balanced sample
         sample = (
@@ -127,7 +130,7 @@ class UXDesign:
             other_frontend[:2]   # Up to 2 other frontend files
         )
         
-        return sample
+        return list(bundle.select(sample))
     
     def _extract_ui_descriptions(self, files: List[Tuple[str, str]]) -> List[str]:
         """
@@ -141,36 +144,20 @@ class UXDesign:
         """
         ui_descriptions = []
         
+        # Lowercased paths come from the bundle, so only documentation files
+        # are read
+        bundle = FileBundle.of(files)
+        
         # Look for UI descriptions in documentation
-        for path, content in files:
-            if path.lower().endswith((".md", ".txt")):
-                # Look for UI-related sections in markdown
-                lines = content.splitlines()
-                in_ui_section = False
-                section_content = []
-                
-                for line in lines:
-                    # Check for UI-related section headings
-                    if line.strip().startswith("#") and any(
-                        term in line.lower() 
-                        for term in ["ui", "user interface", "ux", "user experience", "design", "frontend", "screen"]
-                    ):
-                        if section_content:
-                            ui_descriptions.append("\n".join(section_content))
-                            section_content = []
-                        in_ui_section = True
-                        section_content.append(line)
-                    elif in_ui_section:
-                        section_content.append(line)
-                        # End section at next heading
-                        if line.strip().startswith("#"):
-                            in_ui_section = False
-                            ui_descriptions.append("\n".join(section_content))
-                            section_content = []
-                
-                # Add the last section if any
-                if in_ui_section and section_content:
-                    ui_descriptions.append("\n".join(section_content))
+        for i, path_lower in enumerate(bundle.paths_lower):
+            if path_lower.endswith(_DOC_SUFFIXES):
+                # Split into [preamble, heading, body, heading, body, ...]
+                # and keep each UI-related heading with its body, which ends
+                # at the next heading
+                parts = _HEADING_RE.split(bundle.contents[i])
+                for heading, body in zip(parts[1::2], parts[2::2]):
+                    if _UI_HEADING_RE.search(heading):
+                        ui_descriptions.append((heading + body).rstrip())
         
         return ui_descriptions
     
@@ -186,21 +173,16 @@ class UXDesign:
             Prompt string
         """
         # Format frontend files
-        frontend_files_content = []
-        for path, content in frontend_files:
-            frontend_files_content.append(f"File: {path}\n\n```\n{content}\n```\n")
-        
-        frontend_files_str = "\n".join(frontend_files_content)
+        frontend_files_str = self.ai_client.format_files(frontend_files)
         
         # Format UI descriptions
         ui_descriptions_str = "\n\n".join(ui_descriptions)
         
         # Replace placeholders in prompt template
-        prompt = self.prompt_template
-        prompt = prompt.replace("{FRONTEND_FILES}", frontend_files_str)
-        prompt = prompt.replace("{UI_DESCRIPTIONS}", ui_descriptions_str or "No UI descriptions found in documentation.")
-        
-        return prompt
+        return compile_prompt_template(self.prompt_template).render({
+            "FRONTEND_FILES": frontend_files_str,
+            "UI_DESCRIPTIONS": ui_descriptions_str or "No UI descriptions found in documentation.",
+        })
     
     def _extract_results(self, analysis: Dict) -> Tuple[int, str]:
         """
@@ -212,14 +194,4 @@ class UXDesign:
         Returns:
             Tuple of (score, feedback)
         """
-        try:
-            score = int(analysis.get("score", 0))
-            # Ensure score is within bounds
-            score = max(0, min(score, self.max_points))
-            
-            feedback = analysis.get("feedback", "No feedback provided.")
-            
-            return score, feedback
-        except (KeyError, ValueError) as e:
-            self.logger.error(f"Error extracting results from AI analysis: {e}")
-            return 0, "Error processing UX Design analysis."
+        return extract_results(analysis, self.max_points, "UX Design", self.logger)
@@ -17,9 +17,10 @@ except ImportError:
     import tomli as tomllib  # Before Python 3.11
 
 from audit_near.ai_client import AiClient
+from audit_near.categories.orchestrator import process_categories
 from audit_near.providers.repo_provider import RepoProvider
 from audit_near.providers.repo_analyzer import RepoAnalyzer
-from audit_near.reporters.markdown_reporter import MarkdownReporter
+from audit_near.reporters.markdown_reporter import MarkdownReporter, ProgressiveMarkdownWriter
 
 
 def setup_logging():
@@ -213,7 +214,7 @@ def main():
     
     # Create repo provider
     repo_provider = RepoProvider(repo_path=args.repo, branch=args.branch)
-    repo_files = repo_provider.get_files()
+    repo_files = list(repo_provider.get_file_refs())
     
     # Get category handlers with branch info
     category_handlers = get_category_handlers(config, ai_client, args.repo, args.branch)
@@ -223,35 +224,47 @@ def main():
     total_score = 0
     total_possible = 0
     
-    for category_name, handler in category_handlers.items():
-        logging.info(f"Processing category: {category_name}")
+    # Share one repository analysis between all categories
+    repo_analyzer = RepoAnalyzer(repo_path=args.repo, branch=args.branch)
+    
+    def record_result(category_name, category_result):
+        handler = category_handlers[category_name]
         
-        try:
-            score, feedback = handler.process(repo_files)
-            max_points = handler.max_points
-            
+        if isinstance(category_result, Exception):
+            logging.error(f"Error processing category {category_name}: {category_result}")
             results[category_name] = {
-                "score": score,
-                "max_points": max_points,
-                "feedback": feedback
+                "score": 0,
+                "max_points": handler.max_points,
+                "feedback": f"Error processing category: {str(category_result)}"
             }
-            
-            total_score += score
-            total_possible += max_points
-            
-            logging.info(f"Completed category {category_name}: {score}/{max_points}")
-            
-        except Exception as e:
-            logging.error(f"Error processing category {category_name}: {e}")
+        else:
+            score, feedback = category_result
             results[category_name] = {
-                "score": 0,
+                "score": score,
                 "max_points": handler.max_points,
-                "feedback": f"Error processing category: {str(e)}"
+                "feedback": feedback
             }
-            total_possible += handler.max_points
+            logging.info(f"Completed category {category_name}: {score}/{handler.max_points}")
+        
+        writer.emit_section(category_name, results[category_name])
     
-    # Generate report
+    # Write each category section to the report as soon as it finishes, so a
+    # slow category does not hold back the others; the final report below
+    # replaces this partial one
     output_path = args.output
+    try:
+        with ProgressiveMarkdownWriter(output_path) as writer:
+            process_categories(category_handlers, repo_files, ai_client, repo_analyzer, on_result=record_result)
+    finally:
+        ai_client.close()
+    
+    # Total the scores in category order
+    results = {category_name: results[category_name] for category_name in category_handlers}
+    for category_data in results.values():
+        total_score += category_data["score"]
+        total_possible += category_data["max_points"]
+    
+    # Generate report
     reporter = MarkdownReporter()
     reporter.generate_report(
         repo_path=args.repo,
@@ -0,0 +1,107 @@
+"""
+Persistent cache for LLM responses.
+
+This module provides a small SQLite-backed cache that stores parsed AI
+responses keyed by a hash of the request, so repeated audits of the same
+code do not pay for identical API calls.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Union
+
+
+class LLMCache:
+    """
+    SQLite-backed cache for LLM responses.
+    
+    Entries are keyed by a hex digest of the request and store the
+    serialized response payload together with its creation time.
+    """
+    
+    def __init__(self, path: str, ttl_seconds: Optional[float] = None, enabled: bool = True):
+        """
+        Initialize the LLM cache.
+        
+        Args:
+            path: Path to the SQLite database file
+            ttl_seconds: Maximum age of a cache entry in seconds (default: None, never expires)
+            enabled: Whether the cache is active (default: True)
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._conn = None
+        
+        if self.enabled:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            
+            # The connection is shared by the analyze_batch worker threads;
+            # access is serialized by the lock.
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "hash TEXT PRIMARY KEY, payload BLOB, created REAL)"
+            )
+            self._conn.commit()
+            self.logger.info(f"Using LLM response cache at {path}")
+    
+    def get(self, key: str) -> Optional[Union[str, bytes]]:
+        """
+        Get a cached payload.
+        
+        Args:
+            key: Cache key
+        
+        Returns:
+            Cached payload, or None if missing, expired, or the cache is disabled
+        """
+        if not self.enabled:
+            return None
+        
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created FROM responses WHERE hash = ?", (key,)
+            ).fetchone()
+        
+        if row is None:
+            return None
+        
+        payload, created = row
+        if self.ttl_seconds is not None and time.time() - created > self.ttl_seconds:
+            self.logger.debug(f"Cache entry {key[:12]} expired")
+            return None
+        
+        return payload
+    
+    def set(self, key: str, value: Union[str, bytes]) -> None:
+        """
+        Store a payload in the cache.
+        
+        Args:
+            key: Cache key
+            value: Serialized payload
+        """
+        if not self.enabled:
+            return
+        
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (hash, payload, created) VALUES (?, ?, ?)",
+                (key, value, time.time())
+            )
+            self._conn.commit()
+    
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+                self._conn = None
+            self.enabled = False
@@ -20,10 +20,30 @@ except ImportError:
     import tomli as tomllib  # Before Python 3.11
 
 from audit_near.categories.base_category import BaseCategory
+from audit_near.categories.file_bundle import FileBundle
 from audit_near.plugins.registry import registry
 from audit_near.plugins.schema import validate_plugin_config
 
 
+def _matching_rows(paths: List[str], include_patterns: List[str], exclude_patterns: List[str]) -> List[int]:
+    """
+    Find the rows whose paths match a plugin's file patterns.
+    
+    Args:
+        paths: File paths
+        include_patterns: Regexes a path must match one of, if any are given
+        exclude_patterns: Regexes a path must match none of
+        
+    Returns:
+        Indices of the matching paths, in order
+    """
+    return [
+        i for i, path in enumerate(paths)
+        if (not include_patterns or any(re.search(pattern, path) for pattern in include_patterns))
+        and not any(re.search(pattern, path) for pattern in exclude_patterns)
+    ]
+
+
 class CategoryPluginLoader:
     """
     Loader for category plugins.
@@ -160,32 +180,20 @@ class CategoryPluginLoader:
         
         # Create dynamic category class
         class DynamicCategory(BaseCategory):
+            ai_category = plugin_id
+            
             def _select_files(self, files, repo_analysis):
-                # Use patterns from plugin config
-                selected = []
-                for path, content in files:
-                    if not include_patterns or any(re.search(pattern, path) for pattern in include_patterns):
-                        if not exclude_patterns or not any(re.search(pattern, path) for pattern in exclude_patterns):
-                            selected.append((path, content))
+                # Use patterns from plugin config, matched on paths so only
+                # the selected files are read
+                bundle = FileBundle.of(files)
+                rows = _matching_rows(bundle.paths, include_patterns, exclude_patterns)
                 
-                return selected[:10]  # Limit to 10 files
+                return list(bundle.select(rows[:10]))  # Limit to 10 files
                 
             def _get_ai_analysis(self, prompt):
-                # Use a generic analysis method based on category name
-                # Try specific method first, fall back to generic ones
-                methods = [
-                    f"analyze_{plugin_id}",
-                    f"analyze_{plugin_id.split('_')[0]}",
-                    "analyze_code_quality"  # Default fallback
-                ]
-                
-                for method_name in methods:
-                    if hasattr(self.ai_client, method_name):
-                        self.logger.info(f"Using AI analysis method: {method_name}")
-                        return getattr(self.ai_client, method_name)(prompt)
-                
-                self.logger.warning(f"No specific analysis method found for {plugin_id}, using default")
-                return self.ai_client.analyze_code_quality(prompt)
+                # The AI client resolves the system prompt from the category ID,
+                # falling back to the closest known category
+                return self.ai_client.analyze(plugin_id, prompt)
         
         # Set class name and docstring
         metadata = config["metadata"]
@@ -220,54 +228,39 @@ class CategoryPluginLoader:
         
         # Create dynamic enhanced category class
         class EnhancedDynamicCategory(BaseCategory):
+            ai_category = plugin_id
+            
             def _select_files(self, files, repo_analysis):
                 # Use repository analysis for smarter file selection
                 important_files = repo_analysis.get('dependency_analysis', {}).get('important_files', [])
                 categorized_files = repo_analysis.get('categorized_files', {})
                 
-                # Apply custom patterns
-                filtered_files = []
-                for path, content in files:
-                    if not include_patterns or any(re.search(pattern, path) for pattern in include_patterns):
-                        if not exclude_patterns or not any(re.search(pattern, path) for pattern in exclude_patterns):
-                            filtered_files.append((path, content))
+                # Apply custom patterns to the paths only
+                bundle = FileBundle.of(files)
+                filtered_rows = _matching_rows(bundle.paths, include_patterns, exclude_patterns)
+                path_rows = {bundle.paths[i]: i for i in filtered_rows}
                 
                 # Build a priority selection combining important files and pattern-matched files
-                # Start with important files that also match our patterns
-                selected_paths = set()
-                for path in important_files[:5]:  # Top 5 important files
-                    if any((file_path == path for file_path, _ in filtered_files)):
-                        selected_paths.add(path)
+                # Start with important files that also match our patterns; an
+                # ordered dict keeps the selection independent of hash seeds
+                selected_paths = dict.fromkeys(
+                    path for path in important_files[:5]  # Top 5 important files
+                    if path in path_rows
+                )
                 
                 # Add remaining pattern-matched files
-                for path, content in filtered_files:
-                    selected_paths.add(path)
+                for i in filtered_rows:
+                    selected_paths[bundle.paths[i]] = None
                     if len(selected_paths) >= 10:
                         break
                 
-                # Map back to (path, content) tuples
-                path_to_content = {path: content for path, content in files}
-                selected_files = [(path, path_to_content.get(path, "")) for path in selected_paths]
-                
-                # Ensure we don't exceed token limits
-                return selected_files[:10]
+                # Read only the selected files, keeping within token limits
+                return list(bundle.select([path_rows[path] for path in selected_paths][:10]))
                 
             def _get_ai_analysis(self, prompt):
-                # Use a generic analysis method based on category name
-                # Try specific method first, fall back to generic ones
-                methods = [
-                    f"analyze_{plugin_id}",
-                    f"analyze_{plugin_id.split('_')[0]}",
-                    "analyze_code_quality"  # Default fallback
-                ]
-                
-                for method_name in methods:
-                    if hasattr(self.ai_client, method_name):
-                        self.logger.info(f"Using AI analysis method: {method_name}")
-                        return getattr(self.ai_client, method_name)(prompt)
-                
-                self.logger.warning(f"No specific analysis method found for {plugin_id}, using default")
-                return self.ai_client.analyze_code_quality(prompt)
+                # The AI client resolves the system prompt from the category ID,
+                # falling back to the closest known category
+                return self.ai_client.analyze(plugin_id, prompt)
         
         # Set class name and docstring
         metadata = config["metadata"]
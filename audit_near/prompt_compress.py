@@ -0,0 +1,93 @@
+"""
+Local prompt compression.
+
+This module provides a cheap, deterministic compression pass that removes
+tokens carrying no information for the auditor (trailing whitespace, runs of
+blank lines, license headers) before a prompt is sent to the AI model.
+"""
+
+import re
+from typing import List
+
+# Comment-only lines; "#!" shebangs and "#[...]" Rust attributes are code
+_COMMENT_LINE_RE = re.compile(r"^\s*(?:#(?![!\[])|//|/\*|\*(?=\s|/|$)|--\s)")
+
+# Prose files, where "#" starts a heading and "*" a bullet rather than a comment
+_PROSE_EXTENSIONS = (".md", ".rst", ".txt")
+
+# Header starting each file section of a prompt, as written by format_file_sections
+_FILE_HEADER = "File: "
+
+# Phrases identifying a license or copyright header
+_LICENSE_RE = re.compile(
+    r"copyright|spdx-license-identifier|licensed under|permission is hereby granted|all rights reserved",
+    re.IGNORECASE
+)
+
+
+def _is_license_block(block: List[str]) -> bool:
+    """
+    Check whether a run of comment lines is a license header.
+    
+    Args:
+        block: Consecutive comment-only lines
+    
+    Returns:
+        True if the block is a license header
+    """
+    return _LICENSE_RE.search("\n".join(block)) is not None
+
+
+def compress(text: str, strip_comments: bool = False) -> str:
+    """
+    Compress a prompt without changing its meaning for code review.
+    
+    Trailing whitespace is removed, runs of blank lines are collapsed to a
+    single blank line, and comment blocks containing license or copyright
+    notices are dropped. Identifiers, file paths and other comments are
+    kept verbatim unless strip_comments is set, because the documentation
+    and blockchain categories rely on comments and "#" also starts markdown
+    headings in the prompt templates.
+    
+    Comment handling is skipped from the header of a .md, .rst or .txt file
+    section up to the next file header, so headings and bullets in prose
+    files are always kept.
+    
+    Args:
+        text: Prompt text
+        strip_comments: Whether to drop all comment-only lines (default: False)
+    
+    Returns:
+        Compressed prompt text
+    """
+    lines = []
+    comment_block = []
+    prose = False
+    
+    def flush_comments():
+        if comment_block and not _is_license_block(comment_block):
+            lines.extend(comment_block)
+        comment_block.clear()
+    
+    for line in text.splitlines():
+        line = line.rstrip()
+        if line.startswith(_FILE_HEADER):
+            prose = line[len(_FILE_HEADER):].lower().endswith(_PROSE_EXTENSIONS)
+        elif not prose and _COMMENT_LINE_RE.match(line):
+            if not strip_comments:
+                comment_block.append(line)
+            continue
+        
+        flush_comments()
+        lines.append(line)
+    
+    flush_comments()
+    
+    # Collapse runs of blank lines, including those left by removed blocks
+    output = []
+    for line in lines:
+        if not line and (not output or not output[-1]):
+            continue
+        output.append(line)
+    
+    return "\n".join(output)
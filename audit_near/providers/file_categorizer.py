@@ -8,7 +8,25 @@ based on different assessment categories.
 import logging
 import os
 import re
-from typing import Dict, List, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
+
+
+def _union_regex(patterns: List[str]) -> Optional["re.Pattern"]:
+    """
+    Compile regex patterns into one alternation.
+    
+    The result matches wherever any of the patterns matches, so each text is
+    scanned once by the regex engine instead of once per pattern.
+    
+    Args:
+        patterns: Regex patterns
+        
+    Returns:
+        Compiled alternation, or None if there are no patterns
+    """
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
 
 
 class FileCategorizer:
@@ -179,6 +197,18 @@ class FileCategorizer:
                 r'__tests__/',
             ],
         }
+        
+        # Compile each category's pattern lists into single alternations
+        for patterns in (
+            self.near_integration_patterns,
+            self.onchain_quality_patterns,
+            self.offchain_quality_patterns,
+            self.code_quality_documentation_patterns,
+            self.technical_innovation_patterns,
+        ):
+            patterns['path_re'] = _union_regex(patterns.get('path_patterns', []))
+            patterns['content_re'] = _union_regex(patterns.get('content_patterns', []))
+            patterns['exclude_re'] = _union_regex(patterns.get('exclude_patterns', []))
     
     def categorize_files(self, files: List[Tuple[str, str]]) -> Dict[str, List[Tuple[str, str]]]:
         """
@@ -216,7 +246,8 @@ class FileCategorizer:
             # Check for Offchain Quality files
             if self._matches_category(file_path, file_name, file_ext, content, self.offchain_quality_patterns):
                 # Check exclusion patterns
-                if not any(re.search(pattern, file_path) for pattern in self.offchain_quality_patterns.get('exclude_patterns', [])):
+                exclude_re = self.offchain_quality_patterns['exclude_re']
+                if exclude_re is None or not exclude_re.search(file_path):
                     categories['offchain_quality'].append((file_path, content))
                 
             # Check for Code Quality & Documentation files
@@ -226,7 +257,8 @@ class FileCategorizer:
             # Check for Technical Innovation files
             if self._matches_category(file_path, file_name, file_ext, content, self.technical_innovation_patterns):
                 # Check exclusion patterns
-                if not any(re.search(pattern, file_path) for pattern in self.technical_innovation_patterns.get('exclude_patterns', [])):
+                exclude_re = self.technical_innovation_patterns['exclude_re']
+                if exclude_re is None or not exclude_re.search(file_path):
                     categories['technical_innovation'].append((file_path, content))
             
             # Special case for Grant Impact & Ecosystem Fit - Focus on README and design docs
@@ -258,16 +290,14 @@ class FileCategorizer:
         # Check extension
         if 'extensions' in patterns and file_ext in patterns['extensions']:
             # Check path patterns
-            if 'path_patterns' in patterns:
-                for pattern in patterns['path_patterns']:
-                    if re.search(pattern, file_path):
-                        return True
+            path_re = patterns.get('path_re')
+            if path_re is not None and path_re.search(file_path):
+                return True
             
             # Check content patterns
-            if 'content_patterns' in patterns:
-                for pattern in patterns['content_patterns']:
-                    if re.search(pattern, content):
-                        return True
+            content_re = patterns.get('content_re')
+            if content_re is not None and content_re.search(content):
+                return True
         
         # Check specific filenames
         if 'filenames' in patterns and file_name in patterns['filenames']:
@@ -45,12 +45,33 @@ class RepoAnalyzer:
         self.boilerplate_detector = BoilerplateDetector()
         self.ast_analyzer = ASTAnalyzer()
         
+        # Cached result of analyze(), shared by every caller of this instance
+        self._analysis = None
+        
         self.logger.info(f"Initialized repository analyzer for {self.repo_path}")
     
-    def analyze(self) -> Dict[str, Any]:
+    def analyze(self, refresh: bool = False) -> Dict[str, Any]:
         """
         Perform comprehensive repository analysis.
         
+        The analysis is computed once per analyzer and cached, so categories
+        sharing an analyzer do not traverse the repository again.
+        
+        Args:
+            refresh: Recompute the analysis even if it is cached (default: False)
+        
+        Returns:
+            Dictionary with analysis results
+        """
+        if self._analysis is None or refresh:
+            self._analysis = self._analyze()
+        
+        return self._analysis
+    
+    def _analyze(self) -> Dict[str, Any]:
+        """
+        Run the full repository analysis.
+        
         Returns:
             Dictionary with analysis results
         """
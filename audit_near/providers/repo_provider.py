@@ -5,16 +5,98 @@ This module implements a provider to traverse local repositories,
 yielding file paths and contents.
 """
 
+import functools
 import logging
+import mmap
 import os
 import stat
 from pathlib import Path
-from typing import Dict, Generator, List, Set, Tuple, Optional
+from typing import Any, Dict, Generator, Iterator, List, Set, Tuple, Optional, Union
 
 from audit_near.providers.base_provider import BaseProvider
 from audit_near.providers.gitignore_handler import GitIgnoreHandler
 
 
+# Files larger than this are skipped during traversal
+MAX_FILE_BYTES = 1024 * 1024
+
+# Unread files at least this large are memory-mapped for pattern scanning
+# instead of being copied into a bytes object; must stay below MAX_FILE_BYTES
+MMAP_SCAN_MIN_BYTES = 256 * 1024
+
+
+class FileRef:
+    """
+    Reference to a repository file whose content is read on first access.
+    
+    A FileRef unpacks and indexes like a (file_path, file_content) tuple, so
+    it can be used wherever file tuples are expected. Files that are never
+    looked at are never read or decoded.
+    """
+    
+    def __init__(self, path: str, abs_path: str, size: int):
+        """
+        Initialize the file reference.
+        
+        Args:
+            path: Path relative to the repository root
+            abs_path: Absolute path of the file
+            size: File size in bytes
+        """
+        self.path = path
+        self.abs_path = abs_path
+        self.size = size
+    
+    @functools.cached_property
+    def content(self) -> str:
+        """File content decoded as UTF-8, or an empty string if unreadable."""
+        try:
+            with open(self.abs_path, "r", encoding="utf-8", errors="replace") as f:
+                return f.read()
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Could not read file {self.abs_path}: {e}")
+            return ""
+    
+    @property
+    def scan_content(self) -> Union[str, bytes, mmap.mmap]:
+        """
+        Content for pattern scanning without decoding the file.
+        
+        Returns the decoded content if it has already been read, otherwise
+        the raw bytes, which are neither decoded nor cached. Files of at least
+        MMAP_SCAN_MIN_BYTES are returned as a read-only memory map, so they
+        are scanned from the page cache without a copy. Unreadable files
+        yield empty bytes.
+        """
+        if "content" in self.__dict__:
+            return self.content
+        try:
+            with open(self.abs_path, "rb") as f:
+                if self.size >= MMAP_SCAN_MIN_BYTES:
+                    # The map stays valid after the file is closed
+                    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                return f.read()
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Could not read file {self.abs_path}: {e}")
+            return b""
+    
+    def __iter__(self) -> Iterator[str]:
+        yield self.path
+        yield self.content
+    
+    def __len__(self) -> int:
+        return 2
+    
+    def __getitem__(self, index: int) -> Any:
+        # Index the path without reading the content
+        if index in (0, -2):
+            return self.path
+        return (self.path, self.content)[index]
+    
+    def __repr__(self) -> str:
+        return f"FileRef({self.path!r})"
+
+
 class RepoProvider(BaseProvider):
     """
     Provider for local repositories.
@@ -121,47 +203,161 @@ class RepoProvider(BaseProvider):
         Returns:
             Content of the file as a string, or None if file is binary
         """
-        # Skip files that are too large
         try:
-            file_size = os.path.getsize(file_path)
-            if file_size > 1024 * 1024:  # Skip files > 1MB
-                self.logger.debug(f"Skipping large file {file_path} ({file_size} bytes)")
-                return None
-                
-            # Skip files that are symlinks
-            if os.path.islink(file_path):
-                self.logger.debug(f"Skipping symlink {file_path}")
+            if not self._is_text_file(file_path):
                 return None
-                
-            # Skip files that are executable
-            mode = os.stat(file_path).st_mode
-            if mode & stat.S_IEXEC:
-                self.logger.debug(f"Skipping executable file {file_path}")
-                return None
-                
-            # Check if file is binary
-            if self._is_binary_file(file_path):
-                self.logger.debug(f"Skipping binary file {file_path}")
-                return None
-                
+            
             # Read text content
             with open(file_path, "r", encoding="utf-8", errors="replace") as f:
                 return f.read()
         except Exception as e:
             self.logger.warning(f"Could not read file {file_path}: {e}")
             return None
-
-    def get_files(self) -> Generator[Tuple[str, str], None, None]:
+    
+    def _is_text_file(self, file_path: str) -> bool:
         """
-        Get files from the repository.
+        Check whether a file is a regular text file small enough to analyze.
+        
+        Args:
+            file_path: Path to the file
+        
+        Returns:
+            False for large, symlinked, executable or binary files, True otherwise
+        """
+        # Skip files that are too large
+        file_size = os.path.getsize(file_path)
+        if file_size > MAX_FILE_BYTES:
+            self.logger.debug(f"Skipping large file {file_path} ({file_size} bytes)")
+            return False
+        
+        # Skip files that are symlinks
+        if os.path.islink(file_path):
+            self.logger.debug(f"Skipping symlink {file_path}")
+            return False
+        
+        # Skip files that are executable
+        mode = os.stat(file_path).st_mode
+        if mode & stat.S_IEXEC:
+            self.logger.debug(f"Skipping executable file {file_path}")
+            return False
+        
+        # Check if file is binary
+        if self._is_binary_file(file_path):
+            self.logger.debug(f"Skipping binary file {file_path}")
+            return False
+        
+        return True
+    
+    def _text_entry_size(self, entry: os.DirEntry, skipped: Optional[Dict[str, int]] = None) -> Optional[int]:
+        """
+        Apply the _is_text_file() checks to a directory entry.
+        
+        The symlink check uses the file type recorded by os.scandir(), and
+        size and mode come from a single lstat, instead of a separate stat
+        call for each check.
+        
+        Args:
+            entry: Directory entry of a file
+            skipped: Optional "files_skipped" counters of traversal statistics,
+                incremented by reason when the file is skipped; symlinks and
+                executables count as excluded
+        
+        Returns:
+            File size in bytes for text files, None for skipped files
+        """
+        if skipped is None:
+            skipped = self._new_traversal_stats()["files_skipped"]
+        
+        # Skip files that are symlinks
+        if entry.is_symlink():
+            self.logger.debug(f"Skipping symlink {entry.path}")
+            skipped["excluded"] += 1
+            return None
+        
+        st = entry.stat(follow_symlinks=False)
+        
+        # Skip files that are too large
+        if st.st_size > MAX_FILE_BYTES:
+            self.logger.debug(f"Skipping large file {entry.path} ({st.st_size} bytes)")
+            skipped["large"] += 1
+            return None
+        
+        # Skip files that are executable
+        if st.st_mode & stat.S_IEXEC:
+            self.logger.debug(f"Skipping executable file {entry.path}")
+            skipped["excluded"] += 1
+            return None
+        
+        # Check if file is binary
+        if self._is_binary_file(entry.path):
+            self.logger.debug(f"Skipping binary file {entry.path}")
+            skipped["binary"] += 1
+            return None
+        
+        return st.st_size
+    
+    def _walk_file_entries(self, stats: Optional[Dict] = None) -> Generator[os.DirEntry, None, None]:
+        """
+        Walk the repository with os.scandir(), yielding non-excluded files.
+        
+        Visits directories in the same order as a sorted, top-down os.walk():
+        each directory's files first, then its subdirectories. Symlinked
+        directories are not followed.
+        
+        Args:
+            stats: Optional traversal statistics, as logged by
+                _log_traversal_stats(), updated with every file found and
+                every file excluded by pattern
         
         Yields:
-            Tuples of (file_path, file_content)
+            Directory entries of the files
         """
-        self.logger.info(f"Traversing repository: {self.repo_path}")
+        pending = [self.repo_path]
+        
+        while pending:
+            directory = pending.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError as e:
+                self.logger.warning(f"Could not list directory {directory}: {e}")
+                continue
+            
+            subdirs = []
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                
+                if not is_dir and stats is not None:
+                    stats["total_files_found"] += 1
+                
+                if self._is_excluded(entry.path):
+                    if not is_dir and stats is not None:
+                        stats["files_skipped"]["excluded"] += 1
+                        ext = os.path.splitext(entry.name)[1].lower()
+                        stats["excluded_extensions"][ext] = stats["excluded_extensions"].get(ext, 0) + 1
+                    continue
+                
+                if not is_dir:
+                    yield entry
+                elif not entry.is_symlink():
+                    subdirs.append(entry.path)
+            
+            # Visit subdirectories in sorted order
+            pending.extend(reversed(subdirs))
+    
+    @staticmethod
+    def _new_traversal_stats() -> Dict:
+        """
+        Create empty repository traversal statistics.
         
-        # Track statistics for debugging
-        stats = {
+        Returns:
+            Dictionary of file counts, skip counts by reason, and file counts
+            by extension for included and excluded files
+        """
+        return {
             "total_files_found": 0,
             "files_skipped": {
                 "excluded": 0,
@@ -169,12 +365,110 @@ class RepoProvider(BaseProvider):
                 "large": 0,
                 "error": 0
             },
-            "files_included": 0
+            "files_included": 0,
+            "included_extensions": {},
+            "excluded_extensions": {},
         }
+    
+    def _log_traversal_stats(self, stats: Dict) -> None:
+        """
+        Log summary statistics of a repository traversal.
         
-        # Track file types
-        included_extensions = {}
-        excluded_extensions = {}
+        Warns, with a listing of the repository root, when no files were
+        included.
+        
+        Args:
+            stats: Traversal statistics from _new_traversal_stats()
+        """
+        self.logger.info(f"Repository traversal complete:")
+        self.logger.info(f"  Total files found: {stats['total_files_found']}")
+        self.logger.info(f"  Files included: {stats['files_included']}")
+        self.logger.info(f"  Files excluded: {sum(stats['files_skipped'].values())}")
+        self.logger.info(f"    - Excluded by patterns: {stats['files_skipped']['excluded']}")
+        self.logger.info(f"    - Binary files: {stats['files_skipped']['binary']}")
+        self.logger.info(f"    - Large files: {stats['files_skipped']['large']}")
+        self.logger.info(f"    - Error reading: {stats['files_skipped']['error']}")
+        
+        # Log file extensions
+        if stats["included_extensions"]:
+            self.logger.info("Included file extensions:")
+            for ext, count in sorted(stats["included_extensions"].items(), key=lambda x: x[1], reverse=True):
+                self.logger.info(f"  {ext}: {count}")
+        
+        if stats["excluded_extensions"]:
+            self.logger.debug("Excluded file extensions:")
+            for ext, count in sorted(stats["excluded_extensions"].items(), key=lambda x: x[1], reverse=True)[:10]:
+                self.logger.debug(f"  {ext}: {count}")
+                
+        # Sanity check - if we didn't include any files, log a warning
+        if stats["files_included"] == 0:
+            self.logger.warning("!!!!! WARNING: No files were included from the repository !!!!!")
+            self.logger.warning(f"Repository path: {self.repo_path}")
+            self.logger.warning(f"Does this path exist and contain source code files?")
+            self.logger.warning(f"Total files found: {stats['total_files_found']}")
+            # List the root directory to help debug
+            try:
+                if os.path.exists(self.repo_path) and os.path.isdir(self.repo_path):
+                    self.logger.warning(f"Contents of root directory:")
+                    for item in os.listdir(self.repo_path):
+                        item_path = os.path.join(self.repo_path, item)
+                        if os.path.isdir(item_path):
+                            self.logger.warning(f"  DIR: {item}")
+                        else:
+                            self.logger.warning(f"  FILE: {item}")
+                else:
+                    self.logger.warning(f"Repository path does not exist or is not a directory!")
+            except Exception as e:
+                self.logger.warning(f"Error listing repository directory: {e}")
+    
+    def get_file_refs(self) -> Generator[FileRef, None, None]:
+        """
+        Get lazily read files from the repository.
+        
+        Applies the same exclusion, size and binary checks as get_files(), but
+        only sniffs the start of each file; the full content is read when a
+        consumer first accesses it. Directories and files are visited in
+        sorted order so repeated audits build byte-identical prompts.
+        
+        Yields:
+            FileRef instances, which unpack as (file_path, file_content)
+        """
+        self.logger.info(f"Traversing repository: {self.repo_path}")
+        
+        stats = self._new_traversal_stats()
+        
+        for entry in self._walk_file_entries(stats):
+            ext = os.path.splitext(entry.name)[1].lower()
+            try:
+                size = self._text_entry_size(entry, stats["files_skipped"])
+            except Exception as e:
+                self.logger.warning(f"Could not read file {entry.path}: {e}")
+                stats["files_skipped"]["error"] += 1
+                continue
+            
+            if size is None:
+                stats["excluded_extensions"][ext] = stats["excluded_extensions"].get(ext, 0) + 1
+                continue
+            
+            stats["files_included"] += 1
+            stats["included_extensions"][ext] = stats["included_extensions"].get(ext, 0) + 1
+            yield FileRef(os.path.relpath(entry.path, self.repo_path), entry.path, size)
+        
+        self._log_traversal_stats(stats)
+    
+    def get_files(self) -> Generator[Tuple[str, str], None, None]:
+        """
+        Get files from the repository.
+        
+        Yields:
+            Tuples of (file_path, file_content)
+        """
+        self.logger.info(f"Traversing repository: {self.repo_path}")
+        
+        # Track statistics and file types for debugging
+        stats = self._new_traversal_stats()
+        included_extensions = stats["included_extensions"]
+        excluded_extensions = stats["excluded_extensions"]
         
         for root, dirs, files in os.walk(self.repo_path):
             # Filter out excluded directories
@@ -188,7 +482,10 @@ class RepoProvider(BaseProvider):
             if excluded_dirs:
                 self.logger.debug(f"Excluded directories in {root}: {excluded_dirs}")
             
-            for file in files:
+            # Visit directories and files in a stable order
+            dirs.sort()
+            
+            for file in sorted(files):
                 file_path = os.path.join(root, file)
                 stats["total_files_found"] += 1
                 
@@ -212,7 +509,7 @@ class RepoProvider(BaseProvider):
                 # Check file size
                 try:
                     file_size = os.path.getsize(file_path)
-                    if file_size > 1024 * 1024:  # Skip files > 1MB
+                    if file_size > MAX_FILE_BYTES:
                         self.logger.debug(f"Skipping large file {file_path} ({file_size} bytes)")
                         stats["files_skipped"]["large"] += 1
                         excluded_extensions[ext] = excluded_extensions.get(ext, 0) + 1
@@ -237,44 +534,4 @@ class RepoProvider(BaseProvider):
                 
                 yield rel_path, content
         
-        # Log summary statistics
-        self.logger.info(f"Repository traversal complete:")
-        self.logger.info(f"  Total files found: {stats['total_files_found']}")
-        self.logger.info(f"  Files included: {stats['files_included']}")
-        self.logger.info(f"  Files excluded: {sum(stats['files_skipped'].values())}")
-        self.logger.info(f"    - Excluded by patterns: {stats['files_skipped']['excluded']}")
-        self.logger.info(f"    - Binary files: {stats['files_skipped']['binary']}")
-        self.logger.info(f"    - Large files: {stats['files_skipped']['large']}")
-        self.logger.info(f"    - Error reading: {stats['files_skipped']['error']}")
-        
-        # Log file extensions
-        if included_extensions:
-            self.logger.info("Included file extensions:")
-            for ext, count in sorted(included_extensions.items(), key=lambda x: x[1], reverse=True):
-                self.logger.info(f"  {ext}: {count}")
-        
-        if excluded_extensions:
-            self.logger.debug("Excluded file extensions:")
-            for ext, count in sorted(excluded_extensions.items(), key=lambda x: x[1], reverse=True)[:10]:
-                self.logger.debug(f"  {ext}: {count}")
-                
-        # Sanity check - if we didn't include any files, log a warning
-        if stats["files_included"] == 0:
-            self.logger.warning("!!!!! WARNING: No files were included from the repository !!!!!")
-            self.logger.warning(f"Repository path: {self.repo_path}")
-            self.logger.warning(f"Does this path exist and contain source code files?")
-            self.logger.warning(f"Total files found: {stats['total_files_found']}")
-            # List the root directory to help debug
-            try:
-                if os.path.exists(self.repo_path) and os.path.isdir(self.repo_path):
-                    self.logger.warning(f"Contents of root directory:")
-                    for item in os.listdir(self.repo_path):
-                        item_path = os.path.join(self.repo_path, item)
-                        if os.path.isdir(item_path):
-                            self.logger.warning(f"  DIR: {item}")
-                        else:
-                            self.logger.warning(f"  FILE: {item}")
-                else:
-                    self.logger.warning(f"Repository path does not exist or is not a directory!")
-            except Exception as e:
-                self.logger.warning(f"Error listing repository directory: {e}")
+        self._log_traversal_stats(stats)
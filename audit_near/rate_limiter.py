@@ -0,0 +1,162 @@
+"""
+Client-side rate limiting for OpenAI requests.
+
+This module provides a token-bucket limiter that tracks both requests per
+minute and tokens per minute, so concurrent analyses stay under the API
+limits instead of failing with rate-limit errors.
+"""
+
+import functools
+import hashlib
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+# Token counts of recently measured texts, keyed by model and a digest of the
+# text, so re-estimating the same prompt does not tokenize it again
+_TOKEN_COUNT_CACHE_SIZE = 4096
+_token_counts: Dict[Tuple[str, bytes], int] = {}
+_token_counts_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model: str) -> "tiktoken.Encoding":
+    """
+    Get the tokenizer for a model.
+    
+    Args:
+        model: Model name
+    
+    Returns:
+        The model's encoding, or o200k_base for unknown models
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def estimate_tokens(text: str, model: str) -> int:
+    """
+    Estimate the number of tokens in a text.
+    
+    Args:
+        text: Text to measure
+        model: Model name, used to select the tokenizer
+    
+    Returns:
+        Estimated token count
+    """
+    if tiktoken is None:
+        # Roughly four characters per token for English text and code
+        return len(text) // 4 + 1
+    
+    key = (model, hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest())
+    count = _token_counts.get(key)
+    if count is None:
+        count = len(_encoding(model).encode(text))
+        with _token_counts_lock:
+            _token_counts[key] = count
+            if len(_token_counts) > _TOKEN_COUNT_CACHE_SIZE:
+                # Drop the oldest entry; dicts keep insertion order
+                del _token_counts[next(iter(_token_counts))]
+    
+    return count
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for requests and tokens per minute.
+    
+    Each bucket holds up to one minute's allowance and refills continuously.
+    A request is admitted once both buckets can cover it.
+    """
+    
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        """
+        Initialize the rate limiter.
+        
+        Args:
+            requests_per_minute: Request limit (default: None, unlimited)
+            tokens_per_minute: Token limit (default: None, unlimited)
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._available_requests = requests_per_minute or 0
+        self._available_tokens = tokens_per_minute or 0
+        self._last_update = time.monotonic()
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether any limit is configured."""
+        return bool(self.requests_per_minute or self.tokens_per_minute)
+    
+    def _reserve(self, tokens: int) -> float:
+        """
+        Try to take capacity for one request from both buckets.
+        
+        Args:
+            tokens: Estimated tokens used by the request
+        
+        Returns:
+            0 if the request was admitted, otherwise the number of seconds to
+            wait before trying again
+        """
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._last_update
+            self._last_update = now
+            
+            wait = 0.0
+            if self.requests_per_minute:
+                rate = self.requests_per_minute / 60
+                self._available_requests = min(
+                    self.requests_per_minute, self._available_requests + elapsed * rate
+                )
+                if self._available_requests < 1:
+                    wait = max(wait, (1 - self._available_requests) / rate)
+            
+            if self.tokens_per_minute:
+                # A request larger than the bucket only has to wait for a full bucket
+                tokens = min(tokens, self.tokens_per_minute)
+                rate = self.tokens_per_minute / 60
+                self._available_tokens = min(
+                    self.tokens_per_minute, self._available_tokens + elapsed * rate
+                )
+                if self._available_tokens < tokens:
+                    wait = max(wait, (tokens - self._available_tokens) / rate)
+            
+            if wait > 0:
+                return wait
+            
+            if self.requests_per_minute:
+                self._available_requests -= 1
+            if self.tokens_per_minute:
+                self._available_tokens -= tokens
+            return 0.0
+    
+    def acquire(self, tokens: int = 0) -> None:
+        """
+        Block until a request using the given number of tokens may be sent.
+        
+        Args:
+            tokens: Estimated tokens used by the request (default: 0)
+        """
+        if not self.enabled:
+            return
+        
+        while True:
+            wait = self._reserve(tokens)
+            if not wait:
+                return
+            self.logger.debug("Rate limiter waiting %.2fs", wait)
+            time.sleep(wait)
@@ -7,7 +7,76 @@ This module implements a reporter that generates a Markdown report from audit re
 import logging
 import os
 from datetime import datetime
-from typing import Dict
+from typing import Dict, List
+
+
+def format_category_section(category_name: str, category_data: Dict) -> List[str]:
+    """
+    Format the detailed feedback section for one category.
+    
+    Args:
+        category_name: Category name
+        category_data: Dictionary containing score, max_points, and feedback
+        
+    Returns:
+        List of Markdown lines
+    """
+    display_name = category_name.replace("_", " ").title()
+    score = category_data["score"]
+    max_points = category_data["max_points"]
+    feedback = category_data["feedback"]
+    
+    return [
+        f"### {display_name} ({score}/{max_points})",
+        f"",
+        feedback,
+        f"",
+    ]
+
+
+class ProgressiveMarkdownWriter:
+    """
+    Writer that appends category sections to a Markdown file as they complete.
+    
+    This lets a partial report be inspected while slower categories are still
+    being analyzed. The final report from MarkdownReporter replaces it.
+    """
+    
+    def __init__(self, output_path: str, title: str = "NEAR Hackathon Project Audit Report (in progress)"):
+        """
+        Initialize the progressive writer and write the report header.
+        
+        Args:
+            output_path: Path to write the partial report to
+            title: Report title (default: in-progress audit report title)
+        """
+        self.output_path = output_path
+        self.logger = logging.getLogger(__name__)
+        self._file = open(output_path, "w", encoding="utf-8")
+        self._file.write(f"# {title}\n\n## Detailed Feedback\n\n")
+        self._file.flush()
+    
+    def emit_section(self, category_name: str, category_data: Dict) -> None:
+        """
+        Append a category section and flush it to disk.
+        
+        Args:
+            category_name: Category name
+            category_data: Dictionary containing score, max_points, and feedback
+        """
+        self._file.write("\n".join(format_category_section(category_name, category_data)) + "\n")
+        self._file.flush()
+        self.logger.info(f"Wrote {category_name} section to {self.output_path}")
+    
+    def close(self) -> None:
+        """Close the partial report file."""
+        self._file.close()
+    
+    def __enter__(self) -> "ProgressiveMarkdownWriter":
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
 
 
 class MarkdownReporter:
@@ -164,15 +233,7 @@ class MarkdownReporter:
         report.append(f"")
         
         for category_name, category_data in results.items():
-            display_name = category_name.replace("_", " ").title()
-            score = category_data["score"]
-            max_points = category_data["max_points"]
-            feedback = category_data["feedback"]
-            
-            report.append(f"### {display_name} ({score}/{max_points})")
-            report.append(f"")
-            report.append(feedback)
-            report.append(f"")
+            report.extend(format_category_section(category_name, category_data))
         
         # Add footer
         report.append(f"---")
@@ -68,6 +68,7 @@ with app.app_context():
 
 # Import audit functionality
 from audit_near.cli import load_config, get_category_handlers
+from audit_near.categories.orchestrator import process_categories
 from audit_near.ai_client import AiClient
 from audit_near.providers.repo_provider import RepoProvider
 from audit_near.providers.repo_analyzer import RepoAnalyzer
@@ -848,6 +849,7 @@ def run_audit_in_background(progress_id, repo_path, branch, config):
         config: Configuration dictionary
     """
     progress = audit_progress_store[progress_id]
+    ai_client = None
     
     try:
         # Initialize AI client
@@ -906,8 +908,8 @@ def run_audit_in_background(progress_id, repo_path, branch, config):
             "Collecting files from repository..."
         )
         
-        # Get files from repo
-        files = list(repo_provider.get_files())
+        # Get files from repo; contents are read when a category first needs them
+        files = list(repo_provider.get_file_refs())
         
         # Log detailed information about the files being processed
         logger.info(f"Repository: {repo_path}, Branch: {branch}")
@@ -966,17 +968,19 @@ def run_audit_in_background(progress_id, repo_path, branch, config):
         analysis_increment = 90 // len(category_handlers) if category_handlers else 90
         analysis_progress = 5  # Start at 5%
         
+        # Build every category prompt, then send the AI requests together
+        progress.update_step_progress(
+            AuditStep.CODE_ANALYSIS, 
+            analysis_progress,
+            f"Analyzing {len(category_handlers)} categories..."
+        )
+        category_results = process_categories(category_handlers, files, ai_client, repo_analyzer)
+        
         for category_name, handler in category_handlers.items():
-            # Update progress for this category
-            progress.update_step_progress(
-                AuditStep.CODE_ANALYSIS, 
-                analysis_progress + analysis_increment // 2,
-                f"Analyzing {category_name}..."
-            )
-            
-            # Process the category
-            logger.info(f"Processing category: {category_name}")
-            score, feedback = handler.process(files)
+            category_result = category_results[category_name]
+            if isinstance(category_result, Exception):
+                raise category_result
+            score, feedback = category_result
             
             # Update progress
             max_points = config['categories'][category_name]['max_points']
@@ -1124,6 +1128,9 @@ def run_audit_in_background(progress_id, repo_path, branch, config):
     except Exception as e:
         logger.exception("Error running audit")
         progress.set_error(f"Error running audit: {str(e)}")
+    finally:
+        if ai_client is not None:
+            ai_client.close()
 
 @app.route('/run-audit')
 def run_audit():
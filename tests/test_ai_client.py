@@ -0,0 +1,437 @@
+"""
+Tests for the AI client.
+"""
+
+import json
+import time
+import unittest
+from unittest import mock
+
+import httpx
+from openai import BadRequestError
+
+from audit_near import ai_client as ai_client_module
+from audit_near.ai_client import AiClient
+
+
+def _make_response(content):
+    """Build a minimal chat completion response object."""
+    message = mock.MagicMock()
+    message.content = content
+    choice = mock.MagicMock()
+    choice.message = message
+    response = mock.MagicMock()
+    response.choices = [choice]
+    return response
+
+
+class TestAiClient(unittest.TestCase):
+    """
+    Tests for the AiClient class.
+    """
+    
+    def setUp(self):
+        """Set up test environment before each test."""
+        self.config = {"ai": {"primary_model": "test-model", "nano_model": "test-nano"}}
+        self.ai_client = AiClient(api_key="test-key", config=self.config)
+    
+    def test_streamed_response_is_assembled(self):
+        """Test that streamed chunks are joined before parsing."""
+        def make_chunk(text):
+            chunk = mock.MagicMock()
+            chunk.choices[0].delta.content = text
+            return chunk
+        
+        def create(**kwargs):
+            self.assertTrue(kwargs["stream"])
+            return iter([make_chunk(text) for text in ['{"score": ', None, '8, "feedback": "ok"}']])
+        
+        self.ai_client.stream = True
+        self.ai_client.client = mock.MagicMock()
+        self.ai_client.client.chat.completions.create = create
+        
+        result = self.ai_client.analyze("security", "def main(): pass")
+        
+        self.assertEqual(result, {"score": 8, "feedback": "ok"})
+    
+    def test_analyze_bundle_falls_back_for_missing_categories(self):
+        """Test that a bundled call fills gaps with individual requests."""
+        self.ai_client.client = mock.MagicMock()
+        self.ai_client.client.chat.completions.create.side_effect = [
+            _make_response('{"security": {"score": 6, "feedback": "ok"}, "innovation": "bad"}'),
+            _make_response('{"score": 8, "feedback": "retried"}'),
+        ]
+        
+        results = self.ai_client.analyze_bundle({
+            "security": "def main(): pass",
+            "innovation": "def main(): pass",
+        })
+        
+        self.assertEqual(results["security"]["score"], 6)
+        self.assertEqual(results["innovation"]["feedback"], "retried")
+        calls = self.ai_client.client.chat.completions.create.call_args_list
+        self.assertEqual(len(calls), 2)
+        self.assertIn("2 independent evaluations", calls[0].kwargs["messages"][0]["content"])
+    
+    def test_analyze_batch_bundles_distinct_categories_when_enabled(self):
+        """Test that bundle_requests sends distinct categories through analyze_bundle."""
+        self.ai_client.bundle_requests = True
+        bundled = {"security": {"score": 6, "feedback": "ok"}, "innovation": RuntimeError("boom")}
+        reported = []
+        
+        with mock.patch.object(self.ai_client, "analyze_bundle", return_value=bundled) as bundle, \
+                mock.patch.object(self.ai_client, "analyze", return_value={"score": 1, "feedback": "single"}):
+            results = self.ai_client.analyze_batch(
+                [("security", "a"), ("innovation", "b")],
+                on_result=lambda i, result: reported.append(i)
+            )
+            bundle.assert_called_once_with({"security": "a", "innovation": "b"})
+            
+            # Repeated categories cannot share a bundle, so they are sent individually
+            repeated = self.ai_client.analyze_batch([("security", "a"), ("security", "b")])
+            bundle.assert_called_once()
+        
+        self.assertEqual(results[0]["score"], 6)
+        self.assertIsInstance(results[1], RuntimeError)
+        self.assertEqual(reported, [0, 1])
+        self.assertEqual([result["feedback"] for result in repeated], ["single", "single"])
+    
+    def test_analyze_batch_preserves_request_order(self):
+        """Test that parallel sync analyses come back in request order."""
+        def analyze(category, prompt):
+            if category == "security":
+                raise RuntimeError("boom")
+            return {"score": len(prompt), "feedback": category}
+        
+        with mock.patch.object(self.ai_client, "analyze", side_effect=analyze):
+            results = self.ai_client.analyze_batch([
+                ("code_quality", "a"),
+                ("security", "bb"),
+                ("innovation", "ccc"),
+            ])
+        
+        self.assertEqual(results[0], {"score": 1, "feedback": "code_quality"})
+        self.assertIsInstance(results[1], RuntimeError)
+        self.assertEqual(results[2]["score"], 3)
+    
+    def test_analyze_batch_uses_batch_api_when_enabled(self):
+        """Test that use_batch routes synchronous batches through run_batch."""
+        self.ai_client.use_batch = True
+        
+        def run_batch(jobs):
+            return {
+                custom_id: {"score": len(prompt), "feedback": system_prompt}
+                for custom_id, system_prompt, prompt in jobs
+            }
+        
+        with mock.patch.object(self.ai_client, "run_batch", side_effect=run_batch) as batch, \
+                mock.patch.object(self.ai_client, "analyze") as analyze:
+            results = self.ai_client.analyze_batch([
+                ("security", "a"),
+                ("security", "bb"),
+                ("innovation", "ccc"),
+            ])
+        
+        analyze.assert_not_called()
+        batch.assert_called_once()
+        self.assertEqual([result["score"] for result in results], [1, 2, 3])
+        self.assertEqual(results[0]["feedback"], results[1]["feedback"])
+        self.assertNotEqual(results[0]["feedback"], results[2]["feedback"])
+    
+    def test_analyze_batch_reports_failed_batch_for_every_request(self):
+        """Test that a failed Batch API job fails each request instead of raising."""
+        self.ai_client.use_batch = True
+        
+        with mock.patch.object(self.ai_client, "run_batch", side_effect=RuntimeError("expired")):
+            results = self.ai_client.analyze_batch([("security", "a"), ("innovation", "b")])
+        
+        self.assertEqual(len(results), 2)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+    
+    def test_analyze_batch_reports_results_in_completion_order(self):
+        """Test that on_result sees fast requests before slow ones."""
+        def analyze(category, prompt):
+            if category == "security":
+                time.sleep(0.05)
+                raise RuntimeError("boom")
+            return {"score": 5, "feedback": "ok"}
+        
+        reported = []
+        with mock.patch.object(self.ai_client, "analyze", side_effect=analyze):
+            results = self.ai_client.analyze_batch(
+                [("security", "a"), ("code_quality", "b")],
+                on_result=lambda i, result: reported.append(i)
+            )
+        
+        self.assertEqual(reported, [1, 0])
+        self.assertIsInstance(results[0], RuntimeError)
+        self.assertEqual(results[1]["score"], 5)
+    
+    def test_run_batch_maps_results_by_custom_id(self):
+        """Test that batch output lines are re-associated with their categories."""
+        self.ai_client.use_batch = True
+        self.ai_client.client = mock.MagicMock()
+        
+        batch = mock.MagicMock(id="batch-1", status="completed", output_file_id="file-out")
+        self.ai_client.client.batches.create.return_value = batch
+        output_lines = [
+            {"custom_id": "security", "response": {"status_code": 200, "body": {
+                "choices": [{"message": {"content": '{"score": 6, "feedback": "ok"}'}}]}}},
+            {"custom_id": "innovation", "response": {"status_code": 500, "body": {
+                "error": {"message": "server error"}}}},
+        ]
+        self.ai_client.client.files.content.return_value.text = "\n".join(
+            json.dumps(line) for line in output_lines
+        )
+        
+        results = self.ai_client.run_batch([
+            ("security", "system", "def main(): pass"),
+            ("innovation", "system", "def main(): pass"),
+            ("documentation", "system", "def main(): pass"),
+        ])
+        
+        self.assertEqual(results["security"]["score"], 6)
+        self.assertIsInstance(results["innovation"], RuntimeError)
+        self.assertIsInstance(results["documentation"], RuntimeError)
+        _, kwargs = self.ai_client.client.batches.create.call_args
+        self.assertEqual(kwargs["endpoint"], "/v1/chat/completions")
+    
+    def test_analyze_uses_category_system_prompt(self):
+        """Test that the generic analyze method and its shims pick the right prompt."""
+        self.ai_client.client = mock.MagicMock()
+        self.ai_client.client.chat.completions.create.return_value = _make_response('{"score": 4}')
+        
+        self.ai_client.analyze_security("def main(): pass")
+        self.ai_client.analyze("developer_experience", "def main(): pass")
+        
+        calls = self.ai_client.client.chat.completions.create.call_args_list
+        self.assertIn("security auditor", calls[0].kwargs["messages"][0]["content"])
+        self.assertIn("code quality", calls[1].kwargs["messages"][0]["content"])
+    
+    def test_repeated_prompt_is_answered_from_memory(self):
+        """Test that an identical request is sent once even with the persistent cache disabled."""
+        self.ai_client.client = mock.MagicMock()
+        self.ai_client.client.chat.completions.create.return_value = _make_response('{"score": 4}')
+        
+        first = self.ai_client.analyze_security("def main(): pass")
+        first["score"] = 0
+        second = self.ai_client.analyze_security("def main(): pass")
+        
+        self.assertEqual(second["score"], 4)
+        self.ai_client.client.chat.completions.create.assert_called_once()
+    
+    def test_request_builders_match_generic_requests(self):
+        """Test that prebuilt category requests equal the generically built ones."""
+        prompt = "def main(): pass"
+        expected = self.ai_client._build_request(
+            prompt,
+            ai_client_module._SYSTEM_PROMPTS["security"],
+            response_format={"type": "json_object"}
+        )
+        
+        self.assertEqual(self.ai_client._request_builders["security"](prompt), expected)
+    
+    def test_system_prompts_share_common_prefix(self):
+        """Test that every category request starts with the same cacheable prefix."""
+        for category in ai_client_module._SYSTEM_PROMPTS:
+            request = self.ai_client._request_builders[category]("def main(): pass")
+            self.assertTrue(request["messages"][0]["content"].startswith(ai_client_module._COMMON_PREFIX))
+    
+    def test_format_files_stops_at_file_token_budget(self):
+        """Test that inlined files are cut off once the file token budget is spent."""
+        files = [("a.py", "x" * 400), ("b.py", "y" * 400), ("c.py", "z" * 400)]
+        
+        self.ai_client.max_file_tokens = 150
+        with mock.patch.object(ai_client_module, "estimate_tokens", side_effect=lambda text, model: len(text) // 4), \
+                self.assertLogs(self.ai_client.logger, level="INFO") as logs:
+            formatted = self.ai_client.format_files(files)
+        
+        self.assertIn("File: a.py", formatted)
+        self.assertNotIn("File: b.py", formatted)
+        self.assertTrue(any("dropping 2 files: b.py, c.py" in line for line in logs.output))
+        
+        self.ai_client.max_file_tokens = None
+        self.assertIn("File: c.py", self.ai_client.format_files(files))
+    
+    def test_format_files_lists_registered_files_with_file_tools(self):
+        """Test that prompts carry a file index only when the client can serve the files."""
+        files = [("src/app.js", "const x = 1;\n" * 50)]
+        
+        self.assertIn("```", self.ai_client.format_files(files))
+        
+        self.ai_client.file_tools = True
+        self.assertIn("```", self.ai_client.format_files(files))
+        
+        self.ai_client.register_files(files)
+        index = self.ai_client.format_files(files)
+        self.assertNotIn("```", index)
+        self.assertIn("File: src/app.js (650 bytes) preview: const x = 1; const x = 1;", index)
+        self.assertIn("tools", self.ai_client._request_builders["security"]("def main(): pass"))
+        
+        self.ai_client.use_batch = True
+        self.assertIn("```", self.ai_client.format_files(files))
+    
+    def test_get_file_tool_calls_are_answered(self):
+        """Test that files requested through get_file are sent back to the model."""
+        self.ai_client.file_tools = True
+        self.ai_client.register_files([("contract/lib.rs", "pub fn main() {}")])
+        
+        call = mock.MagicMock(id="call-1")
+        call.function.name = "get_file"
+        call.function.arguments = '{"path": "contract/lib.rs"}'
+        tool_response = _make_response(None)
+        tool_response.choices[0].message.tool_calls = [call]
+        tool_response.choices[0].message.model_dump.return_value = {"role": "assistant", "tool_calls": []}
+        final_response = _make_response('{"score": 6, "feedback": "ok"}')
+        final_response.choices[0].message.tool_calls = None
+        
+        self.ai_client.client = mock.MagicMock()
+        self.ai_client.client.chat.completions.create.side_effect = [tool_response, final_response]
+        
+        result = self.ai_client.analyze("blockchain_integration", "File: contract/lib.rs (16 bytes)")
+        
+        self.assertEqual(result["score"], 6)
+        second_request = self.ai_client.client.chat.completions.create.call_args_list[1].kwargs
+        self.assertEqual(
+            second_request["messages"][-1],
+            {"role": "tool", "tool_call_id": "call-1", "content": "pub fn main() {}"}
+        )
+    
+    def test_only_json_responses_are_cached(self):
+        """Test that a reply without JSON is not cached and is requested again."""
+        self.ai_client.client = mock.MagicMock()
+        self.ai_client.client.chat.completions.create.side_effect = [
+            _make_response("Sorry, I cannot help with that."),
+            _make_response('{"score": 7, "feedback": "ok"}'),
+            _make_response('{"score": 1, "feedback": "not requested"}'),
+        ]
+        
+        first = self.ai_client.analyze("security", "def main(): pass")
+        second = self.ai_client.analyze("security", "def main(): pass")
+        third = self.ai_client.analyze("security", "def main(): pass")
+        
+        self.assertEqual(first["score"], 0)
+        self.assertEqual(second["score"], 7)
+        self.assertEqual(third, second)
+        self.assertEqual(self.ai_client.client.chat.completions.create.call_count, 2)
+    
+    def test_missing_response_content_falls_back(self):
+        """Test that a reply without content, e.g. a refusal, scores 0 and is not cached."""
+        self.ai_client.client = mock.MagicMock()
+        self.ai_client.client.chat.completions.create.return_value = _make_response(None)
+        
+        first = self.ai_client.analyze("security", "def main(): pass")
+        second = self.ai_client.analyze("security", "def main(): pass")
+        
+        self.assertEqual(first, {"feedback": "", "score": 0})
+        self.assertEqual(second, first)
+        self.assertEqual(self.ai_client.client.chat.completions.create.call_count, 2)
+        self.assertEqual(self.ai_client._parse_response(None), {"feedback": "", "score": 0})
+    
+    def test_recent_responses_stay_bounded_across_threads(self):
+        """Test that concurrent cache writes evict entries without errors."""
+        import concurrent.futures
+        
+        def store(i):
+            self.ai_client._set_cached(f"key-{i}", {"score": i, "feedback": "ok"})
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(store, range(2000)))
+        
+        self.assertEqual(len(self.ai_client._recent_responses), ai_client_module._RECENT_RESPONSES)
+        self.assertEqual(self.ai_client._get_cached("key-1999")["score"], 1999)
+    
+    def test_parse_response_extracts_embedded_json(self):
+        """Test that JSON wrapped in prose or a markdown fence is recovered."""
+        fenced = 'Here you go:\n```json\n{"score": 9, "feedback": "great"}\n```'
+        embedded = 'Result: {"score": 3, "feedback": "weak"} Thanks.'
+        
+        self.assertEqual(self.ai_client._parse_response(fenced)["score"], 9)
+        self.assertEqual(self.ai_client._parse_response(embedded)["score"], 3)
+        self.assertEqual(self.ai_client._parse_response("no json")["score"], 0)
+    
+    def test_extract_json_object(self):
+        """Test the single-pass JSON object scanner."""
+        extract = ai_client_module._extract_json_object
+        
+        self.assertEqual(extract('x {"a": {"b": 1}} y {"c": 2}'), '{"a": {"b": 1}}')
+        self.assertEqual(extract('{"feedback": "use } and { carefully"}'), '{"feedback": "use } and { carefully"}')
+        self.assertEqual(extract('{"quote": "say \\"}\\""}'), '{"quote": "say \\"}\\""}')
+        self.assertEqual(extract('{ignored} ```json\n{"score": 1}\n```'), '{"score": 1}')
+        self.assertIsNone(extract('{"unterminated": 1'))
+        self.assertIsNone(extract("no object here"))
+    
+    def test_json_dumps_is_stable_without_orjson(self):
+        """Test that cache keys do not change when orjson is unavailable."""
+        payload = {"model": "m", "messages": [{"role": "user", "content": "héllo"}], "rf": None}
+        with_orjson = ai_client_module._json_dumps(payload, sort_keys=True)
+        with mock.patch.object(ai_client_module, "orjson", None):
+            without_orjson = ai_client_module._json_dumps(payload, sort_keys=True)
+        
+        self.assertEqual(with_orjson, without_orjson)
+    
+    def test_prompt_dump_requires_debug_flag(self):
+        """Test that prompts are only written to disk when debug_dump is set."""
+        with mock.patch.object(self.ai_client, "_dump_problem_prompt") as dump:
+            self.ai_client._build_request("short")
+            dump.assert_not_called()
+            
+            self.ai_client.debug_dump = True
+            self.ai_client._build_request("short")
+            dump.assert_called_once()
+    
+    def test_prompt_dumps_get_one_file_per_request(self):
+        """Test that concurrent prompt dumps are written to separate, category-named files."""
+        import os
+        import tempfile
+        
+        self.ai_client.debug_dump = True
+        with tempfile.TemporaryDirectory() as directory:
+            cwd = os.getcwd()
+            os.chdir(directory)
+            try:
+                self.ai_client._request_builders["security"]("first")
+                self.ai_client._request_builders["security"]("second")
+                self.ai_client._build_request("third")
+                dumps = sorted(os.listdir(directory))
+            finally:
+                os.chdir(cwd)
+        
+        self.assertEqual(dumps, [
+            "debug_prompt_test_model_request_3.txt",
+            "debug_prompt_test_model_security_1.txt",
+            "debug_prompt_test_model_security_2.txt",
+        ])
+    
+    def test_context_manager_closes_client(self):
+        """Test that leaving the context closes the client's HTTP connections."""
+        with self.ai_client as client:
+            self.assertFalse(client.client.is_closed())
+        
+        self.assertTrue(self.ai_client.client.is_closed())
+    
+    def test_context_length_error_is_reported(self):
+        """Test that context window errors are recognized by their error code."""
+        error = BadRequestError(
+            "Request too large",
+            response=httpx.Response(400, request=httpx.Request("POST", "https://api.openai.com")),
+            body={"code": "context_length_exceeded"}
+        )
+        self.ai_client.client = mock.MagicMock()
+        self.ai_client.client.chat.completions.create.side_effect = error
+        
+        with self.assertLogs("audit_near.ai_client", level="ERROR") as logs:
+            with self.assertRaises(BadRequestError):
+                self.ai_client.analyze("security", "def main(): pass")
+        
+        self.assertTrue(any("maximum context length" in line for line in logs.output))
+    
+    def test_resolve_category_falls_back_to_code_quality(self):
+        """Test that unknown plugin categories use a sensible system prompt."""
+        self.assertEqual(AiClient._resolve_category("ux_design"), "ux_design")
+        self.assertEqual(AiClient._resolve_category("security_extra"), "security")
+        self.assertEqual(AiClient._resolve_category("developer_experience"), "code_quality")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,11 +2,28 @@
 Tests for the category processors.
 """
 
+import json
 import unittest
 from unittest import mock
 
+from audit_near.categories import utils
+
 from audit_near.ai_client import AiClient
+from audit_near.categories.blockchain_integration import BlockchainIntegration
 from audit_near.categories.code_quality import CodeQuality
+from audit_near.categories.enhanced_blockchain_integration import EnhancedBlockchainIntegration
+from audit_near.categories.documentation import Documentation
+from audit_near.categories.enhanced_code_quality import EnhancedCodeQuality
+from audit_near.categories.file_bundle import FileBundle
+from audit_near.categories.functionality import Functionality
+from audit_near.categories.innovation import Innovation
+from audit_near.categories.security import Security
+from audit_near.categories.ux_design import UXDesign
+from audit_near.categories.utils import (
+    ALL_NEAR_PATTERNS, FT_INTEGRATION, NEAR_PATTERN_BITS, NEAR_PATTERN_GROUPS, NEAR_SDK_AS, NEAR_SDK_RS,
+    NFT_INTEGRATION, PromptTemplate, compile_prompt_template, extract_near_patterns, format_file_sections,
+    format_near_patterns
+)
 
 
 class TestCategories(unittest.TestCase):
@@ -18,6 +35,7 @@ class TestCategories(unittest.TestCase):
         """Set up test environment before each test."""
         # Mock AI client
         self.ai_client = mock.MagicMock(spec=AiClient)
+        self.ai_client.format_files.side_effect = format_file_sections
         
         # Create a temporary prompt file
         self.prompt_file = "test_prompt.md"
@@ -56,6 +74,18 @@ class TestCategories(unittest.TestCase):
         self.assertIn(("src/main.js", "console.log('Hello');"), code_files)
         self.assertIn(("src/utils.py", "print('Hello')"), code_files)
     
+    def test_code_quality_filter_skips_duplicate_contents(self):
+        """Test that identical file contents only take one slot in the code sample."""
+        files = [
+            ("pkg/a/__init__.py", "from .core import *"),
+            ("pkg/b/__init__.py", "from .core import *"),
+            ("pkg/core.py", "def core(): pass"),
+        ]
+        
+        code_files = self.code_quality._filter_code_files(files)
+        
+        self.assertEqual(list(code_files), [files[0], files[2]])
+    
     def test_code_quality_select_code_sample(self):
         """Test that _select_code_sample returns a representative sample."""
         # Test data with 15 files of different sizes
@@ -70,6 +100,18 @@ class TestCategories(unittest.TestCase):
         # Check that the sample size is limited
         self.assertLessEqual(len(sample), 10)
     
+    def test_code_quality_select_code_sample_picks_small_medium_and_large(self):
+        """Test that the sample matches slicing the files sorted by size."""
+        files = [
+            (f"file{i}.js", "x" * ((i * 7) % 15 + 1))
+            for i in range(15)
+        ]
+        
+        sample = self.code_quality._select_code_sample(files)
+        
+        sorted_files = sorted(files, key=lambda x: len(x[1]))
+        self.assertEqual(sample, sorted_files[:3] + sorted_files[5:9] + sorted_files[-3:])
+    
     def test_code_quality_build_prompt(self):
         """Test that _build_prompt correctly formats the prompt."""
         # Test data
@@ -87,6 +129,201 @@ class TestCategories(unittest.TestCase):
         self.assertIn("file2.py", prompt)
         self.assertIn("print('Hello')", prompt)
     
+    def test_format_file_sections_matches_joined_sections(self):
+        """Test that format_file_sections separates file sections with blank lines."""
+        files = [
+            ("file1.js", "console.log('Hello');"),
+            ("file2.py", "print('Hello')"),
+        ]
+        
+        expected = "\n".join(f"File: {path}\n\n```\n{content}\n```\n" for path, content in files)
+        
+        self.assertEqual(format_file_sections(files), expected)
+        self.assertEqual(format_file_sections([]), "")
+    
+    def test_prompt_template_renders_placeholders_in_one_pass(self):
+        """Test that only known placeholders are substituted, once each."""
+        template = PromptTemplate('Files: {FILES_CONTENT}\nSummary: {REPO_SUMMARY}\n{"score": 0} {OTHER}')
+        
+        prompt = template.render({"FILES_CONTENT": "x = '{REPO_SUMMARY}'", "REPO_SUMMARY": "{}"})
+        
+        self.assertEqual(prompt, 'Files: x = \'{REPO_SUMMARY}\'\nSummary: {}\n{"score": 0} {OTHER}')
+        self.assertEqual(template.placeholders, {"FILES_CONTENT", "REPO_SUMMARY", "OTHER"})
+        self.assertEqual(PromptTemplate("{{x}} } {A} {").render({"A": "{0}"}), "{{x}} } {0} {")
+        self.assertIs(compile_prompt_template("{A}"), compile_prompt_template("{A}"))
+    
+    def test_extract_near_patterns_matches_substring_checks(self):
+        """Test that the single-pass scan agrees with plain substring checks."""
+        files = [
+            ("contract/Cargo.toml", "[dependencies]\nnear-sdk = \"4\""),
+            ("src/app.js", "import { connect } from 'near-api-js';\nawait Contract.View('get');"),
+            ("src/nft.ts", "nft_transfer(); // NEP-171"),
+        ]
+        
+        patterns = extract_near_patterns(files)
+        
+        contents = [content.lower() for _, content in files]
+        for flag, group in NEAR_PATTERN_GROUPS.items():
+            expected = any(p in content for p in group for content in contents)
+            self.assertEqual(bool(patterns & NEAR_PATTERN_BITS[flag]), expected, flag)
+        
+        # "near-sdk" only counts as the Rust SDK in .rs/.toml files
+        self.assertTrue(patterns & NEAR_SDK_RS)
+        self.assertFalse(patterns & NEAR_SDK_AS)
+        self.assertFalse(extract_near_patterns([("app.js", "near-sdk")]) & NEAR_SDK_RS)
+        self.assertTrue(extract_near_patterns([("lib.ts", "near-sdk-as")]) & NEAR_SDK_AS)
+        
+        # "ft_transfer" inside "nft_transfer" still flags fungible tokens
+        self.assertTrue(patterns & FT_INTEGRATION)
+        
+        lines = format_near_patterns(patterns).splitlines()
+        self.assertEqual(len(lines), 10)
+        self.assertIn("- NEAR SDK Rust: Yes", lines)
+        self.assertIn("- NEAR SDK AssemblyScript: No", lines)
+    
+    def test_extract_near_patterns_stops_once_all_flags_are_set(self):
+        """Test that blockchain paths are scanned first and scanning stops early."""
+        everything = " ".join(group[0] for group in NEAR_PATTERN_GROUPS.values()) + " near-sdk near-sdk-as"
+        files = [
+            ("src/util.js", "export const add = (a, b) => a + b;"),
+            ("contract/Cargo.toml", everything),
+        ]
+        scanned = []
+        near_pattern_regex = utils._near_pattern_regex
+        
+        def search(regex, content, pos=0):
+            if content not in scanned:
+                scanned.append(content)
+            return regex.search(content, pos)
+        
+        def pattern_regex(missing, binary=False):
+            regex = near_pattern_regex(missing, binary)
+            return mock.Mock(search=lambda content, pos=0: search(regex, content, pos))
+        
+        with mock.patch.object(utils, "_near_pattern_regex", pattern_regex):
+            patterns = extract_near_patterns(files)
+        
+        self.assertEqual(patterns, ALL_NEAR_PATTERNS)
+        self.assertEqual(scanned, [everything])
+    
+    def test_extract_near_patterns_scans_bytes(self):
+        """Test that raw bytes contents are scanned like decoded text."""
+        files = [
+            ("contract/Cargo.toml", "near-sdk = \"4\""),
+            ("src/app.js", "import 'near-api-js'; Wallet.RequestSignIn(); nft_mint()"),
+        ]
+        raw_files = [(path, content.encode()) for path, content in files]
+        
+        self.assertEqual(extract_near_patterns(raw_files), extract_near_patterns(files))
+        self.assertTrue(utils.has_blockchain_content(b"await NEAR.call()"))
+        self.assertFalse(utils.has_blockchain_content(b"print('hello')"))
+    
+    def test_near_pattern_regex_skips_found_flags(self):
+        """Test that the scan regex only looks for patterns not found yet."""
+        regex = utils._near_pattern_regex(ALL_NEAR_PATTERNS & ~(NEAR_SDK_RS | FT_INTEGRATION))
+        self.assertIsNone(regex.search("near-sdk = \"4\"\nft_transfer"))
+        self.assertEqual(regex.search("near-sdk-as").lastgroup, "near_sdk")
+        self.assertEqual(regex.search("nft_mint").lastgroup, "nft_integration")
+    
+    def test_extract_near_patterns_in_process_pool(self):
+        """Test that the process-pool scan finds the same patterns as the serial scan."""
+        files = [
+            ("contract/Cargo.toml", "near-sdk = \"4\""),
+            ("src/app.js", "import 'near-api-js'; wallet.requestSignIn();"),
+            ("src/nft.ts", "nft_transfer();"),
+        ]
+        
+        with mock.patch.object(utils, "PARALLEL_SCAN_MIN_BYTES", 0):
+            parallel = extract_near_patterns(files, max_workers=2)
+        
+        self.assertEqual(parallel, extract_near_patterns(files, max_workers=1))
+        self.assertTrue(parallel & NFT_INTEGRATION)
+    
+    def test_process_pool_workers_are_spawned(self):
+        """Test that scan workers are not forked from the multithreaded audit process."""
+        files = [("src/nft.ts", "nft_transfer();")]
+        
+        with mock.patch.object(utils, "PARALLEL_SCAN_MIN_BYTES", 0), \
+                mock.patch.object(utils.concurrent.futures, "ProcessPoolExecutor",
+                                  wraps=utils.concurrent.futures.ProcessPoolExecutor) as executor:
+            extract_near_patterns(files, max_workers=2)
+        
+        self.assertEqual(executor.call_args.kwargs["mp_context"].get_start_method(), "spawn")
+    
+    def test_cached_near_patterns_rescans_only_changed_files(self):
+        """Test that NEAR patterns of an unchanged file set are reused."""
+        files = [("contract/Cargo.toml", "near-sdk = \"4\""), ("src/nft.ts", "nft_mint();")]
+        changed = [("contract/Cargo.toml", "near-sdk = \"4\""), ("src/nft.ts", "ft_mint();")]
+        
+        with mock.patch.object(utils, "extract_near_patterns", wraps=extract_near_patterns) as scan:
+            first = utils.cached_near_patterns(files)
+            again = utils.cached_near_patterns([(path, content.encode()) for path, content in files])
+            other = utils.cached_near_patterns(changed)
+        
+        self.assertEqual(first, again)
+        self.assertEqual(first, extract_near_patterns(files))
+        self.assertEqual(other, extract_near_patterns(changed))
+        self.assertEqual(scan.call_count, 2)
+    
+    def test_blockchain_prompt_reads_only_selected_files(self):
+        """Test that the NEAR pattern scan does not decode files left out of the prompt."""
+        import os
+        import tempfile
+        from audit_near.categories.file_bundle import FileBundle
+        from audit_near.providers.repo_provider import RepoProvider
+        
+        with open(self.prompt_file, "w") as f:
+            f.write("{BLOCKCHAIN_FILES}\n{NEAR_PATTERNS}")
+        handler = BlockchainIntegration(self.ai_client, self.prompt_file, 10, "/path/to/repo")
+        
+        with tempfile.TemporaryDirectory() as repo:
+            os.makedirs(os.path.join(repo, "src"))
+            with open(os.path.join(repo, "src", "wallet.js"), "w") as f:
+                f.write("import 'near-api-js';")
+            for i in range(5):
+                with open(os.path.join(repo, "src", f"util{i}.js"), "w") as f:
+                    f.write("export const add = (a, b) => a + b; nft_mint();")
+            refs = list(RepoProvider(repo_path=repo).get_file_refs())
+            
+            prompt = handler.prepare_prompt(FileBundle.of(refs))
+        
+        read = [ref.path for ref in refs if "content" in ref.__dict__]
+        self.assertEqual(read, ["src/wallet.js"])
+        self.assertIn("- NFT Integration: Yes", prompt)
+    
+    def test_blockchain_files_match_content_case_insensitively(self):
+        """Test that blockchain content markers match regardless of case."""
+        blockchain = BlockchainIntegration(
+            ai_client=self.ai_client,
+            prompt_file=self.prompt_file,
+            max_points=10,
+            repo_path="/path/to/repo"
+        )
+        files = [
+            ("src/app.js", "await Near.Call('method');"),
+            ("src/sign.js", "wallet.signTransaction(tx);"),
+            ("src/util.js", "export const add = (a, b) => a + b;"),
+        ]
+        
+        selected = blockchain._extract_blockchain_files(files)
+        
+        self.assertEqual([path for path, _ in selected], ["src/app.js", "src/sign.js"])
+    
+    def test_blockchain_files_prioritize_contract_and_near_paths(self):
+        """Test that up to 5 priority files and 3 other files are kept, in order."""
+        blockchain = BlockchainIntegration(
+            ai_client=self.ai_client,
+            prompt_file=self.prompt_file,
+            max_points=10,
+            repo_path="/path/to/repo"
+        )
+        files = [(f"src/wallet{i}.js", "code") for i in range(4)]
+        files += [(f"src/Contract{i}.js", "code") for i in range(6)]
+        
+        selected = blockchain._extract_blockchain_files(files)
+        
+        self.assertEqual(selected, files[4:9] + files[:3])
+    
     def test_code_quality_extract_results(self):
         """Test that _extract_results extracts score and feedback."""
         # Test data
@@ -129,6 +366,431 @@ class TestCategories(unittest.TestCase):
         self.assertEqual(score, 0)
         self.assertEqual(feedback, "Error processing code quality analysis.")
     
+    def test_load_prompt_template_is_cached_until_the_file_changes(self):
+        """Test that prompt templates are read once per file version."""
+        import os
+        
+        with mock.patch("builtins.open", wraps=open) as opened:
+            first = utils.load_prompt_template(self.prompt_file)
+            second = utils.load_prompt_template(self.prompt_file)
+        
+        self.assertEqual(first, "Test prompt with placeholder: {FILES_CONTENT}")
+        self.assertIs(second, first)
+        self.assertLessEqual(opened.call_count, 1)
+        
+        with open(self.prompt_file, "w") as f:
+            f.write("Changed: {FILES_CONTENT}")
+        stat = os.stat(self.prompt_file)
+        os.utime(self.prompt_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        
+        self.assertEqual(utils.load_prompt_template(self.prompt_file), "Changed: {FILES_CONTENT}")
+    
+    def test_format_repo_summary_is_reused_for_the_same_summary(self):
+        """Test that a shared summary is serialized once and matches json.dumps."""
+        summary = {"languages": {"Rust": 3}, 1: "non-str key"}
+        
+        text = utils.format_repo_summary(summary)
+        
+        self.assertEqual(text, json.dumps(summary, indent=2))
+        with mock.patch.object(utils.json, "dumps") as dumps, mock.patch.object(utils, "orjson", None):
+            self.assertIs(utils.format_repo_summary(summary), text)
+            dumps.assert_not_called()
+    
+    def test_enhanced_code_quality_uses_precomputed_sizes(self):
+        """Test that enhanced file selection filters by bundle sizes without touching the disk."""
+        handler = EnhancedCodeQuality(self.ai_client, self.prompt_file, 10, "/nonexistent")
+        files = [
+            ("src/a.rs", "fn a() {}"),
+            ("src/big.rs", "x" * 60000),
+            ("src/b.js", "const b = 1;"),
+        ]
+        
+        with mock.patch("os.path.getsize") as getsize:
+            selected = handler._select_files(files, {})
+        
+        getsize.assert_not_called()
+        self.assertEqual(sorted(selected), [files[0], files[2]])
+    
+    def test_enhanced_code_quality_selection_keeps_priority_order(self):
+        """Test that enhanced selection returns files in priority order rather than set order."""
+        handler = EnhancedCodeQuality(self.ai_client, self.prompt_file, 10, "/nonexistent")
+        files = [(f"src/f{i}.rs", f"fn f{i}() {{}}") for i in range(20)]
+        important = [f"src/f{i}.rs" for i in (19, 3, 11)]
+        analysis = {"dependency_analysis": {"important_files": important}}
+        
+        selected = handler._select_files(files, analysis)
+        
+        self.assertEqual([path for path, _ in selected], important + ["src/f0.rs", "src/f1.rs", "src/f2.rs"])
+    
+    def test_enhanced_blockchain_selection_prioritizes_contracts(self):
+        """Test that contract and NEAR paths come first, followed by up to three others."""
+        handler = EnhancedBlockchainIntegration(self.ai_client, self.prompt_file, 10, "/nonexistent")
+        paths = ["src/wallet.ts", "src/Contract.rs", "src/tx.ts", "near/lib.rs", "src/a.ts", "src/b.ts"]
+        files = [(path, "x") for path in paths]
+        analysis = {"categorized_files": {"blockchain": paths}}
+        
+        selected = handler._select_files(files, analysis)
+        
+        self.assertEqual(
+            [path for path, _ in selected],
+            ["src/Contract.rs", "near/lib.rs", "src/wallet.ts", "src/tx.ts", "src/a.ts"]
+        )
+    
+    def test_blockchain_file_path_regex(self):
+        """Test that one path search covers blockchain directories and path patterns."""
+        matches = ["chain/lib.rs", "src/chain", "Src/NearWallet.ts", "app/Contracts/x.js", "gas.rs"]
+        misses = ["Chain/lib.rs", "src/chainlink/x.py", "README.md"]
+        
+        for path in matches:
+            self.assertTrue(utils.BLOCKCHAIN_FILE_PATH_RE.search(path), path)
+        for path in misses:
+            self.assertFalse(utils.BLOCKCHAIN_FILE_PATH_RE.search(path), path)
+    
+    def test_file_extension_matches_splitext(self):
+        """Test that the fast extension helper agrees with os.path.splitext."""
+        import os
+        
+        for path in ["src/Main.RS", ".gitignore", "a/.env", "a/..x.y", "a.b/c", "Makefile", "a/b.", "a/.b.c", "x.tar.GZ"]:
+            self.assertEqual(utils.file_extension(path), os.path.splitext(path)[1].lower(), path)
+    
+    def test_extract_results_clamps_score(self):
+        """Test that the shared result extraction clamps scores and tolerates missing ones."""
+        logger = mock.Mock()
+        
+        self.assertEqual(utils.extract_results({"score": 15, "feedback": "ok"}, 10, "x", logger), (10, "ok"))
+        self.assertEqual(utils.extract_results({"score": -3, "feedback": "ok"}, 10, "x", logger), (0, "ok"))
+        self.assertEqual(utils.extract_results({"score": None}, 10, "x", logger), (0, "Error processing x analysis."))
+        logger.error.assert_called_once()
+    
+    def test_extract_results_reads_scores_given_as_text(self):
+        """Test that text scores such as "7/10" use their first integer."""
+        logger = mock.Mock()
+        
+        self.assertEqual(utils.extract_results({"score": "7", "feedback": "ok"}, 10, "x", logger), (7, "ok"))
+        self.assertEqual(utils.extract_results({"score": "7/10", "feedback": "ok"}, 10, "x", logger), (7, "ok"))
+        self.assertEqual(utils.extract_results({"score": "Score: 12", "feedback": "ok"}, 10, "x", logger), (10, "ok"))
+        logger.error.assert_not_called()
+    
+    def test_size_filters_do_not_read_skipped_files(self):
+        """Test that category size filters use bundle sizes instead of reading file contents."""
+        from audit_near.providers.repo_provider import FileRef
+        
+        refs = [
+            FileRef("src/contract.rs", "/nonexistent/contract.rs", 200000),
+            FileRef("src/components/App.tsx", "/nonexistent/App.tsx", 150000),
+        ]
+        bundle = FileBundle.of(refs)
+        
+        Security(self.ai_client, self.prompt_file, 10, "/path/to/repo")._filter_sensitive_files(bundle)
+        Innovation(self.ai_client, self.prompt_file, 10, "/path/to/repo")._find_innovative_patterns(bundle)
+        UXDesign(self.ai_client, self.prompt_file, 10, "/path/to/repo")._extract_frontend_files(bundle)
+        
+        for ref in refs:
+            self.assertNotIn("content", ref.__dict__)
+    
+    def test_documentation_counts_comment_lines(self):
+        """Test that inline documentation stats count comment lines per line like a line scan."""
+        handler = Documentation(self.ai_client, self.prompt_file, 10, "/path/to/repo")
+        files = [
+            ("src/lib.rs", "/// Docs\nfn a() {} //! inner\n  // note\nlet x = 1;\n"),
+            ("src/app.py", "\t# comment\n\"\"\"doc\"\"\"\nx = 1\n    * star\n-- sql"),
+            ("src/plain.js", "const a = 1;\n\nconst b = 2;"),
+            ("README.md", "# Not code"),
+        ]
+        
+        stats = handler._extract_inline_documentation_stats(files)
+        
+        self.assertEqual(stats["total_code_files"], 3)
+        self.assertEqual(stats["files_with_comments"], 2)
+        self.assertEqual(stats["total_lines"], 4 + 5 + 3)
+        self.assertEqual(stats["comment_lines"], 3 + 4)
+    
+    def test_documentation_stats_sample_large_code_bases(self):
+        """Test that inline documentation stats read a bounded sample and extrapolate."""
+        handler = Documentation(self.ai_client, self.prompt_file, 10, "/path/to/repo")
+        files = [(f"src/f{i:03}.py", "# doc\nx = 1\n") for i in range(300)] + [("src/big.py", "x" * 200000)]
+        
+        stats = handler._extract_inline_documentation_stats(files)
+        
+        self.assertEqual(stats["total_code_files"], 300)
+        self.assertEqual(stats["sampled_files"], 200)
+        self.assertEqual(stats["files_with_comments"], 300)
+        self.assertEqual(stats["comment_lines"], 300)
+        self.assertEqual(stats["total_lines"], 600)
+        self.assertEqual(stats["comment_ratio"], 0.5)
+    
+    def test_documentation_file_detection(self):
+        """Test that documentation files are detected case-insensitively by extension or name."""
+        handler = Documentation(self.ai_client, self.prompt_file, 10, "/path/to/repo")
+        files = [
+            ("README.MD", "# Project"),
+            ("Docs/setup.html", "<p>Setup</p>"),
+            ("src/UserGuide.js", "// guide"),
+            ("notes.RST", "Notes"),
+            ("src/main.rs", "fn main() {}"),
+            ("src/markdown.rs", "fn md() {}"),
+        ]
+        
+        doc_files = handler._extract_documentation_files(files)
+        
+        self.assertEqual([path for path, _ in doc_files], ["README.MD", "Docs/setup.html", "src/UserGuide.js", "notes.RST"])
+    
+    def test_innovation_snippet_window(self):
+        """Test that innovative snippets keep five lines before and four after the match."""
+        handler = Innovation(self.ai_client, self.prompt_file, 10, "/path/to/repo")
+        lines = [f"line {i}" for i in range(12)]
+        lines[7] = "let id: AccountId = env::signer();"
+        files = [
+            ("src/lib.rs", "\n".join(lines) + "\n"),
+            ("src/top.ts", "const c = new Contract();\nexport default c;\n"),
+            ("README.md", "Promise"),
+        ]
+        
+        snippets = handler._find_innovative_patterns(files)
+        
+        self.assertEqual(snippets, [
+            ("src/lib.rs", "\n".join(lines[2:12])),
+            ("src/top.ts", "const c = new Contract();\nexport default c;"),
+        ])
+    
+    def test_functionality_detects_frameworks_from_package_json(self):
+        """Test that package.json frameworks are reported in a fixed order."""
+        handler = Functionality(self.ai_client, self.prompt_file, 10, "/path/to/repo")
+        package_json = json.dumps({
+            "dependencies": {"@near-js/api": "1.0.0", "react": "18.0.0"},
+            "devDependencies": {"next": "14.0.0"},
+        })
+        
+        project_info = handler._identify_project_structure([("package.json", package_json)])
+        
+        self.assertEqual(project_info["type"], "node")
+        self.assertEqual(project_info["frameworks"], ["react", "next.js", "near-api-js"])
+    
+    def test_functionality_skips_package_json_without_object(self):
+        """Test that a package.json that is not a JSON object is skipped."""
+        handler = Functionality(self.ai_client, self.prompt_file, 10, "/path/to/repo")
+        
+        with self.assertLogs("audit_near.categories.functionality", level="WARNING"):
+            project_info = handler._identify_project_structure([("package.json", "<<<<<<< HEAD")])
+        
+        self.assertEqual(project_info["type"], "node")
+        self.assertEqual(project_info["frameworks"], [])
+    
+    def test_functionality_index_finds_manifests_and_entry_points(self):
+        """Test that the single-pass file index keeps the per-pattern ordering."""
+        handler = Functionality(self.ai_client, self.prompt_file, 10, "/path/to/repo")
+        files = [
+            ("src/api/users.ts", "export {}"),
+            ("contract/src/lib.rs", "use near_sdk::near_bindgen;"),
+            ("contract/Cargo.toml", "[dependencies]\nnear-sdk = \"4\""),
+            ("web/src/index.js", "render()"),
+            ("web/Cargo.toml", "[package]"),
+            ("tests/sim.rs", "#[test]"),
+        ]
+        
+        index = handler._index_files(files)
+        project_info = handler._identify_project_structure(files, index)
+        entry_points = handler._identify_entry_points(files, index)
+        
+        self.assertEqual(index["manifests"], {"Cargo.toml": 2})
+        self.assertEqual(project_info["frameworks"], ["near-sdk-rs"])
+        self.assertTrue(project_info["has_tests"])
+        self.assertFalse(project_info["has_readme"])
+        self.assertEqual(entry_points, ["web/src/index.js", "contract/src/lib.rs", "src/api/users.ts"])
+    
+    def test_functionality_entry_point_regexes_match_suffix_checks(self):
+        """Test that the entry point regexes agree with the keyword and endswith checks."""
+        handler = Functionality(self.ai_client, self.prompt_file, 10, "/path/to/repo")
+        files = [
+            ("src/API/users.py", ""),
+            ("src/rapid.js", ""),
+            ("Contracts/token.ts", ""),
+            ("contract/src/lib.RS", ""),
+            ("src/myindex.js", ""),
+            ("lib.rs/readme.txt", ""),
+        ]
+        
+        self.assertEqual(handler._identify_entry_points(files), [
+            "src/myindex.js", "Contracts/token.ts", "src/API/users.py", "src/rapid.js",
+        ])
+    
+    def test_functionality_prompt_reads_only_entry_point_files(self):
+        """Test that building the prompt reads entry point contents but no other files."""
+        import os
+        import tempfile
+        from audit_near.providers.repo_provider import FileRef
+        
+        with open(self.prompt_file, "w") as f:
+            f.write("{PROJECT_INFO}\n{ENTRY_POINTS}")
+        handler = Functionality(self.ai_client, self.prompt_file, 10, "/path/to/repo")
+        
+        with tempfile.TemporaryDirectory() as repo:
+            with open(os.path.join(repo, "main.py"), "w") as f:
+                f.write("print('entry')")
+            files = [
+                FileRef("src/util.py", "/nonexistent/util.py", 10),
+                FileRef("main.py", os.path.join(repo, "main.py"), 14),
+            ]
+            
+            prompt = handler._build_prompt(FileBundle.of(files), {
+                "type": "python", "language": "python", "frameworks": [],
+                "has_tests": False, "has_readme": False, "file_count": 2,
+            }, ["main.py", "missing.py"])
+        
+        self.assertIn("File: main.py\n\n```\nprint('entry')\n```", prompt)
+        self.assertIn("File: missing.py\n\n```\n\n```", prompt)
+        self.assertNotIn("content", files[0].__dict__)
+    
+    def test_functionality_test_and_readme_detection(self):
+        """Test that test and README files are matched as names, not arbitrary substrings."""
+        handler = Functionality(self.ai_client, self.prompt_file, 10, "/path/to/repo")
+        
+        def flags(*paths):
+            index = handler._index_files([(path, "") for path in paths])
+            return index["has_tests"], index["has_readme"]
+        
+        self.assertEqual(flags("src/protester.py", "latest/respect.js", "docs/readme-notes.md"), (False, False))
+        self.assertEqual(flags("src/__tests__/app.js"), (True, False))
+        self.assertEqual(flags("src/app.test.ts", "docs/README.rst"), (True, True))
+        self.assertEqual(flags("test_main.py", "README"), (True, True))
+        self.assertEqual(flags("spec/models/user_spec.rb", "readme.md"), (True, True))
+        self.assertEqual(flags("src/main/java/FooTest.java"), (True, False))
+        self.assertEqual(flags("Foo.Tests/FooTests.cs"), (True, False))
+        self.assertEqual(flags("src/UserSpec.js"), (True, False))
+        self.assertEqual(flags("src/Contest.java", "src/LatestNews.cs"), (False, False))
+    
+    def test_innovation_stops_reading_after_five_snippets(self):
+        """Test that files after the fifth innovative snippet are not read."""
+        handler = Innovation(self.ai_client, self.prompt_file, 10, "/path/to/repo")
+        files = [(f"src/c{i}.rs", "let id: AccountId = x;") for i in range(7)]
+        read = []
+        
+        class RecordingContents(list):
+            def __getitem__(self, index):
+                read.append(index)
+                return super().__getitem__(index)
+        
+        bundle = FileBundle.of(files)
+        bundle.contents = RecordingContents(bundle.contents)
+        
+        snippets = handler._find_innovative_patterns(bundle)
+        
+        self.assertEqual([path for path, _ in snippets], [path for path, _ in files[:5]])
+        self.assertEqual(read, [0, 1, 2, 3, 4])
+    
+    def test_security_filter_prioritizes_contracts(self):
+        """Test that sensitive files are found by path or content and contracts come first."""
+        handler = Security(self.ai_client, self.prompt_file, 10, "/path/to/repo")
+        files = [
+            ("src/util.js", "export const add = (a, b) => a + b;"),
+            ("src/Auth/Login.js", "export default Login;"),
+            ("src/keys.js", "const PRIVATE_KEY = process.env.KEY;"),
+            ("src/lib.rs", "pub fn transfer() {}"),
+            ("empty_contract.rs", ""),
+            ("huge_contract.rs", "x" * 100001),
+            ("contracts/Token.sol", "contract Token {}"),
+        ]
+        
+        selected = handler._filter_sensitive_files(files)
+        
+        self.assertEqual([path for path, _ in selected], [
+            "contracts/Token.sol", "src/Auth/Login.js", "src/keys.js",
+        ])
+        self.assertEqual(selected[0], files[6])
+    
+    def test_count_lines_of_code(self):
+        """Test that lines are counted like splitlines() for newline-terminated text."""
+        files = [
+            ("a.py", "import os\nprint(os.name)\n"),
+            ("b.js", "let a;\r\nlet b;"),
+            ("c.rs", ""),
+            ("d.md", "\n\n"),
+        ]
+        
+        self.assertEqual(utils.count_lines_of_code(files), sum(len(c.splitlines()) for _, c in files))
+        self.assertEqual(utils.count_lines_of_code(files), 6)
+    
+    def test_ux_frontend_sample_puts_each_file_in_one_bucket(self):
+        """Test that frontend files are sampled by bucket without duplicates."""
+        handler = UXDesign(self.ai_client, self.prompt_file, 10, "/path/to/repo")
+        files = [
+            ("src/main.js", "render();"),
+            ("src/components/PageHeader.tsx", "<header/>"),
+            ("src/pages/Home.jsx", "<Home/>"),
+            ("src/styles/app.css", "body {}"),
+            ("src/components/button.css", ".btn {}"),
+            ("src/util.ts", "export {};"),
+            ("src/legacy.ts", "export {};"),
+            ("README.md", "# UI"),
+        ]
+        
+        sample = handler._extract_frontend_files(files)
+        
+        self.assertEqual([path for path, _ in sample], [
+            "src/components/PageHeader.tsx", "src/components/button.css",
+            "src/pages/Home.jsx", "src/styles/app.css", "src/main.js", "src/util.ts",
+        ])
+        self.assertEqual(sample[0], files[1])
+    
+    def test_innovation_summary_combines_doc_files(self):
+        """Test that up to three documentation files make up the summary without a README."""
+        handler = Innovation(self.ai_client, self.prompt_file, 10, "/path/to/repo")
+        files = [(f"Docs/part{i}.MD", f"Part {i}") for i in range(4)] + [("notes.txt", "Notes")]
+        
+        self.assertEqual(handler._extract_project_summary(files), "Part 0\n\nPart 1\n\nPart 2")
+    
+    def test_innovation_summary_reads_only_the_readme(self):
+        """Test that the README is found by name without reading other files."""
+        import os
+        import tempfile
+        from audit_near.providers.repo_provider import FileRef
+        
+        handler = Innovation(self.ai_client, self.prompt_file, 10, "/path/to/repo")
+        
+        with tempfile.TemporaryDirectory() as repo:
+            with open(os.path.join(repo, "README.md"), "w") as f:
+                f.write("# Project")
+            files = [
+                FileRef("src/app.js", "/nonexistent/app.js", 10),
+                FileRef("README.md", os.path.join(repo, "README.md"), 9),
+            ]
+            
+            summary = handler._extract_project_summary(FileBundle.of(files))
+        
+        self.assertEqual(summary, "# Project")
+        self.assertNotIn("content", files[0].__dict__)
+    
+    def test_ux_descriptions_end_before_the_next_heading(self):
+        """Test that UI sections stop at the next heading and match whole words only."""
+        handler = UXDesign(self.ai_client, self.prompt_file, 10, "/path/to/repo")
+        readme = "\n".join([
+            "# Project",
+            "Intro",
+            "## UI Overview",
+            "Dark theme.",
+            "",
+            "## Build",
+            "npm run build",
+            "## Screenshots",
+            "![home](home.png)",
+        ])
+        files = [("README.md", readme), ("src/ui.js", "# UI")]
+        
+        self.assertEqual(handler._extract_ui_descriptions(files), [
+            "## UI Overview\nDark theme.",
+            "## Screenshots\n![home](home.png)",
+        ])
+    
+    def test_innovation_summary_falls_back_to_package_json(self):
+        """Test that the package.json name and description summarize a project without docs."""
+        handler = Innovation(self.ai_client, self.prompt_file, 10, "/path/to/repo")
+        files = [
+            ("src/app.js", "render();"),
+            ("package.json", json.dumps({"name": "demo", "description": "A NEAR dApp"})),
+        ]
+        
+        self.assertEqual(handler._extract_project_summary(files), "Project name: demo\nDescription: A NEAR dApp")
+    
     def test_code_quality_process(self):
         """Test the complete process method."""
         # Test data
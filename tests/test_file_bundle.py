@@ -0,0 +1,80 @@
+"""
+Tests for the columnar file bundle.
+"""
+
+import unittest
+from unittest import mock
+
+from audit_near.categories.file_bundle import FileBundle
+from audit_near.providers.repo_provider import FileRef
+
+
+class TestFileBundle(unittest.TestCase):
+    """
+    Tests for FileBundle.
+    """
+    
+    def setUp(self):
+        """Set up test environment before each test."""
+        self.files = [
+            ("src/Main.JS", "console.log('Hello');"),
+            ("README", "# Readme"),
+        ]
+        self.bundle = FileBundle.from_files(self.files)
+    
+    def test_metadata_columns(self):
+        """Test that lowercased paths, extensions and sizes are precomputed."""
+        self.assertEqual(self.bundle.paths_lower, ["src/main.js", "readme"])
+        self.assertEqual(self.bundle.extensions, [".js", ""])
+        self.assertEqual(list(self.bundle.sizes), [21, 8])
+    
+    def test_behaves_like_file_list(self):
+        """Test that a bundle can be used wherever a file list is expected."""
+        self.assertEqual(len(self.bundle), 2)
+        self.assertEqual(list(self.bundle), self.files)
+        self.assertEqual(self.bundle[1], self.files[1])
+        self.assertEqual(self.bundle[:1], self.files[:1])
+        self.assertIn(self.files[0], self.bundle)
+    
+    def test_of_and_select(self):
+        """Test that of() reuses bundles and select() keeps row metadata."""
+        self.assertIs(FileBundle.of(self.bundle), self.bundle)
+        
+        selected = self.bundle.select([1])
+        
+        self.assertEqual(list(selected), [self.files[1]])
+        self.assertEqual(selected.extensions, [""])
+    
+    def test_bundle_of_file_refs_reads_contents_on_access(self):
+        """Test that a bundle built from FileRefs only reads selected contents."""
+        refs = [FileRef("a.py", "/repo/a.py", 3), FileRef("b.md", "/repo/b.md", 5)]
+        
+        with mock.patch("builtins.open", mock.mock_open(read_data="x=1")) as mocked_open:
+            bundle = FileBundle.from_files(refs)
+            selected = bundle.select([0])
+            
+            self.assertEqual(list(bundle.sizes), [3, 5])
+            self.assertEqual(bundle.extensions, [".py", ".md"])
+            mocked_open.assert_not_called()
+            
+            self.assertEqual(list(selected), [("a.py", "x=1")])
+            mocked_open.assert_called_once_with("/repo/a.py", "r", encoding="utf-8", errors="replace")
+
+    
+    def test_scan_content_reads_unread_files_as_bytes(self):
+        """Test that scanning an unread file returns raw bytes without caching them."""
+        ref = FileRef("a.rs", "/repo/a.rs", 3)
+        bundle = FileBundle.from_files([ref])
+        
+        with mock.patch("builtins.open", mock.mock_open(read_data=b"x=1")) as mocked_open:
+            self.assertEqual(bundle.scan_content(0), b"x=1")
+            mocked_open.assert_called_once_with("/repo/a.rs", "rb")
+        self.assertNotIn("content", ref.__dict__)
+        
+        ref.__dict__["content"] = "x=1"
+        self.assertEqual(bundle.scan_content(0), "x=1")
+        self.assertEqual(self.bundle.scan_content(1), "# Readme")
+
+
+if __name__ == "__main__":
+    unittest.main()
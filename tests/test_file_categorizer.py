@@ -0,0 +1,55 @@
+"""
+Tests for the file categorizer.
+"""
+
+import re
+import unittest
+
+from audit_near.providers.file_categorizer import FileCategorizer
+
+
+class TestFileCategorizer(unittest.TestCase):
+    """
+    Tests for FileCategorizer.
+    """
+    
+    def setUp(self):
+        """Set up test environment before each test."""
+        self.categorizer = FileCategorizer()
+        self.files = [
+            ("contract/src/lib.rs", "use near_sdk::near_bindgen;"),
+            ("src/api/server.js", "app.get('/', handler);"),
+            ("src/api/server.test.js", "app.get('/', handler);"),
+            ("src/core/engine.ts", "export class Engine {}"),
+            ("src/core/tests/engine.ts", "export class EngineTest {}"),
+            ("README.md", "# Project"),
+        ]
+    
+    def test_union_patterns_match_like_individual_patterns(self):
+        """Test that the compiled alternations agree with per-pattern searches."""
+        for patterns in (
+            self.categorizer.near_integration_patterns,
+            self.categorizer.offchain_quality_patterns,
+            self.categorizer.technical_innovation_patterns,
+        ):
+            for path, content in self.files:
+                for key, text in (("path", path), ("content", content), ("exclude", path)):
+                    expected = any(re.search(p, text) for p in patterns.get(f"{key}_patterns", []))
+                    compiled = patterns[f"{key}_re"]
+                    self.assertEqual(bool(compiled and compiled.search(text)), expected, (key, path))
+    
+    def test_exclude_patterns_are_applied(self):
+        """Test that excluded paths are left out of their categories."""
+        categories = self.categorizer.categorize_files(self.files)
+        
+        offchain = [path for path, _ in categories["offchain_quality"]]
+        innovation = [path for path, _ in categories["technical_innovation"]]
+        
+        self.assertIn("src/api/server.js", offchain)
+        self.assertNotIn("src/api/server.test.js", offchain)
+        self.assertIn("src/core/engine.ts", innovation)
+        self.assertNotIn("src/core/tests/engine.ts", innovation)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Tests for the LLM response cache.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from audit_near.ai_client import AiClient
+from audit_near.llm_cache import LLMCache
+
+
+class TestLLMCache(unittest.TestCase):
+    """
+    Tests for the LLMCache class.
+    """
+    
+    def setUp(self):
+        """Set up test environment before each test."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "cache", "llm_cache.db")
+    
+    def tearDown(self):
+        """Clean up after each test."""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_set_and_get(self):
+        """Test that stored payloads are returned and persist across instances."""
+        cache = LLMCache(self.path)
+        self.assertIsNone(cache.get("missing"))
+        cache.set("key", '{"score": 7}')
+        self.assertEqual(cache.get("key"), '{"score": 7}')
+        cache.close()
+        
+        reopened = LLMCache(self.path)
+        self.assertEqual(reopened.get("key"), '{"score": 7}')
+        reopened.close()
+    
+    def test_expired_entries_are_ignored(self):
+        """Test that entries older than the TTL are treated as misses."""
+        cache = LLMCache(self.path, ttl_seconds=60)
+        cache.set("key", "value")
+        
+        with mock.patch("audit_near.llm_cache.time.time", return_value=time.time() + 120):
+            self.assertIsNone(cache.get("key"))
+        cache.close()
+    
+    def test_disabled_cache(self):
+        """Test that a disabled cache stores nothing and creates no database."""
+        cache = LLMCache(self.path, enabled=False)
+        cache.set("key", "value")
+        self.assertIsNone(cache.get("key"))
+        self.assertFalse(os.path.exists(self.path))
+    
+    def test_ai_client_uses_cache(self):
+        """Test that identical requests only reach the API once."""
+        config = {"ai": {
+            "primary_model": "test-model",
+            "nano_model": "test-nano",
+            "cache": {"enabled": True, "path": self.path},
+        }}
+        ai_client = AiClient(api_key="test-key", config=config)
+        
+        response = mock.MagicMock()
+        response.choices[0].message.content = '{"score": 8, "feedback": "ok"}'
+        ai_client.client = mock.MagicMock()
+        ai_client.client.chat.completions.create.return_value = response
+        
+        prompt = "```python\n" + "def main(): pass\n" * 100 + "```"
+        first = ai_client.analyze_code_quality(prompt)
+        second = ai_client.analyze_code_quality(prompt)
+        
+        self.assertEqual(first, {"score": 8, "feedback": "ok"})
+        self.assertEqual(second, first)
+        self.assertEqual(ai_client.client.chat.completions.create.call_count, 1)
+        ai_client.cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,7 +6,7 @@ import os
 import tempfile
 import unittest
 
-from audit_near.reporters.markdown_reporter import MarkdownReporter
+from audit_near.reporters.markdown_reporter import MarkdownReporter, ProgressiveMarkdownWriter
 
 
 class TestMarkdownReporter(unittest.TestCase):
@@ -96,6 +96,16 @@ class TestMarkdownReporter(unittest.TestCase):
         self.assertIn("Good code quality with minor issues", content)
         self.assertIn("Average security with some vulnerabilities", content)
     
+    def test_progressive_writer_flushes_each_section(self):
+        """Test that sections are readable on disk as soon as they are emitted."""
+        with ProgressiveMarkdownWriter(self.output_path) as writer:
+            writer.emit_section("security", {"score": 6, "max_points": 10, "feedback": "Validate inputs."})
+            with open(self.output_path, "r", encoding="utf-8") as f:
+                partial = f.read()
+            
+            self.assertIn("### Security (6/10)", partial)
+            self.assertIn("Validate inputs.", partial)
+    
     def test_rating_calculation(self):
         """Test that the rating is calculated correctly."""
         # Create a reporter with a mocked _get_rating method to test different percentage values
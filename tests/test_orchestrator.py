@@ -0,0 +1,180 @@
+"""
+Tests for the category orchestrator.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from audit_near.ai_client import AiClient
+from audit_near.categories.code_quality import CodeQuality
+from audit_near.categories.documentation import Documentation
+from audit_near.categories.enhanced_blockchain_integration import EnhancedBlockchainIntegration
+from audit_near.categories.enhanced_code_quality import EnhancedCodeQuality
+from audit_near.categories.orchestrator import process_categories
+from audit_near.categories.utils import format_file_sections
+from audit_near.providers.repo_analyzer import RepoAnalyzer
+
+
+class TestOrchestrator(unittest.TestCase):
+    """
+    Tests for process_categories.
+    """
+    
+    def setUp(self):
+        """Set up test environment before each test."""
+        self.ai_client = mock.MagicMock(spec=AiClient)
+        self.ai_client.format_files.side_effect = format_file_sections
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.prompt_file = os.path.join(self.temp_dir.name, "prompt.md")
+        with open(self.prompt_file, "w") as f:
+            f.write("Review: {FILES_CONTENT}")
+        
+        self.code_quality = CodeQuality(
+            ai_client=self.ai_client,
+            prompt_file=self.prompt_file,
+            max_points=10,
+            repo_path="/path/to/repo"
+        )
+        self.files = [("src/main.py", "print('Hello')")]
+    
+    def tearDown(self):
+        """Clean up test environment after each test."""
+        self.temp_dir.cleanup()
+    
+    def test_prompts_are_sent_in_one_batch(self):
+        """Test that prepared prompts go through analyze_batch and are finalized."""
+        self.ai_client.analyze_batch.return_value = [{"score": 7, "feedback": "Tidy code."}]
+        
+        results = process_categories({"code_quality": self.code_quality}, self.files, self.ai_client)
+        
+        self.assertEqual(results, {"code_quality": (7, "Tidy code.")})
+        requests = self.ai_client.analyze_batch.call_args.args[0]
+        self.assertEqual(requests[0][0], "code_quality")
+        self.assertIn("src/main.py", requests[0][1])
+        self.ai_client.analyze_code_quality.assert_not_called()
+    
+    def test_documentation_joins_the_batch(self):
+        """Test that the documentation category is prepared and finalized like the others."""
+        documentation = Documentation(self.ai_client, self.prompt_file, 10, self.temp_dir.name)
+        files = self.files + [("README.md", "# Usage")]
+        self.ai_client.analyze_batch.return_value = [{"score": 3, "feedback": "Sparse docs."}]
+        
+        results = process_categories({"documentation": documentation}, files, self.ai_client)
+        
+        self.assertEqual(results, {"documentation": (3, "Sparse docs.")})
+        requests = self.ai_client.analyze_batch.call_args.args[0]
+        self.assertEqual(requests[0][0], "documentation")
+        self.ai_client.analyze_documentation.assert_not_called()
+    
+    def test_failures_are_returned_per_category(self):
+        """Test that a failed analysis and a legacy handler are both reported in order."""
+        legacy = mock.MagicMock(spec=["process", "max_points"])
+        legacy.process.return_value = (4, "Legacy result.")
+        error = RuntimeError("boom")
+        self.ai_client.analyze_batch.return_value = [error]
+        
+        results = process_categories(
+            {"code_quality": self.code_quality, "legacy": legacy}, self.files, self.ai_client
+        )
+        
+        self.assertEqual(list(results), ["code_quality", "legacy"])
+        self.assertIs(results["code_quality"], error)
+        self.assertEqual(results["legacy"], (4, "Legacy result."))
+    
+    def test_results_are_reported_as_categories_finish(self):
+        """Test that on_result receives each category result as soon as it is available."""
+        documentation = Documentation(self.ai_client, self.prompt_file, 10, self.temp_dir.name)
+        handlers = {"code_quality": self.code_quality, "documentation": documentation}
+        reported = []
+        
+        def analyze_batch(requests, on_result=None):
+            analyses = [{"score": 7, "feedback": "Tidy code."}, {"score": 3, "feedback": "Sparse docs."}]
+            on_result(1, analyses[1])
+            self.assertEqual(reported, [("documentation", (3, "Sparse docs."))])
+            on_result(0, analyses[0])
+            return analyses
+        
+        self.ai_client.analyze_batch.side_effect = analyze_batch
+        
+        results = process_categories(
+            handlers, self.files, self.ai_client, on_result=lambda name, result: reported.append((name, result))
+        )
+        
+        self.assertEqual([name for name, _ in reported], ["documentation", "code_quality"])
+        self.assertEqual(results, {"code_quality": (7, "Tidy code."), "documentation": (3, "Sparse docs.")})
+    
+    def test_finalize_failure_is_returned_for_its_category_only(self):
+        """Test that a category whose finalize() raises does not abort the others."""
+        documentation = Documentation(self.ai_client, self.prompt_file, 10, self.temp_dir.name)
+        handlers = {"code_quality": self.code_quality, "documentation": documentation}
+        error = RuntimeError("bad analysis")
+        
+        def analyze_batch(requests, on_result=None):
+            analyses = [{"score": 7, "feedback": "Tidy code."}, {"score": 3, "feedback": "Sparse docs."}]
+            for i, analysis in enumerate(analyses):
+                on_result(i, analysis)
+            return analyses
+        
+        self.ai_client.analyze_batch.side_effect = analyze_batch
+        
+        with mock.patch.object(CodeQuality, "finalize", side_effect=error):
+            results = process_categories(handlers, self.files, self.ai_client)
+        
+        self.assertIs(results["code_quality"], error)
+        self.assertEqual(results["documentation"], (3, "Sparse docs."))
+    
+    def test_legacy_handlers_run_concurrently(self):
+        """Test that handlers without prepare_prompt() are processed at the same time."""
+        import threading
+        
+        barrier = threading.Barrier(2, timeout=5)
+        
+        def process(files):
+            barrier.wait()
+            return (5, "ok")
+        
+        handlers = {}
+        for name in ("security", "innovation"):
+            handlers[name] = mock.MagicMock(spec=["process", "max_points"])
+            handlers[name].process.side_effect = process
+        self.ai_client.analyze_batch.return_value = []
+        
+        results = process_categories(handlers, self.files, self.ai_client)
+        
+        self.assertEqual(results, {"security": (5, "ok"), "innovation": (5, "ok")})
+    
+    def test_repo_analyzer_is_shared_and_analyzed_once(self):
+        """Test that enhanced categories share one cached repository analysis."""
+        analyzer = RepoAnalyzer(repo_path=self.temp_dir.name)
+        handlers = {
+            "code_quality": EnhancedCodeQuality(self.ai_client, self.prompt_file, 10, self.temp_dir.name),
+            "blockchain": EnhancedBlockchainIntegration(self.ai_client, self.prompt_file, 10, self.temp_dir.name),
+        }
+        self.ai_client.analyze_batch.return_value = [{"score": 5}, {"score": 6}]
+        
+        with mock.patch.object(RepoAnalyzer, "_analyze", return_value={"summary": {}}) as analyze:
+            results = process_categories(handlers, self.files, self.ai_client, analyzer)
+        
+        analyze.assert_called_once_with()
+        self.assertEqual([score for score, _ in results.values()], [5, 6])
+        for handler in handlers.values():
+            self.assertIs(handler.repo_analyzer, analyzer)
+
+    
+    def test_unused_prompt_sections_are_not_built(self):
+        """Test that sections missing from the prompt template are skipped."""
+        prompt_file = os.path.join(self.temp_dir.name, "summary.md")
+        with open(prompt_file, "w") as f:
+            f.write("Summary: {REPO_SUMMARY}")
+        handler = EnhancedCodeQuality(self.ai_client, prompt_file, 10, self.temp_dir.name)
+        
+        prompt = handler._build_prompt(self.files, {"summary": {"files": 2}})
+        
+        self.assertEqual(prompt, 'Summary: {\n  "files": 2\n}')
+        self.ai_client.format_files.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Tests for the category plugin loader.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from audit_near.ai_client import AiClient
+from audit_near.categories.file_bundle import FileBundle
+from audit_near.plugins.loader import CategoryPluginLoader
+from audit_near.providers.repo_provider import RepoProvider
+
+
+class TestCategoryPluginLoader(unittest.TestCase):
+    """
+    Tests for the categories created from plugin configurations.
+    """
+    
+    def setUp(self):
+        """Set up test environment before each test."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.plugin_dir = os.path.join(self.temp_dir.name, "plugins")
+        self.repo_path = os.path.join(self.temp_dir.name, "repo")
+        os.makedirs(self.plugin_dir)
+        os.makedirs(os.path.join(self.repo_path, "src"))
+        
+        with open(os.path.join(self.plugin_dir, "prompt.md"), "w") as f:
+            f.write("{FILES_CONTENT}")
+        
+        for name in ("app.js", "app.test.js", "notes.md"):
+            with open(os.path.join(self.repo_path, "src", name), "w") as f:
+                f.write(f"// {name}")
+        
+        self.config = {
+            "metadata": {"id": "sample", "description": "Sample plugin"},
+            "config": {"prompt_file": "prompt.md"},
+            "patterns": {"include": [r"\.js$"], "exclude": [r"\.test\."]},
+        }
+        self.ai_client = mock.MagicMock(spec=AiClient)
+    
+    def tearDown(self):
+        """Clean up test environment after each test."""
+        self.temp_dir.cleanup()
+    
+    def _create_category(self, enhanced: bool):
+        """Create a category instance from the sample plugin configuration."""
+        loader = CategoryPluginLoader(plugins_dir=self.plugin_dir)
+        if enhanced:
+            category_class = loader._create_enhanced_category_class("sample", self.config, self.plugin_dir)
+        else:
+            category_class = loader._create_category_class("sample", self.config, self.plugin_dir)
+        
+        return category_class(
+            self.ai_client, os.path.join(self.plugin_dir, "prompt.md"), 10, self.repo_path, "sample"
+        )
+    
+    def test_select_files_reads_only_selected_files(self):
+        """Test that plugin file patterns are matched without reading unselected files."""
+        for enhanced in (False, True):
+            with self.subTest(enhanced=enhanced):
+                category = self._create_category(enhanced)
+                refs = list(RepoProvider(repo_path=self.repo_path).get_file_refs())
+                
+                selected = category._select_files(FileBundle.of(refs), {})
+                
+                self.assertEqual(selected, [("src/app.js", "// app.js")])
+                read = [ref.path for ref in refs if "content" in ref.__dict__]
+                self.assertEqual(read, ["src/app.js"])
+    
+    def test_enhanced_select_files_matches_important_files(self):
+        """Test that important files are selected only when they match the patterns."""
+        category = self._create_category(enhanced=True)
+        files = [("src/app.js", "a"), ("src/app.test.js", "b"), ("src/lib.js", "c")]
+        repo_analysis = {"dependency_analysis": {"important_files": ["src/lib.js", "src/app.test.js"]}}
+        
+        selected = category._select_files(files, repo_analysis)
+        
+        self.assertEqual(selected, [("src/lib.js", "c"), ("src/app.js", "a")])
+    
+    def test_enhanced_select_files_order_is_independent_of_hash_seed(self):
+        """Test that the enhanced selection order is the same under different hash seeds."""
+        script = (
+            "from audit_near.plugins.loader import CategoryPluginLoader\n"
+            "import sys\n"
+            "config = {'metadata': {'id': 'sample'}, 'config': {'prompt_file': 'prompt.md'}}\n"
+            "cls = CategoryPluginLoader(sys.argv[1])._create_enhanced_category_class('sample', config, sys.argv[1])\n"
+            "category = cls(None, sys.argv[1] + '/prompt.md', 10, '.', 'sample')\n"
+            "files = [(f'src/file{i}.js', '') for i in range(20)]\n"
+            "analysis = {'dependency_analysis': {'important_files': ['src/file7.js', 'src/file3.js']}}\n"
+            "print([path for path, _ in category._select_files(files, analysis)])\n"
+        )
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        
+        outputs = set()
+        for seed in ("1", "2", "3"):
+            env = dict(os.environ, PYTHONHASHSEED=seed, PYTHONPATH=root)
+            result = subprocess.run(
+                [sys.executable, "-c", script, self.plugin_dir],
+                capture_output=True, text=True, env=env, cwd=root, check=True
+            )
+            outputs.add(result.stdout.strip().splitlines()[-1])
+        
+        self.assertEqual(len(outputs), 1)
+        self.assertTrue(outputs.pop().startswith("['src/file7.js', 'src/file3.js', 'src/file0.js'"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Tests for local prompt compression.
+"""
+
+import unittest
+
+from audit_near.prompt_compress import compress
+
+
+class TestPromptCompress(unittest.TestCase):
+    """
+    Tests for the compress function.
+    """
+    
+    def test_collapses_whitespace(self):
+        """Test that trailing whitespace and blank-line runs are removed."""
+        text = "def main():   \n\n\n\n    return 1\t\n"
+        self.assertEqual(compress(text), "def main():\n\n    return 1")
+    
+    def test_drops_license_headers(self):
+        """Test that license comment blocks are removed but other comments kept."""
+        text = (
+            "// SPDX-License-Identifier: MIT\n"
+            "/*\n"
+            " * Copyright 2024 Example\n"
+            " */\n"
+            "\n"
+            "// Transfer tokens to the receiver\n"
+            "fn transfer() {}\n"
+        )
+        self.assertEqual(compress(text), "// Transfer tokens to the receiver\nfn transfer() {}")
+    
+    def test_keeps_markdown_and_attributes(self):
+        """Test that headings and Rust attributes survive comment stripping rules."""
+        text = "# Security Analysis\n\n#[near_bindgen]\nimpl Contract {}\n"
+        self.assertEqual(compress(text), "# Security Analysis\n\n#[near_bindgen]\nimpl Contract {}")
+        self.assertEqual(compress(text, strip_comments=True), "#[near_bindgen]\nimpl Contract {}")
+    
+    def test_keeps_prose_file_sections(self):
+        """Test that headings and bullets in markdown and text files are never dropped."""
+        text = (
+            "File: README.md\n\n```\n"
+            "# License\n"
+            "* Copyright 2024 Example, all rights reserved\n"
+            "```\n\n"
+            "File: src/lib.rs\n\n```\n"
+            "// Copyright 2024 Example\n"
+            "\n"
+            "// Mint a token\n"
+            "fn mint() {}\n"
+            "```"
+        )
+        
+        self.assertEqual(compress(text), text.replace("// Copyright 2024 Example\n", ""))
+        self.assertEqual(
+            compress(text, strip_comments=True),
+            text.replace("// Copyright 2024 Example\n\n// Mint a token\n", "\n")
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
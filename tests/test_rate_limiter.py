@@ -0,0 +1,86 @@
+"""
+Tests for the rate limiter.
+"""
+
+import unittest
+from unittest import mock
+
+import httpx
+from openai import RateLimitError
+
+from audit_near import rate_limiter
+from audit_near.ai_client import AiClient
+from audit_near.rate_limiter import RateLimiter, estimate_tokens
+
+
+class TestRateLimiter(unittest.TestCase):
+    """
+    Tests for the RateLimiter class.
+    """
+    
+    def test_request_bucket_refills_over_time(self):
+        """Test that requests beyond the per-minute allowance must wait."""
+        with mock.patch("audit_near.rate_limiter.time.monotonic", return_value=100.0) as clock:
+            limiter = RateLimiter(requests_per_minute=2)
+            self.assertEqual(limiter._reserve(0), 0)
+            self.assertEqual(limiter._reserve(0), 0)
+            self.assertAlmostEqual(limiter._reserve(0), 30.0)
+            
+            clock.return_value = 130.0
+            self.assertEqual(limiter._reserve(0), 0)
+    
+    def test_token_bucket_limits_large_requests(self):
+        """Test that the token bucket delays requests it cannot cover."""
+        with mock.patch("audit_near.rate_limiter.time.monotonic", return_value=0.0):
+            limiter = RateLimiter(tokens_per_minute=600)
+            self.assertEqual(limiter._reserve(500), 0)
+            self.assertAlmostEqual(limiter._reserve(200), 10.0)
+    
+    def test_disabled_limiter_never_waits(self):
+        """Test that a limiter without limits admits requests immediately."""
+        limiter = RateLimiter()
+        self.assertFalse(limiter.enabled)
+        with mock.patch("audit_near.rate_limiter.time.sleep") as sleep:
+            limiter.acquire(10 ** 6)
+            sleep.assert_not_called()
+    
+    def test_estimate_tokens(self):
+        """Test that token estimates grow with the text."""
+        self.assertGreater(estimate_tokens("fn main() {}" * 100, "gpt-4.1"), estimate_tokens("fn", "gpt-4.1"))
+    
+    def test_estimate_tokens_counts_each_text_once(self):
+        """Test that repeated estimates of the same text reuse the cached token count."""
+        encoding = mock.MagicMock()
+        encoding.encode.return_value = [1, 2, 3]
+        
+        with mock.patch.object(rate_limiter, "tiktoken", mock.MagicMock()), \
+                mock.patch.object(rate_limiter, "_encoding", return_value=encoding), \
+                mock.patch.dict(rate_limiter._token_counts, clear=True):
+            self.assertEqual(estimate_tokens("fn main() {}", "gpt-4.1"), 3)
+            self.assertEqual(estimate_tokens("fn main() {}", "gpt-4.1"), 3)
+            self.assertEqual(estimate_tokens("fn other() {}", "gpt-4.1"), 3)
+        
+        self.assertEqual(encoding.encode.call_count, 2)
+    
+    def test_ai_client_retries_rate_limit_errors(self):
+        """Test that rate-limit errors are retried with backoff."""
+        ai_client = AiClient(api_key="test-key", config={"ai": {"primary_model": "test-model"}})
+        error = RateLimitError(
+            "Rate limit reached",
+            response=httpx.Response(429, request=httpx.Request("POST", "https://api.openai.com")),
+            body=None
+        )
+        response = mock.MagicMock()
+        response.choices[0].message.content = '{"score": 5, "feedback": "ok"}'
+        ai_client.client = mock.MagicMock()
+        ai_client.client.chat.completions.create.side_effect = [error, error, response]
+        
+        with mock.patch("audit_near.ai_client.time.sleep") as sleep:
+            result = ai_client.analyze("security", "def main(): pass")
+        
+        self.assertEqual(result["score"], 5)
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,12 +2,14 @@
 Tests for the repository provider.
 """
 
+import mmap
 import os
 import tempfile
 import unittest
 from pathlib import Path
 from unittest import mock
 
+from audit_near.providers import repo_provider
 from audit_near.providers.repo_provider import RepoProvider
 
 
@@ -88,6 +90,97 @@ class TestRepoProvider(unittest.TestCase):
         self.assertEqual(file_dict["README.md"], "# Test Repository")
         self.assertEqual(file_dict["src/main.js"], "console.log('Hello, world!');")
     
+    def test_get_file_refs_matches_get_files_and_reads_lazily(self):
+        """Test that get_file_refs yields the same files and reads them on demand."""
+        refs = list(self.provider.get_file_refs())
+        
+        self.assertEqual(
+            sorted(ref.path for ref in refs),
+            sorted(path for path, _ in self.provider.get_files())
+        )
+        
+        ref = next(ref for ref in refs if ref.path == "src/main.js")
+        self.assertEqual(ref[0], "src/main.js")
+        self.assertNotIn("content", vars(ref))
+        
+        path, content = ref
+        self.assertEqual((path, content), ("src/main.js", "console.log('Hello, world!');"))
+        self.assertEqual(ref.size, len(content))
+    
+    def test_files_are_listed_in_sorted_order(self):
+        """Test that traversal order is stable so repeated audits build the same prompts."""
+        for name in ("z.txt", "m.txt", "a.txt"):
+            with open(os.path.join(self.repo_path, "src", name), "w") as f:
+                f.write(name)
+        
+        expected = ["README.md", "src/a.txt", "src/m.txt", "src/main.js", "src/z.txt", "src/utils/helper.js"]
+        self.assertEqual([path for path, _ in self.provider.get_files()], expected)
+        self.assertEqual([ref.path for ref in self.provider.get_file_refs()], expected)
+    
+    def test_get_file_refs_stats_each_file_once(self):
+        """Test that the scandir traversal takes size and mode from one lstat per file."""
+        with mock.patch("os.stat", wraps=os.stat) as stat, \
+                mock.patch("os.path.getsize", wraps=os.path.getsize) as getsize:
+            refs = list(self.provider.get_file_refs())
+        
+        stat.assert_not_called()
+        getsize.assert_not_called()
+        self.assertEqual([ref.size for ref in refs], [len(ref.content.encode()) for ref in refs])
+    
+    def test_large_files_are_memory_mapped_for_scanning(self):
+        """Test that unread files above the threshold are scanned through a memory map."""
+        from audit_near.categories.utils import has_blockchain_content
+        
+        refs = list(self.provider.get_file_refs())
+        threshold = max(ref.size for ref in refs)
+        
+        with mock.patch.object(repo_provider, "MMAP_SCAN_MIN_BYTES", threshold):
+            scanned = {ref.path: ref.scan_content for ref in refs}
+        
+        for ref in refs:
+            content = scanned[ref.path]
+            self.assertEqual(bytes(content), ref.content.encode())
+            self.assertEqual(isinstance(content, bytes), ref.size < threshold)
+            self.assertEqual(has_blockchain_content(content), has_blockchain_content(ref.content))
+    
+    def test_files_between_the_mmap_and_size_limits_are_scanned_mapped(self):
+        """Test that a large file kept by the walker is memory-mapped and scannable."""
+        from audit_near.categories import utils
+        
+        self.assertLess(repo_provider.MMAP_SCAN_MIN_BYTES, repo_provider.MAX_FILE_BYTES)
+        
+        filler = "// filler line\n" * (repo_provider.MMAP_SCAN_MIN_BYTES // 15 + 1)
+        with open(os.path.join(self.repo_path, "big.js"), "w") as f:
+            f.write(filler + "await wallet.signTransaction(tx); nft_mint();\n")
+        
+        ref = next(ref for ref in RepoProvider(repo_path=self.repo_path).get_file_refs() if ref.path == "big.js")
+        content = ref.scan_content
+        
+        self.assertIsInstance(content, mmap.mmap)
+        self.assertTrue(utils.has_blockchain_content(content))
+        expected = utils.extract_near_patterns([("big.js", bytes(content))], max_workers=1)
+        self.assertTrue(expected & utils.NFT_INTEGRATION)
+        self.assertEqual(utils.extract_near_patterns([("big.js", content)], max_workers=1), expected)
+        with mock.patch.object(utils, "PARALLEL_SCAN_MIN_BYTES", 0):
+            self.assertEqual(utils.extract_near_patterns([("big.js", content)], max_workers=2), expected)
+        self.assertNotIn("content", ref.__dict__)
+    
+    def test_file_refs_log_traversal_stats(self):
+        """Test that lazy traversal reports included files and warns when none are left."""
+        with self.assertLogs(repo_provider.__name__, level="INFO") as logs:
+            refs = list(RepoProvider(repo_path=self.repo_path).get_file_refs())
+        
+        self.assertIn(f"INFO:{repo_provider.__name__}:  Files included: {len(refs)}", logs.output)
+        
+        with tempfile.TemporaryDirectory() as empty_repo:
+            with open(os.path.join(empty_repo, "image.png"), "wb") as f:
+                f.write(b"\x89PNG\x00\x00")
+            with self.assertLogs(repo_provider.__name__, level="INFO") as logs:
+                self.assertEqual(list(RepoProvider(repo_path=empty_repo).get_file_refs()), [])
+        
+        self.assertTrue(any("No files were included" in line for line in logs.output))
+        self.assertTrue(any("Total files found: 1" in line for line in logs.output))
+    
     def test_invalid_repository_path(self):
         """Test that an invalid repository path raises an error."""
         with self.assertRaises(ValueError):